@@ -1,18 +1,35 @@
 import os
+import time
 from flask import Flask
 from flask_cors import CORS
 from .config import Config
-from .routes import api_bp, ai_bp, code_bp
-from .routes.evaluation import evaluation_bp
+from .util import admission, compression, metrics, startup
 
 def create_app():
+    started = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(Config)
 
     CORS(app, resources={r"/api/*": {"origins": app.config["FRONTEND_ORIGIN"]}})
 
+    # Latency histograms, cache/in-flight counters and the /metrics endpoint
+    metrics.init_app(app)
+    # Per-client rate limits and 429 + Retry-After when an upstream's fair queue is full
+    admission.init_app(app)
+    # gzip/brotli for JSON and text responses, negotiated via Accept-Encoding
+    compression.init_app(app)
+
+    # Imported here so `import app` (e.g. for Config in CLI tools) doesn't pull in every route;
+    # heavy SDKs inside the services are themselves loaded on first use
+    from .routes import api_bp, ai_bp, code_bp
+    from .routes.evaluation import evaluation_bp
+    from .routes.questions import questions_bp
+
     app.register_blueprint(api_bp)
     app.register_blueprint(ai_bp)
     app.register_blueprint(code_bp)
     app.register_blueprint(evaluation_bp)
-    return app
\ No newline at end of file
+    app.register_blueprint(questions_bp)
+
+    startup.record(app, started)
+    return app
@@ -1,10 +1,119 @@
 import os
+import tempfile
+
+
+def _rate(spec: str):
+    """'rate/burst' (tokens per second / bucket size) -> (rate, burst); '' or '0' disables the limit."""
+    if not spec or spec.strip() == "0":
+        return None
+    rate, _, burst = spec.partition("/")
+    return float(rate), float(burst or max(1.0, float(rate)))
+
 
 class Config:
     # Azure Speech
     AZURE_SPEECH_KEY = os.getenv("AZURE_SPEECH_KEY")
     AZURE_SPEECH_REGION = os.getenv("AZURE_SPEECH_REGION")
     AZURE_SPEECH_ENDPOINT = os.getenv("AZURE_SPEECH_ENDPOINT")
+    # Tokens are valid ~10 minutes; serve cached ones and re-issue them on a timer after REFRESH.
+    # The timer stops once a token has gone unrequested for KEEPALIVE.
+    AZURE_TOKEN_TTL_SECONDS = float(os.getenv("AZURE_TOKEN_TTL_SECONDS", "540"))
+    AZURE_TOKEN_REFRESH_SECONDS = float(os.getenv("AZURE_TOKEN_REFRESH_SECONDS", "420"))
+    AZURE_TOKEN_KEEPALIVE_SECONDS = float(os.getenv("AZURE_TOKEN_KEEPALIVE_SECONDS", "3600"))
+
+    # Piston executor pool. PISTON_ENDPOINTS is a comma-separated list of url[|weight[|max_concurrency]],
+    # e.g. "http://piston-a:2000/api/v2/execute|2|16,http://piston-b:2000/api/v2/execute"
+    PISTON_ENDPOINTS = [
+        {
+            "url": parts[0].strip(),
+            "weight": float(parts[1]) if len(parts) > 1 and parts[1].strip() else 1.0,
+            "max_concurrency": int(parts[2]) if len(parts) > 2 and parts[2].strip() else 8,
+        }
+        for parts in (e.split("|") for e in os.getenv("PISTON_ENDPOINTS", "https://emkc.org/api/v2/piston/execute").split(","))
+        if parts[0].strip()
+    ]
+    # Honor a client-supplied piston_url in /api/code/run (dev only; lets clients pick any host)
+    PISTON_ALLOW_CLIENT_URL = os.getenv("PISTON_ALLOW_CLIENT_URL", "0") == "1"
+    PISTON_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PISTON_QUEUE_TIMEOUT_SECONDS", "30"))
+
+    # Background run jobs (/api/code/run?mode=job). Backend: memory | sqlite
+    RUN_JOBS_BACKEND = os.getenv("RUN_JOBS_BACKEND", "memory")
+    RUN_JOBS_SQLITE_PATH = os.getenv("RUN_JOBS_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "interviewly-jobs.sqlite3"))
+    RUN_JOBS_WORKERS = int(os.getenv("RUN_JOBS_WORKERS", "4"))
+    RUN_JOBS_TTL_SECONDS = float(os.getenv("RUN_JOBS_TTL_SECONDS", "3600"))
+    # sqlite: a running job not heard from for LEASE (worker died) is requeued, failed after MAX_ATTEMPTS claims
+    RUN_JOBS_LEASE_SECONDS = float(os.getenv("RUN_JOBS_LEASE_SECONDS", "300"))
+    RUN_JOBS_MAX_ATTEMPTS = int(os.getenv("RUN_JOBS_MAX_ATTEMPTS", "2"))
+    # The job events stream closes after this long; EventSource clients reconnect
+    RUN_JOBS_EVENTS_MAX_SECONDS = float(os.getenv("RUN_JOBS_EVENTS_MAX_SECONDS", "60"))
+
+    # Admission control: per-client (X-Client-Id, else remote address) token buckets per route,
+    # as "rate/burst". Routes mapped in ROUTE_UPSTREAMS are also refused with 429 + Retry-After
+    # while that upstream's fair queue is full.
+    ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") == "1"
+    RATE_LIMITS = {
+        endpoint: limit for endpoint, limit in {
+            "code.run_code": _rate(os.getenv("RATE_LIMIT_CODE_RUN", "1/10")),
+            "ai.analyze": _rate(os.getenv("RATE_LIMIT_AI_ANALYZE", "0.5/5")),
+            "ai.analyze_context": _rate(os.getenv("RATE_LIMIT_AI_ANALYZE_CONTEXT", "0.5/5")),
+            "ai.update_context": _rate(os.getenv("RATE_LIMIT_AI_UPDATE_CONTEXT", "5/20")),
+            "ai.append_transcript": _rate(os.getenv("RATE_LIMIT_AI_TRANSCRIPT", "5/20")),
+        }.items() if limit
+    }
+    ROUTE_UPSTREAMS = {"code.run_code": "piston", "ai.analyze": "gemini", "ai.analyze_context": "gemini"}
+    # Concurrent upstream calls per process, shared fairly across clients; beyond that callers queue
+    FAIR_QUEUE_CAPACITY = {
+        "piston": int(os.getenv("FAIR_QUEUE_PISTON_CAPACITY", str(sum(e["max_concurrency"] for e in PISTON_ENDPOINTS)))),
+        "gemini": int(os.getenv("FAIR_QUEUE_GEMINI_CAPACITY", "8")),
+    }
+    FAIR_QUEUE_MAX_WAITING = int(os.getenv("FAIR_QUEUE_MAX_WAITING", "4"))  # queued callers per slot before 429s
+    FAIR_QUEUE_TIMEOUT_SECONDS = float(os.getenv("FAIR_QUEUE_TIMEOUT_SECONDS", "30"))
+
+    # Speculative runs: after update_context, once code is unchanged for the debounce window, run the
+    # question's tests in the background so a Run on that code returns immediately (off by default)
+    SPECULATIVE_RUNS = os.getenv("SPECULATIVE_RUNS", "0") == "1"
+    SPECULATIVE_DEBOUNCE_SECONDS = float(os.getenv("SPECULATIVE_DEBOUNCE_SECONDS", "3"))
+    SPECULATIVE_MAX_CONCURRENT = int(os.getenv("SPECULATIVE_MAX_CONCURRENT", "2"))
+    SPECULATIVE_RESULT_TTL_SECONDS = float(os.getenv("SPECULATIVE_RESULT_TTL_SECONDS", "600"))
+    SPECULATIVE_MAX_RESULTS = int(os.getenv("SPECULATIVE_MAX_RESULTS", "256"))
+
+    # stop_on_fail runs go failing-tests-first, then cheapest-first, from each client's history per question
+    TEST_ORDER_HISTORY = os.getenv("TEST_ORDER_HISTORY", "1") == "1"
+    TEST_ORDER_TTL_SECONDS = float(os.getenv("TEST_ORDER_TTL_SECONDS", "7200"))
+    TEST_ORDER_MAX_ENTRIES = int(os.getenv("TEST_ORDER_MAX_ENTRIES", "1024"))  # (client, question) pairs
+
+    # Piston executor circuit breaker / adaptive read timeouts
+    PISTON_BREAKER_FAILURES = int(os.getenv("PISTON_BREAKER_FAILURES", "3"))
+    PISTON_BREAKER_COOLDOWN_SECONDS = float(os.getenv("PISTON_BREAKER_COOLDOWN_SECONDS", "30"))
+    PISTON_MIN_READ_TIMEOUT_SECONDS = float(os.getenv("PISTON_MIN_READ_TIMEOUT_SECONDS", "5"))
+    PISTON_MAX_READ_TIMEOUT_SECONDS = float(os.getenv("PISTON_MAX_READ_TIMEOUT_SECONDS", "60"))
+
+    # Response compression (brotli needs the optional `brotli` package; gzip otherwise)
+    COMPRESSION = os.getenv("COMPRESSION", "1") == "1"
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+    # /api/code/run with fields=lean: values whose JSON is longer than this are cut and digested
+    RUN_LEAN_VALUE_MAX_CHARS = int(os.getenv("RUN_LEAN_VALUE_MAX_CHARS", "256"))
+
+    # Per-client interview transcript appended turn by turn (/api/ai/transcript), read by analyze/evaluate
+    TRANSCRIPT_LOG_TTL_SECONDS = float(os.getenv("TRANSCRIPT_LOG_TTL_SECONDS", "7200"))  # since last append
+    TRANSCRIPT_LOG_MAX_CLIENTS = int(os.getenv("TRANSCRIPT_LOG_MAX_CLIENTS", "4096"))
+    TRANSCRIPT_LOG_MAX_TURNS = int(os.getenv("TRANSCRIPT_LOG_MAX_TURNS", "1000"))
+    TRANSCRIPT_LOG_MAX_TURN_CHARS = int(os.getenv("TRANSCRIPT_LOG_MAX_TURN_CHARS", "20000"))
+
+    # Profiler runs ("profile" in /api/code/run, Python only): capped cProfile + line sampling + tracemalloc
+    RUN_PROFILE_CAP_SECONDS = float(os.getenv("RUN_PROFILE_CAP_SECONDS", "2"))
+    RUN_PROFILE_INTERVAL_MS = float(os.getenv("RUN_PROFILE_INTERVAL_MS", "1"))
+    RUN_PROFILE_MAX_SAMPLES = int(os.getenv("RUN_PROFILE_MAX_SAMPLES", "5000"))
+    RUN_PROFILE_TOP = int(os.getenv("RUN_PROFILE_TOP", "5"))
+    RUN_PROFILE_TTL_SECONDS = float(os.getenv("RUN_PROFILE_TTL_SECONDS", "3600"))  # summary kept for the interviewer
+    RUN_PROFILE_MAX_CLIENTS = int(os.getenv("RUN_PROFILE_MAX_CLIENTS", "4096"))
+
+    # Transcript proxy: bounded on-disk cache for /api/proxy_transcript
+    TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "interviewly-transcripts"))
+    TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    TRANSCRIPT_CACHE_FRESH_SECONDS = float(os.getenv("TRANSCRIPT_CACHE_FRESH_SECONDS", "60"))
 
     # CORS: allow comma-separated list of origins (e.g., "http://127.0.0.1:5173,http://localhost:5173")
     _origins = os.getenv("FRONTEND_ORIGIN", "*")
@@ -16,7 +125,48 @@ class Config:
     # Gemini
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")  # 🔑 put your Gemini key here
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")  # default fast model
+    GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")  # optional override, e.g. http://127.0.0.1:8788 for bench/
+    GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))  # any call without its own
+    # Interviewer routing (services/gemini.route): short spoken turns -> fast model, code reviews -> strong
+    # model. A call still unanswered after its tier's hedge delay is also sent to the other model (0 = never).
+    GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", GEMINI_MODEL)
+    GEMINI_STRONG_MODEL = os.getenv("GEMINI_STRONG_MODEL", "gemini-1.5-pro")
+    GEMINI_FAST_TURN_MAX_CHARS = int(os.getenv("GEMINI_FAST_TURN_MAX_CHARS", "600"))  # longer last message -> strong
+    GEMINI_TURN_HEDGE_AFTER_SECONDS = float(os.getenv("GEMINI_TURN_HEDGE_AFTER_SECONDS", "2.5"))
+    GEMINI_TURN_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TURN_TIMEOUT_SECONDS", "15"))
+    GEMINI_REVIEW_HEDGE_AFTER_SECONDS = float(os.getenv("GEMINI_REVIEW_HEDGE_AFTER_SECONDS", "10"))
+    GEMINI_REVIEW_TIMEOUT_SECONDS = float(os.getenv("GEMINI_REVIEW_TIMEOUT_SECONDS", "45"))
+    GEMINI_HEDGE_WORKERS = int(os.getenv("GEMINI_HEDGE_WORKERS", "16"))
     QUESTION = os.getenv("QUESTION", "two-sum")
+    # Local question bank: one JSON/YAML file per question (see services/question_bank.py)
+    QUESTION_BANK_DIR = os.getenv("QUESTION_BANK_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "questions"))
+    QUESTION_REFERENCE_CACHE_DIR = os.getenv("QUESTION_REFERENCE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "interviewly-reference"))
+
+    # Background complexity analysis of code that has stopped changing, reused by /api/evaluation/evaluate
+    COMPLEXITY_PRECOMPUTE = os.getenv("COMPLEXITY_PRECOMPUTE", "1") == "1"
+    COMPLEXITY_PRECOMPUTE_DEBOUNCE_SECONDS = float(os.getenv("COMPLEXITY_PRECOMPUTE_DEBOUNCE_SECONDS", "15"))
+    COMPLEXITY_PRECOMPUTE_TTL_SECONDS = float(os.getenv("COMPLEXITY_PRECOMPUTE_TTL_SECONDS", "7200"))
+    COMPLEXITY_PRECOMPUTE_MAX_RESULTS = int(os.getenv("COMPLEXITY_PRECOMPUTE_MAX_RESULTS", "1024"))
+    COMPLEXITY_PRECOMPUTE_WAIT_SECONDS = float(os.getenv("COMPLEXITY_PRECOMPUTE_WAIT_SECONDS", "20"))  # for one in flight
+
+    # Evaluation prompt: transcript + code + test details share this many (estimated) tokens
+    EVAL_PROMPT_TOKEN_BUDGET = int(os.getenv("EVAL_PROMPT_TOKEN_BUDGET", "12000"))
+    EVAL_MAX_FAILED_CASES = int(os.getenv("EVAL_MAX_FAILED_CASES", "10"))  # failing tests listed individually
+    EVAL_VALUE_MAX_CHARS = int(os.getenv("EVAL_VALUE_MAX_CHARS", "200"))  # longer input/expected/got are digested
+
+    # Finished evaluations, reused for retries of the same submission. Backend: sqlite | memory
+    EVAL_STORE_BACKEND = os.getenv("EVAL_STORE_BACKEND", "sqlite")
+    EVAL_STORE_SQLITE_PATH = os.getenv("EVAL_STORE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "interviewly-evaluations.sqlite3"))
+    EVAL_STORE_TTL_SECONDS = float(os.getenv("EVAL_STORE_TTL_SECONDS", str(30 * 86400)))
+    EVAL_STORE_LEASE_SECONDS = float(os.getenv("EVAL_STORE_LEASE_SECONDS", "180"))  # in-progress claim before takeover
+    EVAL_STORE_WAIT_SECONDS = float(os.getenv("EVAL_STORE_WAIT_SECONDS", "120"))  # duplicate waiting on one in progress
+
+    # Batch re-scoring (/api/evaluation/batch and batch_evaluate.py)
+    BATCH_EVAL_DIR = os.getenv("BATCH_EVAL_DIR", os.path.join(tempfile.gettempdir(), "interviewly-batch"))
+    BATCH_EVAL_CONCURRENCY = int(os.getenv("BATCH_EVAL_CONCURRENCY", "4"))
+    BATCH_EVAL_MAX_CONCURRENCY = int(os.getenv("BATCH_EVAL_MAX_CONCURRENCY", "16"))
+    BATCH_EVAL_RATE_PER_SEC = float(os.getenv("BATCH_EVAL_RATE_PER_SEC", "2"))  # LLM calls/sec, 0 = unlimited
+    BATCH_EVAL_JOB_TTL_SECONDS = float(os.getenv("BATCH_EVAL_JOB_TTL_SECONDS", "3600"))  # finished jobs kept in memory
 # note we will have to add which question
 
     GEMINI_SYSTEM_PROMPT = (
@@ -41,4 +191,7 @@ class Config:
         "“I like your choice of data structure here. Are there any trade-offs you'd consider? \n”"
         "If the candidate goes off-topic (e.g., basketball career questions), reply with something funny and then gently refocus on the interview. Always say Lebron/Lakers are the best if basketball is mentioned."
     )
-    JSON_SORT_KEYS = False
\ No newline at end of file
+    JSON_SORT_KEYS = False
+
+    # Log the create_app startup report (time, RSS, heavy modules loaded) at boot
+    STARTUP_REPORT = os.getenv("STARTUP_REPORT", "0") == "1"
\ No newline at end of file
@@ -1,11 +1,49 @@
 from flask import Blueprint, current_app, jsonify, request
-from ..services.gemini import analyze_with_gemini
+from ..services import complexity_precompute, profiling, speculative_runs, transcript_log
+from ..services.gemini import generate_routed
+from ..services.question_bank import resolve_question
+from ..util.admission import Saturated, client_key, get_scheduler
+from ..util.singleflight import SingleFlight, canonical_key
 
 # Simple in-memory context store per client. For production, replace with Redis or DB.
+# The conversation itself lives alongside it in services/transcript_log.
 _CONTEXT_BY_CLIENT = {}
 
+# Identical Gemini calls in flight at once (e.g. analyze_context fired twice on unchanged context) share one reply
+_LLM_CALLS = SingleFlight("gemini")
+
 ai_bp = Blueprint("ai", __name__, url_prefix="/api/ai")
 
+
+def _generate(cfg, api_key: str, system_prompt: str, messages: list, kind: str = "turn") -> str:
+    """
+    Coalesce duplicates, then queue fairly behind other clients for a Gemini slot.
+    kind picks the model tier (see gemini.route); a hedged call takes a second slot, and is
+    skipped if none is free.
+    """
+    params = {
+        "temperature": cfg.get("GEMINI_TEMPERATURE"),
+        "top_p": cfg.get("GEMINI_TOP_P"),
+        "top_k": cfg.get("GEMINI_TOP_K"),
+        "max_tokens": cfg.get("GEMINI_MAX_TOKENS"),
+    }
+    client = client_key()
+
+    def _call():
+        return generate_routed(api_key=api_key, system_prompt=system_prompt, messages=messages,
+                               kind=kind, scheduler=get_scheduler("gemini"), client=client, **params)
+
+    return _LLM_CALLS.do(canonical_key(system_prompt, messages, kind, params), _call)
+
+def _profile_block(client_id: str, ctx: dict) -> str:
+    """Profiler evidence from the client's last profiled run, if it was on the current code."""
+    measured = profiling.latest(client_id, (ctx.get("code") or ""), ctx.get("language") or "unknown")
+    if not measured:
+        return ""
+    return ("\n\nMEASURED PROFILE of the candidate's current code (use as evidence when discussing "
+            f"performance; don't recite it):\n{measured}\n")
+
+
 @ai_bp.route("/analyze", methods=["POST"])
 def analyze():
     """
@@ -13,6 +51,7 @@ def analyze():
     {
       "messages": [{ "role": "user"|"ai", "content": "..." }, ...]
     }
+    Without "messages", the client's transcript log (POST /api/ai/transcript) is used.
     All Gemini settings (model, system prompt, temps) are server-side.
     """
     data = request.get_json(silent=True) or {}
@@ -20,6 +59,8 @@ def analyze():
 
     # If a client has sent code context recently, prepend it so Gemini gets the latest code
     client_id = request.headers.get("X-Client-Id")
+    if not messages:
+        messages = transcript_log.get(client_id) or []
     ctx = _CONTEXT_BY_CLIENT.get(client_id) if client_id else None
     if ctx and isinstance(messages, list):
         code = (ctx.get("code") or "").strip()
@@ -69,21 +110,60 @@ def analyze():
                 )
                 system_prompt = f"{base_system_prompt}{question_block}"
 
-        text = analyze_with_gemini(
-            api_key=api_key,
-            model_name=cfg.get("GEMINI_MODEL"),
-            system_prompt=system_prompt,
-            messages=messages,
-            temperature=cfg.get("GEMINI_TEMPERATURE"),
-            top_p=cfg.get("GEMINI_TOP_P"),
-            top_k=cfg.get("GEMINI_TOP_K"),
-            max_tokens=cfg.get("GEMINI_MAX_TOKENS"),
-        )
+        if ctx:
+            system_prompt += _profile_block(client_id, ctx)
+        text = _generate(cfg, api_key, system_prompt, messages)
         return jsonify({"text": text})
+    except Saturated:
+        raise  # 429 + Retry-After via the admission error handler
     except Exception as e:
         return jsonify({"error": f"Gemini analyze failed: {e}"}), 500
 
 
+@ai_bp.route("/transcript", methods=["POST"])
+def append_transcript():
+    """Append one turn to the client's transcript log.
+
+    Body: { role: "user"|"ai", content: string, seq?: int }
+    Header: X-Client-Id: <stable-id>
+    seq is the turn's index: resending a stored turn is a no-op, a gap returns 409 { expected_seq }.
+    Response: { ok, turns }
+    """
+    client_id = request.headers.get("X-Client-Id")
+    if not client_id:
+        return jsonify({"error": "Missing X-Client-Id header"}), 400
+    data = request.get_json(silent=True) or {}
+    seq = data.get("seq")
+    if seq is not None and not isinstance(seq, int):
+        return jsonify({"error": "seq must be an integer"}), 400
+    try:
+        turns = transcript_log.append(client_id, data.get("role"), data.get("content"), seq)
+    except transcript_log.SequenceMismatch as e:
+        return jsonify({"error": str(e), "expected_seq": e.expected}), 409
+    except transcript_log.TranscriptLogError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"ok": True, "turns": turns})
+
+
+@ai_bp.route("/transcript", methods=["GET"])
+def get_transcript():
+    """The client's transcript log: { turns: [{role, content}] }."""
+    turns = transcript_log.get(request.headers.get("X-Client-Id"))
+    if turns is None:
+        return jsonify({"error": "No transcript for client"}), 404
+    return jsonify({"turns": turns})
+
+
+@ai_bp.route("/transcript", methods=["DELETE"])
+def clear_transcript():
+    """Start a new interview: drop the client's transcript log."""
+    client_id = request.headers.get("X-Client-Id")
+    if not client_id:
+        return jsonify({"error": "Missing X-Client-Id header"}), 400
+    transcript_log.clear(client_id)
+    return jsonify({"ok": True})
+
+
 @ai_bp.route("/update_context", methods=["POST"])
 def update_context():
     """Stores the latest editor code and current question for a client.
@@ -101,7 +181,8 @@ def update_context():
     data = request.get_json(silent=True) or {}
     code = data.get("code") or ""
     language = data.get("language") or "unknown"
-    question = data.get("question")  # may be a dict per schema
+    # May be a dict per schema, or just an id from the local bank ("question_id" or {"id": ...})
+    question = resolve_question(data.get("question"), data.get("question_id"))
 
     # Compute a lightweight hash to dedupe rapid repeats
     try:
@@ -136,6 +217,10 @@ def update_context():
     if question is not None:
         updated["question"] = question
     _CONTEXT_BY_CLIENT[client_id] = updated
+    # Opt-in: run the question's tests in the background once this code stops changing
+    speculative_runs.code_changed(client_id, code, language, updated.get("question"))
+    # Have the complexity analysis ready before the interview is submitted
+    complexity_precompute.code_changed(client_id, code, language)
     return jsonify({
         "ok": True,
         "bytes": len(code),
@@ -196,21 +281,17 @@ def analyze_context():
             )
             system_prompt = f"{base_system_prompt}{question_block}"
 
+        system_prompt += _profile_block(client_id, ctx)
+
         messages = []
         if code:
             # Send only the code as the content so the context is clean
             messages.append({"role": "user", "content": code})
 
-        text = analyze_with_gemini(
-            api_key=api_key,
-            model_name=cfg.get("GEMINI_MODEL"),
-            system_prompt=system_prompt,
-            messages=messages,
-            temperature=cfg.get("GEMINI_TEMPERATURE"),
-            top_p=cfg.get("GEMINI_TOP_P"),
-            top_k=cfg.get("GEMINI_TOP_K"),
-            max_tokens=cfg.get("GEMINI_MAX_TOKENS"),
-        )
+        # Feedback on the code itself: the strong model's tier
+        text = _generate(cfg, api_key, system_prompt, messages, kind="review")
         return jsonify({"text": text})
+    except Saturated:
+        raise  # 429 + Retry-After via the admission error handler
     except Exception as e:
         return jsonify({"error": f"Gemini analyze failed: {e}"}), 500
\ No newline at end of file
@@ -1,7 +1,7 @@
-from flask import Blueprint, current_app, jsonify, request, Response
-from ..services.azure_speech import issue_token
-import re
-import requests
+from flask import Blueprint, current_app, jsonify, request, Response, send_file, stream_with_context
+from ..services.azure_speech import get_cached_token
+from ..services.transcript_proxy import fetch_transcript, TranscriptFetchError
+from ..util.metrics import cache_result
 
 bp = Blueprint("api", __name__, url_prefix="/api")
 
@@ -40,7 +40,12 @@ def azure_token():
         return jsonify({"error": "Missing Azure config. Set AZURE_SPEECH_KEY and AZURE_SPEECH_REGION or AZURE_SPEECH_ENDPOINT."}), 500
 
     try:
-        token = issue_token(key=key, region=region, endpoint=endpoint)
+        # Served from a process-wide cache; STS is only hit on expiry or background refresh
+        token = get_cached_token(
+            key=key, region=region, endpoint=endpoint,
+            ttl=cfg.get("AZURE_TOKEN_TTL_SECONDS"),
+            refresh_after=cfg.get("AZURE_TOKEN_REFRESH_SECONDS"),
+        )
         # Browser SDK needs a region; if using endpoint, return some region value (your real region is best).
         return jsonify({"token": token, "region": region or "eastus", "endpoint": endpoint or None})
     except Exception as e:
@@ -55,8 +60,11 @@ def proxy_transcript():
     Query: ?url=<encoded firebase download URL>
     Behavior:
       - Validates URL is a Firebase Storage download URL
-      - Tries the original URL
-      - If 403/404, tries to fix legacy bucket names and ensure alt=media
+      - Streams the upstream body through (never buffered whole in memory)
+      - Keeps a bounded on-disk cache keyed by the normalized URL, revalidated via ETag
+      - If 403/404, tries to fix legacy bucket names and ensure alt=media; the
+        rewrite that works is remembered so later calls try it first
+      - Honors Range requests
     """
     raw_url = request.args.get("url", type=str)
     if not raw_url:
@@ -67,45 +75,26 @@ def proxy_transcript():
         if not (raw_url.startswith("https://firebasestorage.googleapis.com/") or raw_url.startswith("https://storage.googleapis.com/")):
             return jsonify({"error": "URL host not allowed"}), 400
 
-        def _ensure_alt_media(u: str) -> str:
-            from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
-            p = urlparse(u)
-            q = dict(parse_qsl(p.query, keep_blank_values=True))
-            q.setdefault("alt", "media")
-            new_q = urlencode(q)
-            return urlunparse((p.scheme, p.netloc, p.path, p.params, new_q, p.fragment))
+        cfg = current_app.config
+        try:
+            result = fetch_transcript(
+                raw_url,
+                cache_dir=cfg.get("TRANSCRIPT_CACHE_DIR"),
+                max_bytes=cfg.get("TRANSCRIPT_CACHE_MAX_BYTES"),
+                fresh_seconds=cfg.get("TRANSCRIPT_CACHE_FRESH_SECONDS"),
+                range_header=request.headers.get("Range"),
+            )
+        except TranscriptFetchError as e:
+            # If all candidates failed, return error
+            return jsonify({"error": f"Failed to fetch transcript: {e}"}), 502
 
-        def _fix_bucket_path(u: str) -> str:
-            # Replace ".firebasestorage.app" in bucket segment with ".appspot.com"
-            m = re.search(r"/v0/b/([^/]+)/o/", u)
-            if not m:
-                return u
-            bucket = m.group(1)
-            if ".firebasestorage.app" in bucket:
-                fixed = bucket.replace(".firebasestorage.app", ".appspot.com")
-                return u.replace(f"/v0/b/{bucket}/o/", f"/v0/b/{fixed}/o/")
-            return u
-
-        candidates = []
-        candidates.append(_ensure_alt_media(raw_url))
-        fixed1 = _fix_bucket_path(candidates[0])
-        if fixed1 != candidates[0]:
-            candidates.append(fixed1)
-
-        last_exc = None
-        for cu in candidates:
-            try:
-                r = requests.get(cu, timeout=15)
-                if r.status_code == 200:
-                    # Pass through content-type if provided
-                    ct = r.headers.get("content-type", "application/octet-stream")
-                    return Response(r.content, status=200, mimetype=ct)
-                # Store last response for debugging, but continue trying others
-                last_exc = Exception(f"Upstream status {r.status_code}")
-            except Exception as e:
-                last_exc = e
-
-        # If all candidates failed, return error
-        return jsonify({"error": f"Failed to fetch transcript: {last_exc}"}), 502
+        if "path" in result:
+            # send_file handles Range / If-None-Match against the cached copy
+            resp = send_file(result["path"], mimetype=result["content_type"], conditional=True)
+        else:
+            resp = Response(stream_with_context(result["stream"]), status=result["status"], headers=result["headers"])
+        resp.headers["X-Transcript-Cache"] = result["cache"]
+        cache_result("transcript", result["cache"])
+        return resp
     except Exception as e:
-        return jsonify({"error": f"Proxy error: {e}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"Proxy error: {e}"}), 500
@@ -1,68 +1,108 @@
-from flask import Blueprint, request, jsonify
-from requests.exceptions import Timeout
-from ..language_versions import LANGUAGE_VERSIONS
-from ..util.execute_utils import prep_code, get_test_cases, run_single_test  # moved helpers
+import json
+import time
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from ..services.code_runner import execute_run_coalesced, shape_run_body
+from ..services import run_jobs, speculative_runs
+from ..services.question_bank import QuestionBankError, QuestionUnavailable, resolve_run_payload
+from ..util.admission import client_key
+from ..util.executor_health import all_health
+from ..util.executor_pool import get_pool
 
 code_bp = Blueprint("code", __name__, url_prefix="/api/code")
 
- 
+
+def _shape(body: dict, data: dict | None = None) -> dict:
+    """Apply ?fields= (or "fields" in the run body) to a run response."""
+    fields = request.args.get("fields") or (data or {}).get("fields")
+    return shape_run_body(body, fields, current_app.config["RUN_LEAN_VALUE_MAX_CHARS"])
+
 
 @code_bp.route("/run", methods=["POST"])
 def run_code():
+    """
+    Run code against tests. With ?mode=job (or "async": true in the body) the run is
+    queued and 202 { job_id, status_url, events_url } is returned immediately.
+    A "question_id" from the local bank stands in for function/checker/timeout/tests.
+    ?fields=lean (or "fields": "lean") leaves expected/got off passing tests and digests
+    long values; ?fields=id,ok,time_ms keeps just those result keys.
+    "profile": true (or a test id) re-runs one Python test under a profiler and attaches
+    the report to that test's result.
+    """
     data = request.get_json(silent=True) or {}
+    try:
+        data = resolve_run_payload(data)
+    except QuestionUnavailable as e:
+        # Known question whose tests can't be loaded right now; not the client's fault
+        return jsonify({"error": str(e)}), 503
+    except QuestionBankError as e:
+        return jsonify({"error": str(e)}), 400
 
-    code = data.get("code", "")
-    language = data.get("language", "python")
-    version = LANGUAGE_VERSIONS.get(language, "")
-    piston_url = data.get("piston_url", "https://emkc.org/api/v2/piston/execute")
-    run_timeout = int(data.get("timeout", 10000))
-    default_checker = data.get("checker", "deep_equal")
-    func_name = data.get("function")
-    stop_on_fail = bool(data.get("stop_on_fail", False))
+    if request.args.get("mode") == "job" or data.get("async"):
+        if not data.get("code") or not data.get("function"):
+            return jsonify({"error": "code and function are required"}), 400
+        job_id = run_jobs.submit(client_key(), data)
+        return jsonify({
+            "job_id": job_id,
+            "status_url": f"/api/code/jobs/{job_id}",
+            "events_url": f"/api/code/jobs/{job_id}/events",
+        }), 202
 
-    test_case_url = data.get("test_cases")
-    tests = get_test_cases(test_case_url) if test_case_url else (data.get("tests") or [])
-    if not isinstance(tests, list):
-        return jsonify({"error": "tests must be a list"}), 400
+    # Code unchanged since update_context let a background run finish: answer from that
+    speculative = speculative_runs.lookup(data)
+    if speculative is not None:
+        resp = jsonify(_shape(speculative, data))
+        resp.headers["X-Speculative-Run"] = "hit"
+        return resp
 
-    if not code or not func_name:
-        return jsonify({"error": "code and function are required"}), 400
+    body, status = execute_run_coalesced(data, client_id=client_key())
+    return jsonify(_shape(body, data)), status
 
-    try:
-        combined_source = prep_code(code)
-    except Exception as e:
-        return jsonify({"error": f"prep_code failed: {e}"}), 500
-
-    aggregated = []
-    passed = 0
-
-    # Run tests one at a time (no batching)
-    for t in tests:
-        try:
-            results = run_single_test(
-                piston_url, language, version, combined_source,
-                func_name, t, default_checker, run_timeout
-            )
-        except Exception as e:
-            msg = str(e)
-            is_timeout = isinstance(e, Timeout) or ("timeout" in msg.lower() or "timed out" in msg.lower())
-            results = [{
-                "id": t.get("id"),
-                "ok": False,
-                "expected": t.get("output"),
-                "got": None,
-                "time_ms": None,
-                "error": f"Piston request failed: {e}",
-                "checker": t.get("checker", default_checker),
-                "tle": is_timeout
-            }]
-
-        for res in results:
-            if res.get("ok"):
-                passed += 1
-            aggregated.append(res)
-            if stop_on_fail and not res.get("ok"):
-                return jsonify({"summary": {"passed": passed, "total": len(aggregated)}, "results": aggregated})
-
-    summary = {"passed": passed, "total": len(aggregated)}
-    return jsonify({"summary": summary, "results": aggregated})
+
+@code_bp.route("/jobs/<job_id>", methods=["GET"])
+def run_job_status(job_id):
+    """Poll a run job: { id, state: queued|running|done|failed, progress: {done, total}, result? }"""
+    job = run_jobs.get_job(job_id)
+    if not job:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if isinstance(job.get("result"), dict):
+        job = {**job, "result": _shape(job["result"])}
+    return jsonify(job)
+
+
+@code_bp.route("/jobs/<job_id>/events", methods=["GET"])
+def run_job_events(job_id):
+    """
+    Server-sent events: a progress event whenever it changes, then one final result event.
+    The stream closes after RUN_JOBS_EVENTS_MAX_SECONDS without a result; clients reconnect.
+    """
+    if not run_jobs.get_job(job_id):
+        return jsonify({"error": "Unknown or expired job"}), 404
+    deadline = time.monotonic() + current_app.config["RUN_JOBS_EVENTS_MAX_SECONDS"]
+
+    def _events():
+        last = None
+        yield "retry: 1000\n\n"
+        while time.monotonic() < deadline:
+            job = run_jobs.get_job(job_id)
+            if not job:
+                yield "event: error\ndata: {\"error\": \"job expired\"}\n\n"
+                return
+            if job["state"] in ("done", "failed"):
+                if isinstance(job.get("result"), dict):
+                    job = {**job, "result": _shape(job["result"])}
+                yield f"event: result\ndata: {json.dumps(job)}\n\n"
+                return
+            snapshot = (job["state"], json.dumps(job["progress"]))
+            if snapshot != last:
+                last = snapshot
+                yield f"event: progress\ndata: {json.dumps({'state': job['state'], 'progress': job['progress']})}\n\n"
+            time.sleep(0.25)
+
+    return Response(stream_with_context(_events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@code_bp.route("/executors", methods=["GET"])
+def executors():
+    """Pool load and circuit-breaker state for every Piston endpoint seen by this worker."""
+    return jsonify({"pool": get_pool().snapshot(), "executors": all_health()})
@@ -1,6 +1,45 @@
-from flask import Blueprint, current_app, jsonify, request
+from flask import Blueprint, current_app, jsonify, request, send_file
 from datetime import datetime
+import os
+import json
+import re
+import threading
+import time
+import uuid
+from ..services import complexity_precompute, transcript_log
+from ..services.evaluation_store import (
+    EvaluationInProgress, IdempotencyConflict, evaluate_once, evaluation_key, submission_hash
+)
 from ..services.evaluation_service import evaluate_interview
+from ..services.question_bank import resolve_question
+from ..services.batch_evaluation import run_batch, read_jsonl
+
+# job_id -> progress dict; output lives on disk so jobs can be resumed after a restart.
+# Finished jobs are dropped after BATCH_EVAL_JOB_TTL_SECONDS; their status is then rebuilt from disk.
+_BATCH_JOBS = {}
+_BATCH_JOBS_LOCK = threading.Lock()
+
+
+def _prune_batch_jobs(ttl: float):
+    cutoff = time.monotonic() - ttl
+    with _BATCH_JOBS_LOCK:
+        for job_id in [k for k, p in _BATCH_JOBS.items() if p.get("_finished") and p["_finished"] < cutoff]:
+            del _BATCH_JOBS[job_id]
+
+
+def _progress_from_disk(path: str) -> dict:
+    """Counters for a job no longer in memory, from its JSONL output (last row per id wins)."""
+    rows = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(row, dict) and row.get("id") is not None:
+                rows[row["id"]] = row
+    failed = sum(1 for r in rows.values() if r.get("error"))
+    return {"state": "finished", "succeeded": len(rows) - failed, "failed": failed}
 
 evaluation_bp = Blueprint("evaluation", __name__, url_prefix="/api/evaluation")
 
@@ -21,18 +60,28 @@ def evaluate_interview_endpoint():
             "candidate_time_complexity": "O(n^2)",
             "candidate_space_complexity": "O(1)",
             "solution": "Optimal solution explanation..."
-        }
+        },
+        "idempotency_key": "optional; or send an Idempotency-Key header"
     }
+
+    "transcript" may be omitted when the client appended its turns to /api/ai/transcript;
+    the log for "client_id" (or the X-Client-Id header) is used instead.
+
+    Repeats of the same submission (same idempotency key, or identical fields) return the
+    stored evaluation with an Idempotent-Replayed: true header instead of re-scoring.
     """
     try:
         data = request.get_json(silent=True) or {}
         
         # Extract required fields
-        transcript = data.get("transcript", [])
+        transcript = data.get("transcript") or transcript_log.get(
+            data.get("client_id") or request.headers.get("X-Client-Id")
+        ) or []
         code_submission = data.get("code_submission", "")
         language = data.get("language", "python")
         test_results = data.get("test_results", {})
-        question = data.get("question", {})
+        # A bank question id may replace the full question (solution and complexities come from the bank)
+        question = resolve_question(data.get("question", {}), data.get("question_id")) or {}
         interview_start_time = data.get("interviewStartTime")
         
         # Validate required fields
@@ -47,15 +96,34 @@ def evaluate_interview_endpoint():
         if not api_key:
             return jsonify({"error": "Gemini API key not configured"}), 500
         
-        # Perform evaluation
-        evaluation_result = evaluate_interview(
-            api_key=api_key,
-            transcript=transcript,
-            code_submission=code_submission,
-            test_results=test_results,
-            language=language,
-            question=question
-        )
+        request_hash = submission_hash(transcript=transcript, code_submission=code_submission,
+                                       language=language, test_results=test_results, question=question)
+        key = evaluation_key(request.headers.get("Idempotency-Key") or data.get("idempotency_key"), request_hash)
+
+        def _evaluate():
+            # Reuse the complexity analysis computed while the candidate was typing, if the code matches
+            precomputed = complexity_precompute.lookup(
+                code_submission, language, wait=current_app.config.get("COMPLEXITY_PRECOMPUTE_WAIT_SECONDS", 0)
+            )
+            return evaluate_interview(
+                api_key=api_key,
+                transcript=transcript,
+                code_submission=code_submission,
+                test_results=test_results,
+                language=language,
+                question=question,
+                complexity_analysis=precomputed
+            )
+
+        # Perform evaluation (or return the stored one for this submission)
+        try:
+            evaluation_result, replayed = evaluate_once(key, request_hash, _evaluate)
+        except IdempotencyConflict:
+            return jsonify({"error": "Idempotency key was already used for a different submission"}), 422
+        except EvaluationInProgress:
+            resp = jsonify({"error": "This submission is still being evaluated; retry shortly"})
+            resp.headers["Retry-After"] = "5"
+            return resp, 409
         
         # Parse interview start time and get current evaluation time
         current_time = datetime.now()
@@ -65,12 +133,15 @@ def evaluate_interview_endpoint():
         start_time = datetime.fromisoformat(interview_start_time.replace('Z', '+00:00'))
         start_formatted = start_time.strftime("%Y-%m-%d %H:%M:%S")
         
-        return jsonify({
+        resp = jsonify({
             "success": True,
             "evaluation": evaluation_result,
             "interview_start_time": interview_start_time,
             "interview_started_at": start_formatted,
         })
+        if replayed:
+            resp.headers["Idempotent-Replayed"] = "true"
+        return resp
         
     except Exception as e:
         current_app.logger.error(f"Interview evaluation failed: {str(e)}")
@@ -78,6 +149,92 @@ def evaluate_interview_endpoint():
             "error": f"Evaluation failed: {str(e)}"
         }), 500
 
+def _batch_output_path(job_id: str) -> str:
+    return os.path.join(current_app.config["BATCH_EVAL_DIR"], f"{job_id}.jsonl")
+
+
+@evaluation_bp.route("/batch", methods=["POST"])
+def batch_evaluate_endpoint():
+    """
+    Re-score many stored interviews in the background.
+
+    Body: JSONL (one interview per line, same fields as /evaluate plus optional "id"),
+          or JSON { "interviews": [...] }.
+    Query: ?job_id=<id> to resume a previous job (already-scored ids are skipped),
+           ?concurrency=<n>, ?rate=<llm calls per second>
+    Response: 202 { job_id, status_url, results_url }
+    """
+    api_key = current_app.config.get("GEMINI_API_KEY")
+    if not api_key:
+        return jsonify({"error": "Gemini API key not configured"}), 500
+
+    job_id = request.args.get("job_id") or uuid.uuid4().hex
+    if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", job_id):
+        return jsonify({"error": "Invalid job_id"}), 400
+    _prune_batch_jobs(current_app.config["BATCH_EVAL_JOB_TTL_SECONDS"])
+    if (_BATCH_JOBS.get(job_id) or {}).get("state") == "running":
+        return jsonify({"error": "Job already running", "job_id": job_id}), 409
+
+    try:
+        if request.is_json:
+            interviews = (request.get_json(silent=True) or {}).get("interviews") or []
+        else:
+            interviews = list(read_jsonl(request.get_data(as_text=True).splitlines()))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid JSONL: {e}"}), 400
+    if not isinstance(interviews, list) or not interviews:
+        return jsonify({"error": "No interviews provided"}), 400
+
+    cfg = current_app.config
+    concurrency = min(request.args.get("concurrency", cfg["BATCH_EVAL_CONCURRENCY"], type=int), cfg["BATCH_EVAL_MAX_CONCURRENCY"])
+    rate = request.args.get("rate", cfg["BATCH_EVAL_RATE_PER_SEC"], type=float)
+    output_path = _batch_output_path(job_id)
+    progress = {"state": "running", "started_at": datetime.now().isoformat()}
+    with _BATCH_JOBS_LOCK:
+        _BATCH_JOBS[job_id] = progress
+
+    def _run():
+        try:
+            run_batch(api_key=api_key, interviews=interviews, output_path=output_path,
+                      concurrency=concurrency, rate_per_sec=rate, progress=progress)
+            progress["state"] = "done"
+        except Exception as e:
+            progress.update({"state": "failed", "error": str(e)})
+        progress["finished_at"] = datetime.now().isoformat()
+        progress["_finished"] = time.monotonic()
+
+    threading.Thread(target=_run, daemon=True).start()
+    return jsonify({
+        "job_id": job_id,
+        "status_url": f"/api/evaluation/batch/{job_id}",
+        "results_url": f"/api/evaluation/batch/{job_id}/results",
+    }), 202
+
+
+@evaluation_bp.route("/batch/<job_id>", methods=["GET"])
+def batch_status(job_id):
+    """Progress counters for a batch job; state "finished" means it was rebuilt from the output file."""
+    _prune_batch_jobs(current_app.config["BATCH_EVAL_JOB_TTL_SECONDS"])
+    progress = _BATCH_JOBS.get(job_id)
+    if progress is None:
+        path = _batch_output_path(job_id) if re.fullmatch(r"[A-Za-z0-9_-]{1,64}", job_id) else None
+        if not path or not os.path.exists(path):
+            return jsonify({"error": "Unknown job"}), 404
+        progress = _progress_from_disk(path)
+    return jsonify({"job_id": job_id, **{k: v for k, v in progress.items() if not k.startswith("_")}})
+
+
+@evaluation_bp.route("/batch/<job_id>/results", methods=["GET"])
+def batch_results(job_id):
+    """Results so far as JSONL, one {id, evaluation|error} row per interview."""
+    if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", job_id):
+        return jsonify({"error": "Invalid job_id"}), 400
+    path = _batch_output_path(job_id)
+    if not os.path.exists(path):
+        return jsonify({"error": "Unknown job"}), 404
+    return send_file(path, mimetype="application/x-ndjson", conditional=True)
+
+
 @evaluation_bp.route("/health", methods=["GET"])
 def health_check():
     """Simple health check for the evaluation service."""
@@ -0,0 +1,33 @@
+from flask import Blueprint, jsonify, request
+from ..services.question_bank import QuestionBankError, QuestionUnavailable, get_bank
+
+questions_bp = Blueprint("questions", __name__, url_prefix="/api/questions")
+
+
+@questions_bp.route("", methods=["GET"])
+def list_questions():
+    """Question summaries from the local bank. Query: ?topic=Array&difficulty=Easy"""
+    bank = get_bank()
+    questions = bank.search(topic=request.args.get("topic"), difficulty=request.args.get("difficulty"))
+    return jsonify({"questions": questions, "skipped_files": bank.errors})
+
+
+@questions_bp.route("/<question_id>", methods=["GET"])
+def get_question(question_id):
+    """One question as a candidate may see it (no solution, no tests)."""
+    q = get_bank().public(question_id)
+    if q is None:
+        return jsonify({"error": "Unknown question"}), 404
+    return jsonify(q)
+
+
+@questions_bp.route("/<question_id>/tests", methods=["GET"])
+def question_tests(question_id):
+    """Loads the tests (computing missing reference outputs) so the first Run doesn't pay for it."""
+    try:
+        tests = get_bank().tests(question_id)
+    except QuestionUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    except QuestionBankError as e:
+        return jsonify({"error": str(e)}), 404 if get_bank().get(question_id) is None else 500
+    return jsonify({"id": question_id, "count": len(tests)})
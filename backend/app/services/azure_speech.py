@@ -1,5 +1,11 @@
+import threading
+import time
+
 import requests
+from ..config import Config
+from ..util.metrics import cache_result, timed_upstream
 
+@timed_upstream("azure", "issue_token")
 def issue_token(*, key: str, region: str | None, endpoint: str | None) -> str:
     """
     Issue a short-lived token for Azure Speech SDK browser clients.
@@ -20,4 +26,105 @@ def issue_token(*, key: str, region: str | None, endpoint: str | None) -> str:
     }
     resp = requests.post(url, headers=headers, timeout=10)
     resp.raise_for_status()
-    return resp.text
\ No newline at end of file
+    return resp.text
+
+
+# Process-wide token cache keyed by (key, region, endpoint). Azure STS tokens live ~10 minutes.
+# After each issue a daemon timer re-issues the token at refresh_after, so callers normally
+# find a fresh one even after an idle spell; timers stop once a key has gone unused for
+# AZURE_TOKEN_KEEPALIVE_SECONDS.
+_TOKENS = {}
+_TOKENS_LOCK = threading.Lock()
+_RETRY_SECONDS = 30.0  # proactive refresh failed: try again this soon while the old token lasts
+
+
+def _schedule(entry: dict, delay: float, kwargs: dict):
+    """(Re)arm the entry's proactive refresh timer; caller holds _TOKENS_LOCK."""
+    if entry["timer"] is not None:
+        entry["timer"].cancel()
+    timer = threading.Timer(max(0.0, delay), _proactive_refresh, args=(entry, kwargs))
+    timer.daemon = True
+    entry["timer"] = timer
+    timer.start()
+
+
+def _proactive_refresh(entry: dict, kwargs: dict):
+    with _TOKENS_LOCK:
+        entry["timer"] = None
+        if entry["refreshing"] is not None:
+            return  # a caller-driven refresh is running and will re-arm the timer
+        if time.monotonic() - entry["last_used"] > Config.AZURE_TOKEN_KEEPALIVE_SECONDS:
+            return  # unused for a while; the next caller issues a token on demand
+        done = threading.Event()
+        entry["refreshing"] = done
+    _refresh_token(entry, done, **kwargs)
+
+
+def _refresh_token(entry: dict, done: threading.Event, *, key: str, region: str | None, endpoint: str | None):
+    kwargs = {"key": key, "region": region, "endpoint": endpoint}
+    try:
+        token = issue_token(**kwargs)
+        with _TOKENS_LOCK:
+            entry["token"] = token
+            entry["issued_at"] = time.monotonic()
+            entry["error"] = None
+            _schedule(entry, entry["refresh_after"], kwargs)
+    except Exception as e:
+        with _TOKENS_LOCK:
+            entry["error"] = e
+            left = entry["ttl"] - (time.monotonic() - entry["issued_at"])
+            if entry["token"] and left > _RETRY_SECONDS:
+                _schedule(entry, _RETRY_SECONDS, kwargs)
+    finally:
+        with _TOKENS_LOCK:
+            entry["refreshing"] = None
+        done.set()
+
+
+def get_cached_token(*, key: str, region: str | None, endpoint: str | None,
+                     ttl: float = 540, refresh_after: float = 420) -> str:
+    """
+    Return a cached Azure Speech token, issuing a new one only when needed.
+
+    - Fresh tokens (younger than refresh_after) are returned directly; a timer re-issues
+      them at refresh_after, so this is the usual case.
+    - Tokens past refresh_after but still within ttl (the timer's refresh failed) are
+      returned immediately while a single background refresh runs.
+    - Missing/expired tokens block on one shared in-flight fetch; concurrent callers
+      wait on it rather than each POSTing to STS.
+    """
+    cache_key = (key, region, endpoint)
+    with _TOKENS_LOCK:
+        entry = _TOKENS.setdefault(cache_key, {"token": None, "issued_at": 0.0, "refreshing": None,
+                                               "error": None, "timer": None})
+        entry["ttl"], entry["refresh_after"] = ttl, refresh_after
+        entry["last_used"] = time.monotonic()
+        age = time.monotonic() - entry["issued_at"]
+        token = entry["token"] if entry["token"] and age < ttl else None
+        if token and age < refresh_after:
+            cache_result("azure_token", "hit")
+            return token
+        done = entry["refreshing"]
+        leader = done is None
+        if leader:
+            done = threading.Event()
+            entry["refreshing"] = done
+
+    kwargs = {"key": key, "region": region, "endpoint": endpoint}
+    cache_result("azure_token", "stale" if token else "miss")
+    if token:
+        # Still valid: serve it and let a background thread do the refresh
+        if leader:
+            threading.Thread(target=_refresh_token, args=(entry, done), kwargs=kwargs, daemon=True).start()
+        return token
+
+    if leader:
+        _refresh_token(entry, done, **kwargs)
+    else:
+        done.wait(timeout=15)
+
+    with _TOKENS_LOCK:
+        if entry["token"] and time.monotonic() - entry["issued_at"] < ttl:
+            return entry["token"]
+        err = entry["error"]
+    raise err or TimeoutError("Timed out waiting for Azure token refresh")
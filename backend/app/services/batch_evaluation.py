@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .evaluation_service import analyze_complexity, evaluate_interview
+from ..util.metrics import cache_result
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads (rate <= 0 disables)."""
+
+    def __init__(self, rate_per_sec: float):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec and rate_per_sec > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def record_id(record: dict) -> str:
+    """Stable id for an interview record: its own "id", else a hash of its content."""
+    rid = record.get("id")
+    if rid is not None:
+        return str(rid)
+    blob = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def load_checkpoint(output_path: str) -> set:
+    """Ids already scored successfully in a previous run of the same output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            if row.get("id") is not None and not row.get("error"):
+                done.add(row["id"])
+    return done
+
+
+def read_jsonl(path_or_lines):
+    """Yield dicts from a JSONL file path or an iterable of lines, skipping blanks."""
+    if isinstance(path_or_lines, str):
+        with open(path_or_lines, "r", encoding="utf-8") as f:
+            yield from read_jsonl(f)
+        return
+    for line in path_or_lines:
+        line = line.strip() if isinstance(line, str) else line.decode("utf-8").strip()
+        if line:
+            yield json.loads(line)
+
+
+class _ComplexityCache:
+    """Single-flight memo of analyze_complexity keyed by (language, code)."""
+
+    def __init__(self, api_key: str, limiter: RateLimiter):
+        self.api_key = api_key
+        self.limiter = limiter
+        self._results = {}
+        self._events = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def get(self, code: str, language: str) -> dict:
+        key = hashlib.sha256(f"{language}\0{code}".encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._results:
+                self.hits += 1
+                cache_result("complexity", "hit")
+                return self._results[key]
+            event = self._events.get(key)
+            leader = event is None
+            if leader:
+                event = self._events[key] = threading.Event()
+        if not leader:
+            event.wait()
+            with self._lock:
+                self.hits += 1
+                cache_result("complexity", "hit")
+                return self._results[key]
+        cache_result("complexity", "miss")
+        try:
+            self.limiter.acquire()
+            result = analyze_complexity(api_key=self.api_key, code_submission=code, language=language)
+        except Exception as e:
+            result = {"time_complexity": "Analysis failed", "space_complexity": "Analysis failed", "error": str(e)}
+        with self._lock:
+            self._results[key] = result
+            del self._events[key]
+        event.set()
+        return result
+
+
+def run_batch(*, api_key: str, interviews, output_path: str, concurrency: int = 4,
+              rate_per_sec: float = 0.0, progress: dict | None = None) -> dict:
+    """
+    Score many interviews and append one JSONL row per interview to output_path.
+
+    Rows already present (without "error") in output_path are skipped, so re-running
+    with the same output resumes where the last run stopped. `progress`, if given, is
+    updated in place for callers polling from another thread.
+
+    Returns: { total, skipped, succeeded, failed, complexity_cache_hits }
+    """
+    limiter = RateLimiter(rate_per_sec)
+    complexity = _ComplexityCache(api_key, limiter)
+    done = load_checkpoint(output_path)
+    stats = progress if progress is not None else {}
+    stats.update({"total": 0, "skipped": 0, "succeeded": 0, "failed": 0, "complexity_cache_hits": 0})
+    write_lock = threading.Lock()
+    # Bound queued work so huge inputs aren't read into memory all at once
+    slots = threading.BoundedSemaphore(max(1, concurrency) * 2)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    out = open(output_path, "a", encoding="utf-8")
+
+    def _score(rid: str, record: dict):
+        try:
+            code = record.get("code_submission", "")
+            language = record.get("language", "python")
+            analysis = complexity.get(code, language)
+            limiter.acquire()
+            evaluation = evaluate_interview(
+                api_key=api_key,
+                transcript=record.get("transcript", []),
+                code_submission=code,
+                test_results=record.get("test_results", {}),
+                language=language,
+                question=record.get("question", {}),
+                complexity_analysis=analysis,
+            )
+            row = {"id": rid, "evaluation": evaluation}
+            if evaluation.get("error"):
+                row["error"] = evaluation["error"]
+        except Exception as e:
+            row = {"id": rid, "error": f"Evaluation failed: {e}"}
+        finally:
+            slots.release()
+        with write_lock:
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+            stats["failed" if row.get("error") else "succeeded"] += 1
+            stats["complexity_cache_hits"] = complexity.hits
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            for record in interviews:
+                stats["total"] += 1
+                rid = record_id(record)
+                if rid in done:
+                    stats["skipped"] += 1
+                    continue
+                done.add(rid)  # dedupe repeated ids within the same input
+                slots.acquire()
+                pool.submit(_score, rid, record)
+    finally:
+        out.close()
+    return dict(stats)
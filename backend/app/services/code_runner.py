@@ -0,0 +1,213 @@
+import hashlib
+import json
+from collections import deque
+
+from ..language_versions import LANGUAGE_VERSIONS
+from ..util.execute_utils import (
+    get_test_cases, run_test_batch, run_profile, preflight_compile, compile_error_result, infra_error_result
+)
+from ..util.admission import Saturated
+from ..util.harnesses import build_files, is_batched
+from ..util.executor_health import ExecutorUnavailable
+from ..util.executor_pool import get_pool
+from ..util.singleflight import SingleFlight, canonical_key
+from . import profiling, run_order
+
+# Identical runs in flight at the same time (double-clicked Run, client retries) share one execution
+_RUNS = SingleFlight("code_run")
+
+
+def execute_run(data: dict, on_result=None, client_id: str | None = None):
+    """
+    Run a /api/code/run payload against the executor pool.
+
+    Shared by the synchronous route and background run jobs, so it never touches the
+    Flask request. on_result(done, total, result) is called after each test, if given.
+    client_id is the fair-queueing key for executor dispatches and keys the test history
+    that orders stop_on_fail runs (results are still returned in the given order).
+    data["profile"] (a test id, or true for the first TLE / slowest test) adds a profiler
+    report to that test's result; Python only.
+
+    Returns: (body dict, HTTP status). Raises Saturated if no executor slot frees up in time.
+    """
+    code = data.get("code", "")
+    language = data.get("language", "python")
+    version = LANGUAGE_VERSIONS.get(language, "")
+    # Client-supplied piston_url is ignored unless PISTON_ALLOW_CLIENT_URL is set
+    pool = get_pool(data.get("piston_url"))
+    run_timeout = int(data.get("timeout", 10000))
+    default_checker = data.get("checker", "deep_equal")
+    func_name = data.get("function")
+    stop_on_fail = bool(data.get("stop_on_fail", False))
+
+    test_case_url = data.get("test_cases")
+    tests = get_test_cases(test_case_url) if test_case_url else (data.get("tests") or [])
+    if not isinstance(tests, list):
+        return {"error": "tests must be a list"}, 400
+
+    if not code or not func_name:
+        return {"error": "code and function are required"}, 400
+
+    try:
+        files = build_files(language, code, func_name)
+    except Exception as e:
+        return {"error": f"prep_code failed: {e}"}, 500
+    if files is None:
+        return {"error": f"Unsupported language: {language}"}, 400
+
+    def _compile_error_response(error):
+        return {
+            "summary": {"passed": 0, "total": len(tests), "compile_error": True},
+            "results": [compile_error_result(error, default_checker)],
+        }, 200
+
+    history = run_order.history_key(client_id, data, tests)
+    # Dispatch order; with stop_on_fail, known failures and cheap tests go first
+    order = run_order.order(history, tests) if stop_on_fail and history else list(range(len(tests)))
+    ordered = [tests[i] for i in order]
+
+    if is_batched(language):
+        # The whole suite goes out in one request, so its compile stage is the preflight
+        batches = [ordered] if ordered else []
+    else:
+        # Fail fast on broken source instead of burning one sandbox run per test
+        try:
+            if language == "python":
+                # Compiled locally; no executor slot needed
+                compile_error = preflight_compile(None, language, version, files, func_name, default_checker, run_timeout)
+            else:
+                compile_error = pool.run(lambda url: preflight_compile(
+                    url, language, version, files,
+                    func_name, default_checker, run_timeout
+                ), client_id=client_id)
+        except ExecutorUnavailable:
+            compile_error = None  # let the test dispatch report the infrastructure error
+        if compile_error:
+            return _compile_error_response(compile_error)
+        batches = [[t] for t in ordered]
+
+    aggregated = []  # in dispatch order: aggregated[k] is the result for tests[order[k]]
+    passed = 0
+    infra_errors = 0
+
+    def _finish():
+        ran = order[:len(aggregated)]
+        run_order.record(history, tests, ran, aggregated, run_timeout)
+        summary = {"passed": passed, "total": len(aggregated), "infra_errors": infra_errors}
+        results = [res for _, res in sorted(zip(ran, aggregated), key=lambda p: p[0])]
+        if data.get("profile"):
+            _attach_profile(results, summary)
+        return {"summary": summary, "results": results}, 200
+
+    def _attach_profile(results, summary):
+        if language != "python":
+            summary["profile_error"] = "Profiling is only available for Python"
+            return
+        test = profiling.pick_test(data["profile"], tests, results)
+        if test is None:
+            summary["profile_error"] = "No test to profile"
+            return
+        try:
+            report = pool.run(lambda url: run_profile(
+                url, language, version, files, func_name, test, run_timeout, profiling.options(run_timeout)
+            ), client_id=client_id)
+        except Saturated:
+            raise
+        except Exception as e:
+            summary["profile_error"] = f"Profiler run failed: {e}"
+            return
+        text = profiling.summarize(report, test.get("id"))
+        summary["profile"] = {"test": test.get("id"), "summary": text}
+        for res in results:
+            if str(res.get("id")) == str(test.get("id")):
+                res["profile"] = report
+        profiling.record(client_id, code, language, text)
+
+    # Python runs one test per request; once the executor's circuit opens,
+    # run_test_batch raises immediately, so the remaining tests fast-fail.
+    # Entries are (batch, isolate_first): a re-dispatched tail follows tests that did run,
+    # so a crash before its first result is pinned on that test, not the whole tail
+    pending = deque((b, False) for b in batches)
+    while pending:
+        batch, isolate_first = pending.popleft()
+        try:
+            results = pool.run(lambda url: run_test_batch(
+                url, language, version, files,
+                func_name, batch, default_checker, run_timeout, isolate_first
+            ), client_id=client_id)
+        except Saturated:
+            raise  # no executor slot within the queue timeout: 429 + Retry-After, not per-test errors
+        except ExecutorUnavailable as e:
+            results = [infra_error_result(t, default_checker, e) for t in batch]
+        except Exception as e:
+            results = [infra_error_result(t, default_checker, f"Piston request failed: {e}") for t in batch]
+
+        if results and results[0].get("compile_error"):
+            return _compile_error_response(results[0]["error"].removeprefix("Compile error: "))
+        if len(results) < len(batch):
+            # The run was killed partway; finished verdicts stand, only the rest goes out again
+            pending.appendleft((batch[len(results):], True))
+
+        for res in results:
+            if res.get("ok"):
+                passed += 1
+            if res.get("infra_error"):
+                infra_errors += 1
+            aggregated.append(res)
+            if on_result:
+                on_result(len(aggregated), len(tests), res)
+            if stop_on_fail and not res.get("ok") and not res.get("infra_error"):
+                return _finish()
+
+    return _finish()
+
+
+def _lean_value(value, max_chars: int):
+    text = json.dumps(value, separators=(",", ":"), default=str)
+    if len(text) <= max_chars:
+        return value
+    return {"truncated": text[:max_chars], "chars": len(text), "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]}
+
+
+def shape_run_body(body: dict, fields: str | None, value_chars: int) -> dict:
+    """
+    Trim a run response for the client. fields="lean" drops expected/got/checker from
+    passing tests and replaces long values in failing ones with
+    {"truncated", "chars", "sha256"}; a comma-separated list keeps only those result keys
+    (plus id). Summary is untouched.
+    """
+    if not fields or not isinstance(body.get("results"), list):
+        return body
+    if fields == "lean":
+        results = []
+        for r in body["results"]:
+            if r.get("ok"):
+                r = {k: v for k, v in r.items() if k not in ("expected", "got", "checker")}
+            else:
+                r = {k: (_lean_value(v, value_chars) if k in ("expected", "got", "input") else v) for k, v in r.items()}
+            results.append(r)
+    else:
+        keep = {f.strip() for f in fields.split(",")} | {"id"}
+        results = [{k: v for k, v in r.items() if k in keep} for r in body["results"]]
+    return {**body, "results": results}
+
+
+def run_key(data: dict) -> str:
+    """Canonical hash of everything in a run payload that affects its result."""
+    return canonical_key(
+        data.get("code", ""), data.get("tests"), data.get("test_cases"), data.get("language", "python"),
+        data.get("checker", "deep_equal"), data.get("function"), data.get("timeout", 10000),
+        bool(data.get("stop_on_fail", False)), data.get("piston_url"), data.get("profile"),
+    )
+
+
+def execute_run_coalesced(data: dict, client_id: str | None = None):
+    """
+    execute_run, but concurrent identical payloads wait on one run and share its result.
+    stop_on_fail and profile runs depend on the client (dispatch order, recorded history and
+    profile summary), so those only coalesce within one client.
+    """
+    key = run_key(data)
+    if data.get("stop_on_fail") or data.get("profile"):
+        key = canonical_key(key, client_id)
+    return _RUNS.do(key, lambda: execute_run(data, client_id=client_id))
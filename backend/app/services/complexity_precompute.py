@@ -0,0 +1,81 @@
+"""
+Complexity analysis computed during the interview instead of at submit time.
+
+update_context arms a per-client debounce; once the code has been unchanged for
+COMPLEXITY_PRECOMPUTE_DEBOUNCE_SECONDS, analyze_complexity runs in the background and the
+result is stored by hash of (language, code). /api/evaluation/evaluate looks the final
+submission up and, on a match (or an analysis still in flight for it), hands the result
+to evaluate_interview so submit needs only the rubric call.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from ..config import Config
+from ..util.admission import get_scheduler
+from ..util.debounce import Debouncer
+from ..util.metrics import cache_result, inc
+from .evaluation_service import analyze_complexity
+
+_RESULTS = OrderedDict()  # code hash -> (stored_at, analysis)
+_IN_FLIGHT = {}           # code hash -> Event set when the analysis finishes
+_DEBOUNCE = Debouncer()   # keyed by client_id
+_LOCK = threading.Lock()
+
+
+def code_hash(code: str, language: str) -> str:
+    return hashlib.sha256(f"{language}\0{(code or '').strip()}".encode("utf-8")).hexdigest()
+
+
+def _compute(generation: int, client_id: str, code: str, language: str):
+    key = code_hash(code, language)
+    with _LOCK:
+        if key in _RESULTS or key in _IN_FLIGHT or not _DEBOUNCE.is_current(client_id, generation):
+            return
+        done = _IN_FLIGHT[key] = threading.Event()
+    try:
+        gemini = get_scheduler("gemini")
+        if gemini.saturated():
+            # Interviewer replies come first; the evaluation can still compute it at submit
+            inc("interviewly_complexity_precompute_total", outcome="skipped")
+            return
+        with gemini.slot(f"precompute:{client_id}"):
+            analysis = analyze_complexity(api_key=Config.GEMINI_API_KEY, code_submission=code, language=language)
+        with _LOCK:
+            _RESULTS[key] = (time.monotonic(), analysis)
+            while len(_RESULTS) > Config.COMPLEXITY_PRECOMPUTE_MAX_RESULTS:
+                _RESULTS.popitem(last=False)
+        inc("interviewly_complexity_precompute_total", outcome="completed")
+    except Exception:
+        inc("interviewly_complexity_precompute_total", outcome="failed")
+    finally:
+        with _LOCK:
+            _IN_FLIGHT.pop(key, None)
+        done.set()
+
+
+def code_changed(client_id: str, code: str, language: str):
+    """Re-arm the client's debounce timer for new editor contents."""
+    if not Config.COMPLEXITY_PRECOMPUTE or not Config.GEMINI_API_KEY or not client_id:
+        return
+    if not (code or "").strip():
+        _DEBOUNCE.cancel(client_id)
+        return
+    _DEBOUNCE.trigger(client_id, Config.COMPLEXITY_PRECOMPUTE_DEBOUNCE_SECONDS, _compute, client_id, code, language)
+
+
+def lookup(code: str, language: str, wait: float = 0.0):
+    """Stored analysis for this exact code, waiting up to `wait` seconds for one in flight."""
+    key = code_hash(code, language)
+    with _LOCK:
+        hit = _RESULTS.get(key)
+        pending = _IN_FLIGHT.get(key)
+    if hit is None and pending is not None and wait > 0:
+        pending.wait(timeout=wait)
+        with _LOCK:
+            hit = _RESULTS.get(key)
+    if hit and time.monotonic() - hit[0] > Config.COMPLEXITY_PRECOMPUTE_TTL_SECONDS:
+        hit = None
+    cache_result("complexity_precompute", "hit" if hit else "miss")
+    return hit[1] if hit else None
@@ -1,5 +1,14 @@
 import json
-from .gemini import analyze_with_gemini
+from ..config import Config
+from .profiling import summarize as summarize_profile
+from .prompt_budget import compact_test_results, estimate_tokens, fit_sections
+from .structured_output import (
+    COMPLEXITY_SCHEMA, EVALUATION_SCHEMA, StructuredOutputError, generate_structured, validate_evaluation
+)
+
+# Part of the stored-evaluation key (see evaluation_store); bump when the rubric, prompts or
+# model change so earlier scores aren't served for the new scheme
+RUBRIC_VERSION = "lebron-1"
 
 TIME_COMPLEXITY_PROMPT = """You are an expert in algorithm analysis.
 Analyze the following code and output ONLY the time complexity and space complexity in Big-O notation as JSON. ONLY return the output JSON. Do NOT output any text along with it.
@@ -37,6 +46,9 @@ def analyze_complexity(*, api_key: str, code_submission: str, language: str) ->
         
     Returns:
         Dictionary containing time_complexity and space_complexity
+
+    Raises:
+        StructuredOutputError: if the response doesn't match COMPLEXITY_SCHEMA
     """
     if not api_key:
         raise ValueError("Missing GEMINI_API_KEY")
@@ -47,77 +59,26 @@ def analyze_complexity(*, api_key: str, code_submission: str, language: str) ->
         code=code_submission
     )
     
-    try:
-        response = analyze_with_gemini(
-            api_key=api_key,
-            model_name="gemini-1.5-flash",
-            system_prompt=(
-                "You are an expert algorithm analyst. Analyze code complexity and return only valid JSON in the exact format specified. "
-                "Do not include any explanatory text, markdown formatting, or code blocks - just the raw JSON object. "
-                "When assessing space, prefer the actual auxiliary usage of the code; do not assume O(1) is optimal where a hash/map is used for optimal time (e.g., Two Sum)."
-            ),
-            messages=[{"role": "user", "content": complexity_prompt}],
-            temperature=0.1,
-            top_p=0.95,
-            top_k=40,
-            max_tokens=512
-        )
-        
-        # Parse the JSON response
-        try:
-            # Clean the response - remove any markdown code block markers
-            cleaned_response = response.strip()
-            
-            # Remove markdown code block markers if present
-            if cleaned_response.startswith("```json"):
-                cleaned_response = cleaned_response[7:]
-            if cleaned_response.startswith("```"):
-                cleaned_response = cleaned_response[3:]
-            if cleaned_response.endswith("```"):
-                cleaned_response = cleaned_response[:-3]
-                
-            cleaned_response = cleaned_response.strip()
-            
-            complexity_result = json.loads(cleaned_response)
-            return complexity_result
-        except json.JSONDecodeError as e:
-            # If parsing fails, try to extract JSON using regex
-            try:
-                import re
-                # Look for JSON object in the response
-                json_match = re.search(r'\{[^{}]*"time_complexity"[^{}]*"space_complexity"[^{}]*\}', response, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group()
-                    complexity_result = json.loads(json_str)
-                    return complexity_result
-                else:
-                    # If still no match, try a broader search
-                    json_match = re.search(r'\{.*?\}', response, re.DOTALL)
-                    if json_match:
-                        json_str = json_match.group()
-                        complexity_result = json.loads(json_str)
-                        # Validate it has the required fields
-                        if "time_complexity" in complexity_result and "space_complexity" in complexity_result:
-                            return complexity_result
-            except:
-                pass
-            
-            # If all parsing attempts fail, return default values
-            return {
-                "time_complexity": "Not determined",
-                "space_complexity": "Not determined"
-            }
-            
-    except Exception as e:
-        print(f"Complexity analysis error: {str(e)}")
-        print(f"Response was: {response[:200] if 'response' in locals() else 'No response'}")
-        return {
-            "time_complexity": "Analysis failed",
-            "space_complexity": "Analysis failed"
-        }
+    # JSON mode + schema; raises StructuredOutputError rather than guessing
+    return generate_structured(
+        api_key=api_key,
+        model_name="gemini-1.5-flash",
+        system_prompt=(
+            "You are an expert algorithm analyst. Analyze code complexity and return only valid JSON in the exact format specified. "
+            "Do not include any explanatory text, markdown formatting, or code blocks - just the raw JSON object. "
+            "When assessing space, prefer the actual auxiliary usage of the code; do not assume O(1) is optimal where a hash/map is used for optimal time (e.g., Two Sum)."
+        ),
+        messages=[{"role": "user", "content": complexity_prompt}],
+        schema=COMPLEXITY_SCHEMA,
+        temperature=0.1,
+        top_p=0.95,
+        top_k=40,
+        max_tokens=512
+    )
 
 def evaluate_interview(*, api_key: str, transcript: list, code_submission: str, 
-                      test_results: dict, language: str, question: dict) -> dict:
+                      test_results: dict, language: str, question: dict,
+                      complexity_analysis: dict | None = None, token_budget: int | None = None) -> dict:
     """
     Evaluate an interview using Gemini with the LeBron James rubric.
     
@@ -128,17 +89,21 @@ def evaluate_interview(*, api_key: str, transcript: list, code_submission: str,
         test_results: Test execution results with pass/fail information
         language: Programming language used
         question: Question details including optimal complexity
+        complexity_analysis: Precomputed analyze_complexity result; skips that LLM call
+        token_budget: Tokens shared by transcript, code and test details
+            (default EVAL_PROMPT_TOKEN_BUDGET)
         
     Returns:
-        Dictionary containing evaluation scores and feedback
+        Dictionary containing evaluation scores and feedback, plus "prompt_compaction"
+        describing what was summarized or cut to fit the budget
     """
     
     if not api_key:
         raise ValueError("Missing GEMINI_API_KEY")
     
-    # First, analyze the code complexity
+    # First, analyze the code complexity (unless the caller already did)
     try:
-        complexity_analysis = analyze_complexity(
+        complexity_analysis = complexity_analysis or analyze_complexity(
             api_key=api_key,
             code_submission=code_submission,
             language=language
@@ -147,12 +112,13 @@ def evaluate_interview(*, api_key: str, transcript: list, code_submission: str,
         print(f"Complexity analysis failed: {str(e)}")
         complexity_analysis = {
             "time_complexity": "Analysis failed",
-            "space_complexity": "Analysis failed"
+            "space_complexity": "Analysis failed",
+            "error": str(e),
         }
     
     # Extract complexity information
-    candidate_time = complexity_analysis.get("time_complexity", "Not determined")
-    candidate_space = complexity_analysis.get("space_complexity", "Not determined")
+    candidate_time = complexity_analysis["time_complexity"]
+    candidate_space = complexity_analysis["space_complexity"]
     
     # Format transcript for evaluation
     transcript_text = ""
@@ -166,9 +132,31 @@ def evaluate_interview(*, api_key: str, transcript: list, code_submission: str,
     passed_tests = test_results.get("summary", {}).get("passed", 0)
     pass_rate = (passed_tests / total_tests * 100) if total_tests > 0 else 0
     
-    # Format test results
-    test_details = test_results.get("results", [])
+    # Format test results: passing tests in aggregate, failing ones with truncated values
+    test_details = test_results.get("results", []) or []
     test_summary = f"Passed {passed_tests}/{total_tests} tests ({pass_rate:.1f}%)"
+    test_details_text = compact_test_results(
+        test_details,
+        max_failures=Config.EVAL_MAX_FAILED_CASES,
+        value_chars=Config.EVAL_VALUE_MAX_CHARS,
+    )
+
+    # Transcript, code and tests share one token budget so prompt size stays bounded
+    fitted, compaction = fit_sections(
+        {"transcript": transcript_text, "code": code_submission, "tests": test_details_text},
+        token_budget or Config.EVAL_PROMPT_TOKEN_BUDGET,
+    )
+    compaction["test_details_raw_tokens"] = estimate_tokens(json.dumps(test_details, default=str))
+
+    # Measured hot spots from a profiler run, if the candidate's last run asked for one
+    profile_text = "\n".join(filter(None, (
+        summarize_profile(r["profile"], r.get("id")) for r in test_details
+        if isinstance(r, dict) and isinstance(r.get("profile"), dict)
+    )))
+    profile_block = (
+        f"Measured profile (from running the code; evidence for the complexity category):\n{profile_text}\n"
+        if profile_text else ""
+    )
     
     # Get question details
     optimal_time = question.get("optimal_time_complexity", "O(n)")
@@ -181,6 +169,7 @@ def evaluate_interview(*, api_key: str, transcript: list, code_submission: str,
     q_function = question.get("function", "")
     q_difficulty = question.get("difficulty", "")
     q_topics = question.get("topics", []) or []
+    constraints_text = "\n".join(q_constraints)
 
     # The "solution" field could be a map with approach/code/language
     solution = question.get("solution", "No solution provided")
@@ -198,30 +187,31 @@ def evaluate_interview(*, api_key: str, transcript: list, code_submission: str,
     # Create the evaluation prompt
     evaluation_prompt = f"""
 TRANSCRIPT:
-{transcript_text}
+{fitted["transcript"]}
 
 CODE SUBMISSION (Language: {language}):
 ```{language}
-{code_submission}
+{fitted["code"]}
 ```
 
 TEST RESULTS:
 {test_summary}
-Details: {json.dumps(test_details, indent=2)}
+Details:
+{fitted["tests"]}
 
 COMPLEXITY ANALYSIS:
 Optimal Time Complexity: {optimal_time}
 Optimal Space Complexity: {optimal_space}
 Candidate Time Complexity: {candidate_time}
 Candidate Space Complexity: {candidate_space}
-
+{profile_block}
 QUESTION DETAILS:
 Title: {q_title}
 Difficulty: {q_difficulty}
 Topics: {", ".join(q_topics)}
 Function Signature: {q_function}({", ".join(q_args)})
 Prompt: {q_prompt}
-Constraints:\n{"\n".join(q_constraints)}
+Constraints:\n{constraints_text}
 
 OFFICIAL SOLUTION AND APPROACH (for rubric reference):
 {solution_text}
@@ -345,54 +335,28 @@ OUTPUT JSON FORMAT:
 }"""
 
     try:
-        # Call Gemini with the evaluation prompt
-        response = analyze_with_gemini(
+        # Call Gemini with the evaluation prompt in JSON mode
+        evaluation = generate_structured(
             api_key=api_key,
             model_name="gemini-1.5-flash",
             system_prompt=system_prompt,
             messages=[{"role": "user", "content": evaluation_prompt}],
+            schema=EVALUATION_SCHEMA,
+            validator=validate_evaluation,
             temperature=0.1,  # Low temperature for consistent evaluation
             top_p=0.95,
             top_k=40,
             max_tokens=2048
         )
-        
-        # Parse the JSON response
-        try:
-            # Clean the response - remove any markdown code block markers
-            cleaned_response = response.strip()
-            
-            # Remove markdown code block markers if present
-            if cleaned_response.startswith("```json"):
-                cleaned_response = cleaned_response[7:]  # Remove ```json
-            if cleaned_response.startswith("```"):
-                cleaned_response = cleaned_response[3:]   # Remove ```
-            if cleaned_response.endswith("```"):
-                cleaned_response = cleaned_response[:-3]  # Remove trailing ```
-                
-            cleaned_response = cleaned_response.strip()
-            
-            evaluation_result = json.loads(cleaned_response)
-            return evaluation_result
-        except json.JSONDecodeError as e:
-            # If response still isn't valid JSON, try to extract JSON from the response
-            try:
-                # Look for JSON object in the response
-                import re
-                json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group()
-                    evaluation_result = json.loads(json_str)
-                    return evaluation_result
-                else:
-                    raise e
-            except:
-                # If all parsing attempts fail, wrap it
-                return {
-                    "error": "Failed to parse evaluation response",
-                    "raw_response": response,
-                    "parse_error": str(e)
-                }
-            
+        evaluation["prompt_compaction"] = compaction
+        return evaluation
+    except StructuredOutputError as e:
+        # Surface the unparseable response instead of inventing scores
+        return {
+            "error": "Failed to parse evaluation response",
+            "raw_response": e.raw_response,
+            "parse_error": str(e),
+            "prompt_compaction": compaction,
+        }
     except Exception as e:
-        raise Exception(f"Evaluation failed: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Evaluation failed: {str(e)}")
@@ -0,0 +1,188 @@
+"""
+Idempotent evaluations for /api/evaluation/evaluate.
+
+Each submission gets a key: the client's Idempotency-Key if it sent one, else a hash of
+(transcript, code, language, test results, question, RUBRIC_VERSION). The first request
+for a key claims it and runs evaluate_interview; retries get the stored result, and a
+duplicate arriving while it runs waits for it (same process: SingleFlight; other
+processes: polling the claim, which expires after EVAL_STORE_LEASE_SECONDS).
+
+Two stores:
+  sqlite  - survives restarts, shared by every worker process on the host (EVAL_STORE_SQLITE_PATH)
+  memory  - per process
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from ..config import Config
+from ..util.metrics import cache_result
+from ..util.singleflight import SingleFlight, canonical_key
+from .evaluation_service import RUBRIC_VERSION
+
+
+class IdempotencyConflict(Exception):
+    """An Idempotency-Key was reused for a different submission."""
+
+
+class EvaluationInProgress(Exception):
+    """Another worker is still evaluating this submission."""
+
+
+class MemoryEvaluationStore:
+    def __init__(self):
+        self._rows = {}  # key -> {"request_hash", "result", "claimed_at", "finished_at"}
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, request_hash: str, lease: float):
+        """("done", result) | ("claimed", None) for the caller to evaluate | ("running", None)."""
+        now = time.time()
+        with self._lock:
+            row = self._rows.get(key)
+            if row and row["request_hash"] != request_hash:
+                raise IdempotencyConflict(key)
+            if row and row["finished_at"]:
+                return "done", row["result"]
+            if row and now - row["claimed_at"] < lease:
+                return "running", None
+            self._rows[key] = {"request_hash": request_hash, "result": None, "claimed_at": now, "finished_at": None}
+            return "claimed", None
+
+    def finish(self, key: str, result: dict):
+        with self._lock:
+            self._rows[key].update(result=result, finished_at=time.time())
+
+    def release(self, key: str):
+        with self._lock:
+            row = self._rows.get(key)
+            if row and not row["finished_at"]:
+                del self._rows[key]
+
+    def purge(self, ttl: float):
+        cutoff = time.time() - ttl
+        with self._lock:
+            for key in [k for k, r in self._rows.items() if r["finished_at"] and r["finished_at"] < cutoff]:
+                del self._rows[key]
+
+
+class SqliteEvaluationStore:
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self._connect()) as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS evaluations (
+                    key TEXT PRIMARY KEY, request_hash TEXT, result TEXT,
+                    claimed_at REAL, finished_at REAL
+                )""")
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def claim(self, key: str, request_hash: str, lease: float):
+        now = time.time()
+        with closing(self._connect()) as db:
+            # IMMEDIATE so two workers can't both take an unclaimed or expired key
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT request_hash, result, claimed_at, finished_at FROM evaluations WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[0] != request_hash:
+                    raise IdempotencyConflict(key)
+                if row and row[3]:
+                    return "done", json.loads(row[1])
+                if row and now - row[2] < lease:
+                    return "running", None
+                db.execute(
+                    "INSERT OR REPLACE INTO evaluations (key, request_hash, result, claimed_at, finished_at) "
+                    "VALUES (?, ?, NULL, ?, NULL)",
+                    (key, request_hash, now),
+                )
+                return "claimed", None
+            finally:
+                db.execute("COMMIT")
+
+    def finish(self, key: str, result: dict):
+        with closing(self._connect()) as db:
+            db.execute("UPDATE evaluations SET result = ?, finished_at = ? WHERE key = ?", (json.dumps(result), time.time(), key))
+
+    def release(self, key: str):
+        with closing(self._connect()) as db:
+            db.execute("DELETE FROM evaluations WHERE key = ? AND finished_at IS NULL", (key,))
+
+    def purge(self, ttl: float):
+        with closing(self._connect()) as db:
+            db.execute("DELETE FROM evaluations WHERE finished_at IS NOT NULL AND finished_at < ?", (time.time() - ttl,))
+
+
+_STORE = None
+_INIT_LOCK = threading.Lock()
+_EVALUATIONS = SingleFlight("evaluation")
+_last_purge = 0.0
+
+
+def get_store():
+    global _STORE
+    with _INIT_LOCK:
+        if _STORE is None:
+            if Config.EVAL_STORE_BACKEND == "memory":
+                _STORE = MemoryEvaluationStore()
+            else:
+                _STORE = SqliteEvaluationStore(Config.EVAL_STORE_SQLITE_PATH)
+        return _STORE
+
+
+def submission_hash(*, transcript, code_submission, language, test_results, question) -> str:
+    return canonical_key(transcript, code_submission, language, test_results, question, RUBRIC_VERSION)
+
+
+def evaluation_key(idempotency_key: str | None, request_hash: str) -> str:
+    return canonical_key("idempotency-key", idempotency_key) if idempotency_key else request_hash
+
+
+def evaluate_once(key: str, request_hash: str, evaluate):
+    """
+    The stored evaluation for key, or evaluate() run once and stored.
+
+    Returns (result, replayed). Results with an "error" (e.g. an unparseable model
+    response) aren't stored, so a retry gets a fresh attempt.
+    """
+    # request_hash too, so a reused Idempotency-Key with a different body hits the conflict check
+    return _EVALUATIONS.do(f"{key}:{request_hash}", lambda: _evaluate_once(key, request_hash, evaluate))
+
+
+def _evaluate_once(key: str, request_hash: str, evaluate):
+    global _last_purge
+    store = get_store()
+    if time.monotonic() - _last_purge > 300:
+        _last_purge = time.monotonic()
+        store.purge(Config.EVAL_STORE_TTL_SECONDS)
+
+    deadline = time.monotonic() + Config.EVAL_STORE_WAIT_SECONDS
+    while True:
+        state, result = store.claim(key, request_hash, Config.EVAL_STORE_LEASE_SECONDS)
+        if state == "done":
+            cache_result("evaluation_store", "hit")
+            return result, True
+        if state == "claimed":
+            break
+        # Another process is evaluating the same submission
+        if time.monotonic() >= deadline:
+            raise EvaluationInProgress(key)
+        time.sleep(0.5)
+
+    cache_result("evaluation_store", "miss")
+    try:
+        result = evaluate()
+    except BaseException:
+        store.release(key)
+        raise
+    if isinstance(result, dict) and not result.get("error"):
+        store.finish(key, result)
+    else:
+        store.release(key)
+    return result, False
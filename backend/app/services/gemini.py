@@ -1,4 +1,32 @@
-import google.generativeai as genai
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from ..config import Config
+from ..util.metrics import inc, timed_upstream
+
+# google.generativeai costs hundreds of ms and tens of MB to import; load it on first use
+_genai = None
+_configured = None  # (api_key, endpoint) last passed to genai.configure
+_INIT_LOCK = threading.Lock()
+
+
+def _client(api_key: str):
+    """Import and configure the SDK once per (key, endpoint); returns the genai module."""
+    global _genai, _configured
+    endpoint = Config.GEMINI_API_ENDPOINT
+    with _INIT_LOCK:
+        if _genai is None:
+            import google.generativeai as genai
+            _genai = genai
+        if _configured != (api_key, endpoint):
+            if endpoint:
+                # Alternate endpoint (e.g. the benchmark stub); REST so plain http:// works
+                _genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+            else:
+                _genai.configure(api_key=api_key)
+            _configured = (api_key, endpoint)
+    return _genai
+
 
 def _to_gemini_contents(messages):
     """
@@ -13,13 +41,15 @@ def _to_gemini_contents(messages):
             out.append({"role": role, "parts": [{"text": text}]})
     return out
 
+@timed_upstream("gemini", "generate")
 def analyze_with_gemini(*, api_key: str, model_name: str, system_prompt: str,
                         messages: list, temperature: float, top_p: float,
-                        top_k: int, max_tokens: int) -> str:
+                        top_k: int, max_tokens: int, response_mime_type: str | None = None,
+                        response_schema: dict | None = None, timeout: float | None = None) -> str:
     if not api_key:
         raise ValueError("Missing GEMINI_API_KEY")
 
-    genai.configure(api_key=api_key)
+    genai = _client(api_key)
 
     generation_config = {
         "temperature": temperature,
@@ -27,6 +57,11 @@ def analyze_with_gemini(*, api_key: str, model_name: str, system_prompt: str,
         "top_k": top_k,
         "max_output_tokens": max_tokens,
     }
+    # Structured-output mode: ask Gemini for JSON constrained by a schema
+    if response_mime_type:
+        generation_config["response_mime_type"] = response_mime_type
+    if response_schema:
+        generation_config["response_schema"] = response_schema
 
     # Use system_instruction so frontend never needs to send a prompt
     model = genai.GenerativeModel(
@@ -36,5 +71,102 @@ def analyze_with_gemini(*, api_key: str, model_name: str, system_prompt: str,
     )
 
     contents = _to_gemini_contents(messages)
-    resp = model.generate_content(contents)
-    return (getattr(resp, "text", None) or "").strip()
\ No newline at end of file
+    # Explicit deadline; the SDK's default would let one slow reply hold a worker for minutes
+    resp = model.generate_content(contents, request_options={"timeout": timeout or Config.GEMINI_TIMEOUT_SECONDS})
+    return (getattr(resp, "text", None) or "").strip()
+
+
+# Routing tiers: short interviewer turns go to the fast model, code reviews to the strong one.
+# Each tier's alternate is the other model, used for hedging.
+_HEDGES = None
+_HEDGES_LOCK = threading.Lock()
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    global _HEDGES
+    with _HEDGES_LOCK:
+        if _HEDGES is None:
+            _HEDGES = ThreadPoolExecutor(max_workers=Config.GEMINI_HEDGE_WORKERS, thread_name_prefix="gemini")
+        return _HEDGES
+
+
+def route(messages: list, kind: str = "turn") -> dict:
+    """
+    Model, alternate, hedge delay and timeout for a call. kind is "turn" (conversation)
+    or "review" (code feedback); a turn whose last candidate message is long is treated
+    as a review.
+    """
+    last = next((m.get("content") or "" for m in reversed(messages or []) if m.get("role") == "user"), "")
+    if kind != "review" and len(last) <= Config.GEMINI_FAST_TURN_MAX_CHARS:
+        return {"tier": "fast", "model": Config.GEMINI_FAST_MODEL, "alternate": Config.GEMINI_STRONG_MODEL,
+                "hedge_after": Config.GEMINI_TURN_HEDGE_AFTER_SECONDS, "timeout": Config.GEMINI_TURN_TIMEOUT_SECONDS}
+    return {"tier": "strong", "model": Config.GEMINI_STRONG_MODEL, "alternate": Config.GEMINI_FAST_MODEL,
+            "hedge_after": Config.GEMINI_REVIEW_HEDGE_AFTER_SECONDS, "timeout": Config.GEMINI_REVIEW_TIMEOUT_SECONDS}
+
+
+def generate_routed(*, api_key: str, system_prompt: str, messages: list, kind: str = "turn",
+                    hedge: bool = True, scheduler=None, client: str | None = None, **params) -> str:
+    """
+    analyze_with_gemini on the model route() picks. If no reply has arrived after the
+    tier's hedge delay, the same request also goes to the alternate model and whichever
+    answers first wins (the slower call is abandoned; its own timeout bounds it). A primary
+    that fails early is retried on the alternate right away. Both share the tier's timeout.
+
+    With a scheduler (the "gemini" FairScheduler), the primary queues fairly for a slot for
+    client, and the alternate only goes out if a second slot is free right now. Each call
+    holds its slot until it actually returns, abandoned or not, so hedging never pushes
+    Gemini concurrency past the scheduler's capacity.
+    """
+    plan = route(messages, kind)
+    deadline = time.monotonic() + plan["timeout"]
+
+    def _call(model_name):
+        remaining = max(0.1, deadline - time.monotonic())
+        return analyze_with_gemini(api_key=api_key, model_name=model_name, system_prompt=system_prompt,
+                                   messages=messages, timeout=remaining, **params)
+
+    def _call_in_slot(model_name, started):
+        try:
+            return _call(model_name)
+        finally:
+            scheduler.release(time.monotonic() - started)
+
+    hedge_after = plan["hedge_after"] if hedge and plan["alternate"] != plan["model"] else 0
+    if not hedge_after:
+        inc("interviewly_gemini_calls_total", tier=plan["tier"], winner="primary")
+        if scheduler is None:
+            return _call(plan["model"])
+        with scheduler.slot(client):
+            return _call(plan["model"])
+
+    pool = _hedge_pool()
+    if scheduler is None:
+        pending = {pool.submit(_call, plan["model"]): "primary"}
+    else:
+        scheduler.acquire(client)
+        pending = {pool.submit(_call_in_slot, plan["model"], time.monotonic()): "primary"}
+    hedged = False
+    error = None
+    while pending:
+        wait_for = hedge_after if not hedged else max(0.0, deadline - time.monotonic())
+        done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for fut in done:
+            which = pending.pop(fut)
+            if fut.exception() is None:
+                inc("interviewly_gemini_calls_total", tier=plan["tier"], winner=which)
+                return fut.result()
+            error = fut.exception()
+        if not hedged:
+            # Primary is slow (or already failed): the alternate model gets the same request,
+            # if a slot is free for it
+            hedged = True
+            if scheduler is None:
+                pending[pool.submit(_call, plan["alternate"])] = "alternate"
+            elif scheduler.try_acquire(client):
+                pending[pool.submit(_call_in_slot, plan["alternate"], time.monotonic())] = "alternate"
+            else:
+                inc("interviewly_gemini_hedges_skipped_total", tier=plan["tier"])
+        elif not done:
+            break
+    inc("interviewly_gemini_calls_total", tier=plan["tier"], winner="none")
+    raise error or TimeoutError(f"Gemini did not answer within {plan['timeout']}s")
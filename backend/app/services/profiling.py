@@ -0,0 +1,106 @@
+"""
+Profiler reports for candidate code (Python only).
+
+A run with "profile" set re-runs one test in a separate sandbox request under cProfile, a
+line sampler and tracemalloc (see RUNNER_PY's _profile_call) and attaches the report to
+that test's result. The test is the one named by the option, or with profile=true the
+first TLE, else the slowest test. A one-paragraph summary of the report goes to
+evaluate_interview and, while the code is unchanged, to the interviewer's system prompt,
+so complexity discussions can cite measured hot spots.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from ..config import Config
+
+_LATEST = OrderedDict()  # client_id -> (stored_at, code hash, summary)
+_LOCK = threading.Lock()
+
+
+def options(run_timeout_ms: int) -> dict:
+    """Profiler settings for a run; the cap leaves room inside the sandbox timeout."""
+    return {
+        "cap_seconds": max(0.05, min(Config.RUN_PROFILE_CAP_SECONDS, run_timeout_ms / 1000.0 * 0.6)),
+        "interval_seconds": Config.RUN_PROFILE_INTERVAL_MS / 1000.0,
+        "max_samples": Config.RUN_PROFILE_MAX_SAMPLES,
+        "top": Config.RUN_PROFILE_TOP,
+    }
+
+
+def pick_test(option, tests: list, results: list):
+    """The test to profile: the one whose id is `option`, or for true/"auto" the first TLE, else the slowest."""
+    if option is True or option == "auto":
+        ran = [r for r in results if not r.get("infra_error") and not r.get("compile_error")]
+        tle = next((r for r in ran if r.get("tle")), None)
+        timed = [r for r in ran if isinstance(r.get("time_ms"), (int, float))]
+        chosen = tle or (max(timed, key=lambda r: r["time_ms"]) if timed else None)
+        option = chosen.get("id") if chosen else None
+    if option is None:
+        return None
+    return next((t for t in tests if str(t.get("id")) == str(option)), None)
+
+
+def _rows(report: dict, key: str, needs: str) -> list:
+    rows = report.get(key)
+    return [r for r in rows if isinstance(r, dict) and r.get(needs) is not None] if isinstance(rows, list) else []
+
+
+def summarize(report: dict, test_id=None) -> str:
+    """
+    A few lines an LLM can use as evidence: where time and memory went. Reports can come
+    back from the client (evaluate_interview's test_results), so malformed entries are
+    skipped; "" if nothing usable is left.
+    """
+    parts = []
+    funcs = _rows(report, "functions", "function")
+    if funcs:
+        parts.append("hottest functions: " + "; ".join(
+            f"{f['function']} (line {f.get('line', '?')}, {f.get('calls', '?')} calls, {f.get('self_ms', '?')} ms self)"
+            for f in funcs[:3]))
+    lines = _rows(report, "lines", "line")
+    if lines:
+        parts.append("hottest lines by sampled time: " + ", ".join(
+            f"line {l['line']} {l.get('pct', '?')}%" for l in lines[:3]))
+    allocs = _rows(report, "allocations", "line")
+    if allocs:
+        parts.append("largest allocations: " + ", ".join(f"line {a['line']} {a.get('kb', '?')} KB" for a in allocs[:3]))
+    if report.get("peak_kb") is not None:
+        parts.append(f"peak traced memory {report['peak_kb']} KB")
+    if report.get("error"):
+        parts.append(f"raised: {str(report['error'])[:200]}")
+    if not parts:
+        return ""
+
+    head = f"Profile of test {test_id}" if test_id is not None else "Profile"
+    if report.get("stopped_early") and report.get("cap_ms") is not None:
+        head += f" (stopped at the {report['cap_ms']} ms cap, so it runs longer than that)"
+    elif report.get("wall_ms") is not None:
+        head += f" ({report['wall_ms']} ms)"
+    return f"{head}: " + "; ".join(parts)
+
+
+def _code_hash(code: str, language: str) -> str:
+    return hashlib.sha256(f"{language}\0{(code or '').strip()}".encode("utf-8")).hexdigest()
+
+
+def record(client_id: str | None, code: str, language: str, summary: str):
+    if not client_id:
+        return
+    with _LOCK:
+        _LATEST.pop(client_id, None)
+        _LATEST[client_id] = (time.monotonic(), _code_hash(code, language), summary)
+        while len(_LATEST) > Config.RUN_PROFILE_MAX_CLIENTS:
+            _LATEST.popitem(last=False)
+
+
+def latest(client_id: str | None, code: str, language: str):
+    """The client's last profile summary if it was measured on exactly this code."""
+    if not client_id:
+        return None
+    with _LOCK:
+        hit = _LATEST.get(client_id)
+    if not hit or hit[1] != _code_hash(code, language) or time.monotonic() - hit[0] > Config.RUN_PROFILE_TTL_SECONDS:
+        return None
+    return hit[2]
@@ -0,0 +1,98 @@
+"""
+Prompt compaction for evaluate_interview.
+
+Test results are summarized (passing tests in aggregate, failing tests one line each with
+long values truncated and digested), then transcript, code and tests share a token budget.
+Whatever doesn't fit is cut from the middle of the section, and the returned report says
+how much each section lost.
+"""
+import hashlib
+import json
+
+CHARS_PER_TOKEN = 4  # rough average for English + code; good enough for budgeting
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def digest_value(value, max_chars: int) -> str:
+    """JSON for value, or its head plus length and a short sha256 if longer than max_chars."""
+    text = json.dumps(value, separators=(",", ":"), default=str)
+    if len(text) <= max_chars:
+        return text
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+    return f"{text[:max_chars]}… ({len(text)} chars, sha256:{digest})"
+
+
+def compact_test_results(results: list, *, max_failures: int, value_chars: int) -> str:
+    """Passing tests as one aggregate line; up to max_failures failing tests, one line each."""
+    passed = [r for r in results if r.get("ok")]
+    failed = [r for r in results if not r.get("ok")]
+    lines = []
+    if passed:
+        times = [r["time_ms"] for r in passed if isinstance(r.get("time_ms"), (int, float))]
+        ids = ", ".join(str(r.get("id")) for r in passed[:20]) + (", …" if len(passed) > 20 else "")
+        timing = f"; max {max(times)} ms, mean {sum(times) / len(times):.0f} ms" if times else ""
+        lines.append(f"{len(passed)} passing tests (ids: {ids}){timing}")
+    for r in failed[:max_failures]:
+        parts = [f"id={r.get('id')}"]
+        if r.get("tle"):
+            parts.append("TLE")
+        if r.get("infra_error"):
+            parts.append("executor error (not the candidate's fault)")
+        if "input" in r:
+            parts.append(f"input={digest_value(r['input'], value_chars)}")
+        parts.append(f"expected={digest_value(r.get('expected'), value_chars)}")
+        parts.append(f"got={digest_value(r.get('got'), value_chars)}")
+        if r.get("error"):
+            parts.append(f"error={str(r['error'])[:value_chars]}")
+        lines.append("FAILED " + " ".join(parts))
+    if len(failed) > max_failures:
+        lines.append(f"… {len(failed) - max_failures} more failing tests omitted")
+    return "\n".join(lines) or "No per-test details"
+
+
+def truncate_middle(text: str, max_tokens: int) -> str:
+    """Keep the start and (mostly) the end of text, cut on line boundaries where possible."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    head_chars = max_chars // 3
+    tail_chars = max_chars - head_chars
+    head = text[:head_chars]
+    tail = text[len(text) - tail_chars:]
+    if "\n" in head:
+        head = head[:head.rfind("\n") + 1]
+    if "\n" in tail:
+        tail = tail[tail.find("\n") + 1:]
+    dropped = len(text) - len(head) - len(tail)
+    return f"{head}[… ~{estimate_tokens(text[len(head):len(text) - len(tail)])} tokens ({dropped} chars) omitted …]\n{tail}"
+
+
+def fit_sections(sections: dict, budget_tokens: int):
+    """
+    Share budget_tokens across sections (name -> text) max-min fairly: small sections keep
+    everything, the rest split what's left. Returns (fitted sections, report).
+    """
+    sizes = {name: estimate_tokens(text) for name, text in sections.items()}
+    allowed = {}
+    remaining = budget_tokens
+    pending = sorted(sections, key=lambda n: sizes[n])
+    while pending:
+        share = remaining // len(pending)
+        name = pending.pop(0)
+        allowed[name] = min(sizes[name], max(share, 0))
+        remaining -= allowed[name]
+
+    fitted = {name: truncate_middle(text, allowed[name]) for name, text in sections.items()}
+    report = {
+        "budget_tokens": budget_tokens,
+        "sections": {
+            name: {"tokens": sizes[name], "kept_tokens": min(sizes[name], allowed[name]),
+                   "dropped_tokens": max(0, sizes[name] - allowed[name])}
+            for name in sections
+        },
+    }
+    report["dropped_tokens"] = sum(s["dropped_tokens"] for s in report["sections"].values())
+    return fitted, report
@@ -0,0 +1,242 @@
+"""
+Server-side question bank loaded from QUESTION_BANK_DIR (one JSON or YAML file per question).
+
+A question file holds the same fields the frontend sends today (title, prompt, function,
+args, checker, timeout, solution, optimal_* ...) plus its tests, given as one of:
+  tests       - inline list of {"id", "input", "output"?}
+  tests_file  - path (relative to the question file) of a JSON list
+  test_cases  - URL, fetched once on first use
+Metadata is indexed by id, topic and difficulty at first access; tests are loaded only
+when a question is first run. Tests without an "output" get one from running
+solution.code once, cached on disk under QUESTION_REFERENCE_CACHE_DIR.
+
+With the bank in place requests can send just a question id (see resolve_run_payload and
+resolve_question).
+"""
+import hashlib
+import json
+import os
+import threading
+
+import requests
+
+from ..config import Config
+from ..util.singleflight import SingleFlight
+from .code_runner import execute_run
+
+# Kept out of list/metadata responses; tests are loaded lazily and solutions stay server-side
+_TEST_FIELDS = ("tests", "tests_file")
+_PRIVATE_FIELDS = ("solution",) + _TEST_FIELDS
+
+
+class QuestionBankError(Exception):
+    pass
+
+
+class QuestionUnavailable(QuestionBankError):
+    """The question exists but its tests can't be loaded right now (executor down, file or URL unreadable)."""
+
+
+def _read_file(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        # YAML is optional; without PyYAML those files are reported and skipped
+        import yaml
+        return yaml.safe_load(f)
+
+
+class QuestionBank:
+    def __init__(self, directory: str, cache_dir: str):
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self.errors = {}  # file name -> why it was skipped
+        self._by_id = {}
+        self._paths = {}
+        self._by_topic = {}
+        self._by_difficulty = {}
+        self._tests = {}
+        self._loads = SingleFlight("question_tests")
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded:
+                return
+            names = sorted(os.listdir(self.directory)) if os.path.isdir(self.directory) else []
+            for name in names:
+                if not name.endswith((".json", ".yaml", ".yml")):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    q = _read_file(path)
+                except ImportError:
+                    self.errors[name] = "PyYAML is not installed"
+                    continue
+                except Exception as e:
+                    self.errors[name] = f"unreadable: {e}"
+                    continue
+                if not isinstance(q, dict) or not q.get("id") or not q.get("function"):
+                    self.errors[name] = "missing id or function"
+                    continue
+                qid = str(q["id"])
+                self._by_id[qid] = q
+                self._paths[qid] = path
+                for topic in q.get("topics") or []:
+                    self._by_topic.setdefault(str(topic).lower(), []).append(qid)
+                if q.get("difficulty"):
+                    self._by_difficulty.setdefault(str(q["difficulty"]).lower(), []).append(qid)
+            self._loaded = True
+
+    def get(self, qid: str):
+        """Full question metadata (including solution) without its tests, or None."""
+        self._ensure_loaded()
+        q = self._by_id.get(str(qid))
+        return {k: v for k, v in q.items() if k not in _TEST_FIELDS} if q else None
+
+    def public(self, qid: str):
+        """What a candidate may see: no solution, no tests."""
+        self._ensure_loaded()
+        q = self._by_id.get(str(qid))
+        return {k: v for k, v in q.items() if k not in _PRIVATE_FIELDS} if q else None
+
+    def search(self, topic: str | None = None, difficulty: str | None = None) -> list:
+        self._ensure_loaded()
+        ids = list(self._by_id)
+        if topic:
+            ids = [i for i in ids if i in set(self._by_topic.get(topic.lower(), []))]
+        if difficulty:
+            ids = [i for i in ids if i in set(self._by_difficulty.get(difficulty.lower(), []))]
+        return [self.public(i) for i in ids]
+
+    def tests(self, qid: str) -> list:
+        """The question's tests with every output filled in; loaded once per process."""
+        self._ensure_loaded()
+        qid = str(qid)
+        if qid not in self._by_id:
+            raise QuestionBankError(f"Unknown question: {qid}")
+        with self._lock:
+            if qid in self._tests:
+                return self._tests[qid]
+        tests = self._loads.do(qid, lambda: self._load_tests(qid))
+        with self._lock:
+            self._tests[qid] = tests
+        return tests
+
+    def _load_tests(self, qid: str) -> list:
+        q = self._by_id[qid]
+        if q.get("tests") is not None:
+            tests = q["tests"]
+        elif q.get("tests_file"):
+            path = os.path.join(os.path.dirname(self._paths[qid]), q["tests_file"])
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    tests = json.load(f)
+            except (OSError, ValueError) as e:
+                raise QuestionUnavailable(f"{qid}: can't read tests_file: {e}") from e
+        elif q.get("test_cases"):
+            # Fetched directly rather than via get_test_cases, so a failed fetch isn't cached as no tests
+            try:
+                r = requests.get(q["test_cases"], timeout=10)
+                r.raise_for_status()
+                tests = r.json()
+            except (requests.RequestException, ValueError) as e:
+                raise QuestionUnavailable(f"{qid}: can't fetch test_cases: {e}") from e
+        else:
+            tests = []
+        if not isinstance(tests, list):
+            raise QuestionBankError(f"Tests for {qid} must be a list")
+        tests = [dict(t, id=t.get("id", i + 1)) for i, t in enumerate(tests)]
+        return self._with_reference_outputs(qid, q, tests)
+
+    def _with_reference_outputs(self, qid: str, q: dict, tests: list) -> list:
+        missing = [t for t in tests if "output" not in t]
+        if not missing:
+            return tests
+        solution = q.get("solution") if isinstance(q.get("solution"), dict) else {}
+        if not solution.get("code"):
+            raise QuestionBankError(f"{qid}: tests without outputs need solution.code")
+        language = solution.get("language", "python")
+        key = hashlib.sha256(json.dumps(
+            [solution["code"], language, q["function"], [t["input"] for t in missing]], sort_keys=True
+        ).encode("utf-8")).hexdigest()[:16]
+        path = os.path.join(self.cache_dir, f"{hashlib.sha256(qid.encode('utf-8')).hexdigest()[:12]}-{key}.json")
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                outputs = json.load(f)
+        except (OSError, ValueError):
+            outputs = self._compute_outputs(qid, q, solution, language, missing)
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(outputs, f)
+                os.replace(tmp, path)
+            except OSError:
+                pass  # the outputs are still cached in memory for this process
+
+        filled = iter(outputs)
+        return [t if "output" in t else dict(t, output=next(filled)) for t in tests]
+
+    def _compute_outputs(self, qid, q, solution, language, missing) -> list:
+        body, status = execute_run({
+            "code": solution["code"],
+            "language": language,
+            "function": q["function"],
+            "tests": [{k: v for k, v in t.items() if k != "checker"} for t in missing],
+            "timeout": q.get("timeout", 10000),
+        }, client_id="question-bank")
+        results = body.get("results") or []
+        if status != 200 or len(results) != len(missing):
+            raise QuestionBankError(f"{qid}: reference run failed: {body.get('error') or body.get('summary')}")
+        down = [r for r in results if r.get("infra_error")]
+        if down:
+            raise QuestionUnavailable(f"{qid}: reference run failed, executor unavailable: {down[0].get('error')}")
+        bad = [r for r in results if r.get("error") or r.get("tle")]
+        if bad:
+            raise QuestionBankError(f"{qid}: reference solution failed on test {bad[0].get('id')}: {bad[0].get('error')}")
+        return [r.get("got") for r in results]
+
+
+_BANK = None
+_BANK_LOCK = threading.Lock()
+
+
+def get_bank() -> QuestionBank:
+    global _BANK
+    with _BANK_LOCK:
+        if _BANK is None:
+            _BANK = QuestionBank(Config.QUESTION_BANK_DIR, Config.QUESTION_REFERENCE_CACHE_DIR)
+        return _BANK
+
+
+def resolve_question(question, question_id=None):
+    """A bank question for question_id (or a question dict carrying just an id); else question as sent."""
+    qid = question_id or (question.get("id") if isinstance(question, dict) else None)
+    if not qid:
+        return question
+    stored = get_bank().get(qid)
+    if stored is None:
+        return question
+    # Client-sent fields can't override the server's copy (solution, complexities, ...)
+    return {**(question if isinstance(question, dict) else {}), **stored}
+
+
+def resolve_run_payload(data: dict) -> dict:
+    """Expand {"question_id": ...} in a /api/code/run payload into function/checker/timeout/tests."""
+    qid = data.get("question_id")
+    if not qid:
+        return data
+    q = get_bank().get(qid)
+    if q is None:
+        raise QuestionBankError(f"Unknown question: {qid}")
+    resolved = dict(data)
+    resolved.setdefault("function", q["function"])
+    for key in ("checker", "timeout"):
+        if q.get(key) is not None:
+            resolved.setdefault(key, q[key])
+    if not resolved.get("tests") and not resolved.get("test_cases"):
+        resolved["tests"] = get_bank().tests(qid)
+    return resolved
@@ -0,0 +1,236 @@
+"""
+Background run jobs for /api/code/run.
+
+A job is submitted with the normal run payload and returns immediately; a small worker
+pool drains the queue. Claiming is fair across clients: the next job is taken from the
+client with the fewest jobs currently running, oldest first, so one candidate queueing
+many runs can't starve everyone else. Finished jobs are kept for RUN_JOBS_TTL_SECONDS.
+
+In the sqlite store a running job holds a lease that each progress update renews; a job
+whose lease runs out (its worker process died) is requeued, or failed after
+RUN_JOBS_MAX_ATTEMPTS claims, so it neither hangs nor keeps counting against its client.
+
+Two stores:
+  memory  - per process; fine for a single worker
+  sqlite  - shared by every worker process on the host (RUN_JOBS_SQLITE_PATH)
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+from ..config import Config
+from .code_runner import execute_run
+
+
+class MemoryJobStore:
+    def __init__(self):
+        self._jobs = {}
+        self._cond = threading.Condition()
+
+    def create(self, client_id: str, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        with self._cond:
+            self._jobs[job_id] = {
+                "id": job_id, "client_id": client_id, "state": "queued", "payload": payload,
+                "progress": {"done": 0, "total": None}, "result": None, "status": None,
+                "created_at": time.time(), "started_at": None, "finished_at": None,
+            }
+            self._cond.notify()
+        return job_id
+
+    def claim(self, timeout: float):
+        with self._cond:
+            deadline = time.monotonic() + timeout
+            while True:
+                queued = [j for j in self._jobs.values() if j["state"] == "queued"]
+                if queued:
+                    running = {}
+                    for j in self._jobs.values():
+                        if j["state"] == "running":
+                            running[j["client_id"]] = running.get(j["client_id"], 0) + 1
+                    job = min(queued, key=lambda j: (running.get(j["client_id"], 0), j["created_at"]))
+                    job["state"] = "running"
+                    job["started_at"] = time.time()
+                    return job["id"], job["payload"], job["client_id"]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(timeout=remaining)
+
+    def progress(self, job_id: str, done: int, total: int):
+        with self._cond:
+            self._jobs[job_id]["progress"] = {"done": done, "total": total}
+
+    def finish(self, job_id: str, result: dict, status: int):
+        with self._cond:
+            job = self._jobs[job_id]
+            job.update(state="done" if status < 400 else "failed", result=result, status=status, finished_at=time.time())
+
+    def get(self, job_id: str):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return {k: v for k, v in job.items() if k != "payload"} if job else None
+
+    def purge(self, ttl: float):
+        cutoff = time.time() - ttl
+        with self._cond:
+            for job_id in [k for k, j in self._jobs.items() if j["finished_at"] and j["finished_at"] < cutoff]:
+                del self._jobs[job_id]
+
+
+class SqliteJobStore:
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self._connect()) as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS run_jobs (
+                    id TEXT PRIMARY KEY, client_id TEXT, state TEXT, payload TEXT,
+                    progress TEXT, result TEXT, status INTEGER,
+                    created_at REAL, started_at REAL, finished_at REAL,
+                    lease_until REAL, attempts INTEGER DEFAULT 0
+                )""")
+            columns = {row[1] for row in db.execute("PRAGMA table_info(run_jobs)")}
+            for column, kind in (("lease_until", "REAL"), ("attempts", "INTEGER DEFAULT 0")):
+                if column not in columns:  # table created before leases existed
+                    db.execute(f"ALTER TABLE run_jobs ADD COLUMN {column} {kind}")
+            db.execute("CREATE INDEX IF NOT EXISTS run_jobs_state ON run_jobs (state, created_at)")
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def create(self, client_id: str, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as db:
+            db.execute(
+                "INSERT INTO run_jobs (id, client_id, state, payload, progress, created_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, client_id, json.dumps(payload), json.dumps({"done": 0, "total": None}), time.time()),
+            )
+        return job_id
+
+    def claim(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            db = self._connect()
+            try:
+                # IMMEDIATE takes the write lock up front so two workers can't claim the same row
+                db.execute("BEGIN IMMEDIATE")
+                self._reap(db)
+                row = db.execute("""
+                    SELECT id, payload, client_id FROM run_jobs q
+                    WHERE state = 'queued'
+                    ORDER BY (SELECT COUNT(*) FROM run_jobs r WHERE r.state = 'running' AND r.client_id = q.client_id),
+                             created_at
+                    LIMIT 1""").fetchone()
+                if row:
+                    now = time.time()
+                    db.execute(
+                        "UPDATE run_jobs SET state = 'running', started_at = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                        (now, now + Config.RUN_JOBS_LEASE_SECONDS, row[0]),
+                    )
+                db.execute("COMMIT")
+            finally:
+                db.close()
+            if row:
+                return row[0], json.loads(row[1]), row[2]
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(min(0.25, max(0.0, deadline - time.monotonic())))
+
+    @staticmethod
+    def _reap(db):
+        """Requeue (or, out of attempts, fail) running jobs whose worker stopped renewing the lease."""
+        now = time.time()
+        db.execute(
+            "UPDATE run_jobs SET state = 'queued', started_at = NULL, lease_until = NULL "
+            "WHERE state = 'running' AND lease_until < ? AND attempts < ?",
+            (now, Config.RUN_JOBS_MAX_ATTEMPTS),
+        )
+        db.execute(
+            "UPDATE run_jobs SET state = 'failed', result = ?, status = 500, finished_at = ? "
+            "WHERE state = 'running' AND lease_until < ?",
+            (json.dumps({"error": "Run job failed: its worker stopped responding"}), now, now),
+        )
+
+    def progress(self, job_id: str, done: int, total: int):
+        with closing(self._connect()) as db:
+            db.execute(
+                "UPDATE run_jobs SET progress = ?, lease_until = ? WHERE id = ? AND state = 'running'",
+                (json.dumps({"done": done, "total": total}), time.time() + Config.RUN_JOBS_LEASE_SECONDS, job_id),
+            )
+
+    def finish(self, job_id: str, result: dict, status: int):
+        with closing(self._connect()) as db:
+            db.execute(
+                "UPDATE run_jobs SET state = ?, result = ?, status = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                ("done" if status < 400 else "failed", json.dumps(result), status, time.time(), job_id),
+            )
+
+    def get(self, job_id: str):
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT id, client_id, state, progress, result, status, created_at, started_at, finished_at FROM run_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if not row:
+            return None
+        keys = ("id", "client_id", "state", "progress", "result", "status", "created_at", "started_at", "finished_at")
+        job = dict(zip(keys, row))
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def purge(self, ttl: float):
+        with closing(self._connect()) as db:
+            db.execute("DELETE FROM run_jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (time.time() - ttl,))
+
+
+_STORE = None
+_WORKERS = []
+_INIT_LOCK = threading.Lock()
+
+
+def _worker_loop(store):
+    last_purge = 0.0
+    while True:
+        if time.monotonic() - last_purge > 60:
+            store.purge(Config.RUN_JOBS_TTL_SECONDS)
+            last_purge = time.monotonic()
+        claimed = store.claim(timeout=5.0)
+        if not claimed:
+            continue
+        job_id, payload, client_id = claimed
+        try:
+            body, status = execute_run(payload, on_result=lambda done, total, _res: store.progress(job_id, done, total),
+                                       client_id=client_id)
+        except Exception as e:
+            body, status = {"error": f"Run job failed: {e}"}, 500
+        store.finish(job_id, body, status)
+
+
+def get_store():
+    """The configured job store; starts the worker threads on first use."""
+    global _STORE
+    with _INIT_LOCK:
+        if _STORE is None:
+            if Config.RUN_JOBS_BACKEND == "sqlite":
+                _STORE = SqliteJobStore(Config.RUN_JOBS_SQLITE_PATH)
+            else:
+                _STORE = MemoryJobStore()
+            for i in range(max(1, Config.RUN_JOBS_WORKERS)):
+                t = threading.Thread(target=_worker_loop, args=(_STORE,), name=f"run-job-{i}", daemon=True)
+                t.start()
+                _WORKERS.append(t)
+        return _STORE
+
+
+def submit(client_id: str, payload: dict) -> str:
+    return get_store().create(client_id or "anonymous", payload)
+
+
+def get_job(job_id: str):
+    return get_store().get(job_id)
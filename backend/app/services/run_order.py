@@ -0,0 +1,71 @@
+"""
+Test ordering for stop_on_fail runs from each client's history on a question.
+
+Every run with a client id records, per test, whether it passed and how long it took.
+A later stop_on_fail run on the same question dispatches the tests that failed last
+time first, then tests with no history, then the rest cheapest-first by recorded
+time_ms, so iterating on a buggy solution hits the known failure in the first round
+trip. execute_run still reports results in the order the tests were given.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from ..config import Config
+from ..util.singleflight import canonical_key
+
+_HISTORY = OrderedDict()  # (client_id, question key) -> (updated_at, {test key: (ok, time_ms)})
+_LOCK = threading.Lock()
+
+
+def history_key(client_id: str | None, data: dict, tests: list):
+    """Key for this client's history on the question in a run payload, or None if untracked."""
+    if not Config.TEST_ORDER_HISTORY or not client_id:
+        return None
+    question = data.get("question_id") or data.get("test_cases") or canonical_key(
+        data.get("function"), [t.get("input") for t in tests]
+    )
+    return client_id, str(question)
+
+
+def _test_key(test: dict, index: int) -> str:
+    return str(test.get("id", index))
+
+
+def order(key, tests: list) -> list:
+    """Indices into tests in dispatch order: last-failed, then unseen, then passed by time_ms."""
+    with _LOCK:
+        entry = _HISTORY.get(key)
+        if entry and time.monotonic() - entry[0] > Config.TEST_ORDER_TTL_SECONDS:
+            del _HISTORY[key]
+            entry = None
+    if not entry:
+        return list(range(len(tests)))
+    seen = entry[1]
+
+    def _rank(i):
+        past = seen.get(_test_key(tests[i], i))
+        if past is None:
+            return 1, 0, i
+        ok, time_ms = past
+        return (2 if ok else 0), time_ms, i
+
+    return sorted(range(len(tests)), key=_rank)
+
+
+def record(key, tests: list, indices: list, results: list, run_timeout_ms: int):
+    """Remember outcomes for tests[indices[k]] -> results[k]; executor errors say nothing and are skipped."""
+    if key is None:
+        return
+    with _LOCK:
+        entry = _HISTORY.pop(key, None)
+        seen = entry[1] if entry else {}
+        for i, res in zip(indices, results):
+            if res.get("infra_error") or res.get("compile_error"):
+                continue
+            # TLEs report no time; they're the most expensive tests there are
+            time_ms = res.get("time_ms") if isinstance(res.get("time_ms"), (int, float)) else run_timeout_ms
+            seen[_test_key(tests[i], i)] = (bool(res.get("ok")), time_ms)
+        _HISTORY[key] = (time.monotonic(), seen)
+        while len(_HISTORY) > Config.TEST_ORDER_MAX_ENTRIES:
+            _HISTORY.popitem(last=False)
@@ -0,0 +1,127 @@
+"""
+Speculative runs of the public tests while the candidate types (opt-in: SPECULATIVE_RUNS=1).
+
+/api/ai/update_context reports every editor change. Once a client's code has stayed the same
+for SPECULATIVE_DEBOUNCE_SECONDS, the question's tests are run in the background with the
+same payload the Run button sends, and the result is stored under that payload's run_key.
+A Run on unchanged code is then answered from the store.
+
+Speculation yields to real work: it only starts (and only continues between tests) while
+the Piston fair queue is mostly idle, and newer code for the client cancels it.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from ..config import Config
+from ..util.admission import get_scheduler
+from ..util.debounce import Debouncer
+from ..util.metrics import cache_result, inc
+from .code_runner import execute_run, run_key
+from .question_bank import get_bank, resolve_run_payload
+
+
+class _Cancelled(Exception):
+    pass
+
+
+_RESULTS = OrderedDict()  # run_key -> (stored_at, body)
+_DEBOUNCE = Debouncer()   # keyed by client_id
+_LOCK = threading.Lock()
+_SLOTS = threading.BoundedSemaphore(max(1, Config.SPECULATIVE_MAX_CONCURRENT))
+
+
+def run_payload(code: str, language: str, question: dict | None):
+    """
+    The body the Run button would send for this code and question, or None if it can't run.
+    Bank questions come back unresolved ({"question_id": ...}): loading their tests can mean
+    a reference run, so _run resolves them off the request thread.
+    """
+    if not isinstance(question, dict):
+        return None
+    if not question.get("test_cases") and question.get("id") and get_bank().get(question["id"]):
+        return {"code": code, "language": language, "question_id": question["id"]}
+    if not question.get("function") or not question.get("test_cases"):
+        return None
+    payload = {"code": code, "language": language, "function": question["function"], "test_cases": question["test_cases"]}
+    # Only keys the frontend would send, so run_key matches the real Run request
+    for key in ("timeout", "checker"):
+        if question.get(key) is not None:
+            payload[key] = question[key]
+    return payload
+
+
+def _executor_idle() -> bool:
+    piston = get_scheduler("piston")
+    return piston.in_use < max(1, piston.capacity // 2) and not piston.saturated()
+
+
+def _store(key: str, body: dict):
+    with _LOCK:
+        _RESULTS[key] = (time.monotonic(), body)
+        _RESULTS.move_to_end(key)
+        while len(_RESULTS) > Config.SPECULATIVE_MAX_RESULTS:
+            _RESULTS.popitem(last=False)
+
+
+def _run(generation: int, client_id: str, payload: dict):
+    def _current():
+        return _DEBOUNCE.is_current(client_id, generation)
+
+    if not _current() or not _executor_idle() or not _SLOTS.acquire(blocking=False):
+        inc("interviewly_speculative_runs_total", outcome="skipped")
+        return
+
+    def _check(done, total, result):
+        # Between tests: give way to newer code and to real runs
+        if not _current() or not _executor_idle():
+            raise _Cancelled()
+
+    try:
+        # Resolve exactly as /api/code/run does so run_key matches the real Run
+        payload = resolve_run_payload(payload)
+        key = run_key(payload)
+        with _LOCK:
+            if key in _RESULTS:
+                return
+        body, status = execute_run(payload, on_result=_check, client_id=f"speculative:{client_id}")
+    except _Cancelled:
+        inc("interviewly_speculative_runs_total", outcome="cancelled")
+        return
+    except Exception:
+        inc("interviewly_speculative_runs_total", outcome="failed")
+        return
+    finally:
+        _SLOTS.release()
+
+    # Infrastructure errors say nothing about the code; let the real Run retry them
+    if status == 200 and not (body.get("summary") or {}).get("infra_errors"):
+        _store(key, body)
+        inc("interviewly_speculative_runs_total", outcome="completed")
+    else:
+        inc("interviewly_speculative_runs_total", outcome="discarded")
+
+
+def code_changed(client_id: str, code: str, language: str, question: dict | None):
+    """Note new editor contents; cancels older speculation and re-arms the debounce timer."""
+    if not Config.SPECULATIVE_RUNS or not client_id:
+        return
+    payload = run_payload(code, language, question)
+    if payload is None:
+        _DEBOUNCE.cancel(client_id)
+    else:
+        _DEBOUNCE.trigger(client_id, Config.SPECULATIVE_DEBOUNCE_SECONDS, _run, client_id, payload)
+
+
+def lookup(payload: dict):
+    """A stored speculative result for this exact run payload, if still fresh."""
+    if not Config.SPECULATIVE_RUNS:
+        return None
+    key = run_key(payload)
+    with _LOCK:
+        hit = _RESULTS.get(key)
+        if hit and time.monotonic() - hit[0] > Config.SPECULATIVE_RESULT_TTL_SECONDS:
+            del _RESULTS[key]
+            hit = None
+    cache_result("speculative_run", "hit" if hit else "miss")
+    return hit[1] if hit else None
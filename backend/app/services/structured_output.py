@@ -0,0 +1,170 @@
+import json
+from .gemini import analyze_with_gemini
+
+# Schemas use the OpenAPI subset Gemini accepts for response_schema
+# (type / properties / required / items / enum), so the same dict drives
+# both the request and local validation.
+COMPLEXITY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "time_complexity": {"type": "string"},
+        "space_complexity": {"type": "string"},
+    },
+    "required": ["time_complexity", "space_complexity"],
+}
+
+RUBRIC_CRITERIA = [
+    "Communication",
+    "Understanding",
+    "Clarity",
+    "Code Readability",
+    "Correctness",
+    "Time/Space Complexity",
+]
+
+EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "criteria": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "enum": RUBRIC_CRITERIA},
+                    "score": {"type": "integer"},
+                    "justification": {"type": "string"},
+                },
+                "required": ["name", "score", "justification"],
+            },
+        },
+        "overall_feedback": {"type": "string"},
+    },
+    "required": ["criteria", "overall_feedback"],
+}
+
+
+class StructuredOutputError(ValueError):
+    """Raised when an LLM response can't be turned into JSON matching the schema."""
+
+    def __init__(self, message: str, raw_response: str = ""):
+        super().__init__(message)
+        self.raw_response = raw_response
+
+
+def extract_json_object(text: str):
+    """
+    Find the first top-level {...} in text that parses as JSON.
+
+    Single left-to-right pass tracking brace depth and string/escape state, so
+    cost is linear in len(text) (no regex backtracking). Returns None if none parse.
+    """
+    depth = 0
+    start = -1
+    in_string = False
+    escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            if depth:
+                in_string = True
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                try:
+                    return json.loads(text[start:i + 1])
+                except json.JSONDecodeError:
+                    start = -1
+    return None
+
+
+def _validate(value, schema: dict, path: str):
+    kind = schema.get("type")
+    if kind == "object":
+        if not isinstance(value, dict):
+            raise StructuredOutputError(f"{path}: expected object")
+        for key in schema.get("required", []):
+            if key not in value:
+                raise StructuredOutputError(f"{path}: missing '{key}'")
+        props = schema.get("properties", {})
+        return {k: _validate(v, props[k], f"{path}.{k}") if k in props else v for k, v in value.items()}
+    if kind == "array":
+        if not isinstance(value, list):
+            raise StructuredOutputError(f"{path}: expected array")
+        return [_validate(v, schema.get("items", {}), f"{path}[{i}]") for i, v in enumerate(value)]
+    if kind == "string":
+        if not isinstance(value, str) or not value.strip():
+            raise StructuredOutputError(f"{path}: expected non-empty string")
+        if "enum" in schema and value not in schema["enum"]:
+            raise StructuredOutputError(f"{path}: '{value}' not one of {schema['enum']}")
+        return value
+    if kind == "integer":
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise StructuredOutputError(f"{path}: expected integer")
+        return value
+    return value
+
+
+def validate(value, schema: dict):
+    """Check value against schema (the subset above); returns it with integral floats coerced."""
+    return _validate(value, schema, "$")
+
+
+def validate_evaluation(value: dict) -> dict:
+    """Schema check plus rubric rules: each criterion exactly once, scores 1-5."""
+    value = validate(value, EVALUATION_SCHEMA)
+    names = [c["name"] for c in value["criteria"]]
+    missing = [n for n in RUBRIC_CRITERIA if n not in names]
+    if missing or len(names) != len(set(names)):
+        raise StructuredOutputError(f"$.criteria: expected each of {RUBRIC_CRITERIA} once, got {names}")
+    for c in value["criteria"]:
+        if not 1 <= c["score"] <= 5:
+            raise StructuredOutputError(f"$.criteria[{c['name']}].score: {c['score']} not in 1-5")
+    return value
+
+
+def parse_structured(text: str, schema: dict, validator=None):
+    """Parse an LLM response: plain json.loads first, then one brace-balancing scan."""
+    text = (text or "").strip()
+    try:
+        obj = json.loads(text)
+    except json.JSONDecodeError:
+        obj = extract_json_object(text)
+    if obj is None:
+        raise StructuredOutputError("No JSON object found in response", raw_response=text)
+    try:
+        return (validator or (lambda v: validate(v, schema)))(obj)
+    except StructuredOutputError as e:
+        e.raw_response = text
+        raise
+
+
+def generate_structured(*, api_key: str, model_name: str, system_prompt: str, messages: list,
+                        schema: dict, temperature: float, top_p: float, top_k: int,
+                        max_tokens: int, validator=None):
+    """Call Gemini in JSON mode constrained by schema and return the validated object."""
+    response = analyze_with_gemini(
+        api_key=api_key,
+        model_name=model_name,
+        system_prompt=system_prompt,
+        messages=messages,
+        temperature=temperature,
+        top_p=top_p,
+        top_k=top_k,
+        max_tokens=max_tokens,
+        response_mime_type="application/json",
+        response_schema=schema,
+    )
+    return parse_structured(response, schema, validator)
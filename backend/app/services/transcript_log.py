@@ -0,0 +1,84 @@
+"""
+Append-only interview transcript per client (keyed by X-Client-Id, like the code context
+in routes/ai.py).
+
+The frontend appends one turn at a time to /api/ai/transcript instead of re-sending the
+whole conversation; /api/ai/analyze and /api/evaluation/evaluate read it back when
+their request has no messages/transcript. Turns are kept as single strings (role code +
+text) to keep per-turn overhead small, and a client's log is dropped once it has been
+idle for TRANSCRIPT_LOG_TTL_SECONDS.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from ..config import Config
+
+_ROLE_CODES = {"user": "u", "ai": "a"}
+_ROLES = {v: k for k, v in _ROLE_CODES.items()}
+
+
+class TranscriptLogError(Exception):
+    pass
+
+
+class SequenceMismatch(TranscriptLogError):
+    def __init__(self, expected: int):
+        super().__init__(f"Expected seq {expected}")
+        self.expected = expected
+
+
+_LOGS = OrderedDict()  # client_id -> [updated_at, [encoded turns]]; oldest-updated first
+_LOCK = threading.Lock()
+
+
+def _evict(now: float):
+    while _LOGS:
+        client_id, (updated_at, _) = next(iter(_LOGS.items()))
+        if now - updated_at <= Config.TRANSCRIPT_LOG_TTL_SECONDS and len(_LOGS) <= Config.TRANSCRIPT_LOG_MAX_CLIENTS:
+            break
+        del _LOGS[client_id]
+
+
+def append(client_id: str, role: str, content: str, seq: int | None = None) -> int:
+    """
+    Add one turn; returns the log length. seq, if given, is the index this turn should
+    get: a retried append of a turn already stored is a no-op, and a gap raises
+    SequenceMismatch with the index expected next.
+    """
+    if role not in _ROLE_CODES:
+        raise TranscriptLogError("role must be 'user' or 'ai'")
+    text = (content or "").strip()[:Config.TRANSCRIPT_LOG_MAX_TURN_CHARS]
+    now = time.monotonic()
+    with _LOCK:
+        _evict(now)
+        entry = _LOGS.pop(client_id, None) or [now, []]
+        _LOGS[client_id] = entry  # re-inserted at the end: most recently updated
+        entry[0] = now
+        turns = entry[1]
+        if seq is not None and seq < len(turns):
+            return len(turns)
+        if seq is not None and seq > len(turns):
+            raise SequenceMismatch(len(turns))
+        if len(turns) >= Config.TRANSCRIPT_LOG_MAX_TURNS:
+            raise TranscriptLogError(f"Transcript is limited to {Config.TRANSCRIPT_LOG_MAX_TURNS} turns")
+        turns.append(_ROLE_CODES[role] + text)
+        return len(turns)
+
+
+def get(client_id: str | None):
+    """The client's turns as [{"role", "content"}], or None if there is no live log."""
+    if not client_id:
+        return None
+    with _LOCK:
+        _evict(time.monotonic())
+        entry = _LOGS.get(client_id)
+        turns = list(entry[1]) if entry else None
+    if turns is None:
+        return None
+    return [{"role": _ROLES[t[0]], "content": t[1:]} for t in turns]
+
+
+def clear(client_id: str):
+    with _LOCK:
+        _LOGS.pop(client_id, None)
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+import requests
+from ..util.metrics import upstream
+
+CHUNK_SIZE = 64 * 1024
+
+# bucket -> "original" | "fixed": which candidate URL last worked for that bucket
+_BUCKET_REWRITES = {}
+_CACHE_LOCK = threading.Lock()
+
+
+class TranscriptFetchError(Exception):
+    pass
+
+
+def _ensure_alt_media(u: str) -> str:
+    p = urlparse(u)
+    q = dict(parse_qsl(p.query, keep_blank_values=True))
+    q.setdefault("alt", "media")
+    new_q = urlencode(q)
+    return urlunparse((p.scheme, p.netloc, p.path, p.params, new_q, p.fragment))
+
+
+def _bucket_of(u: str) -> str | None:
+    m = re.search(r"/v0/b/([^/]+)/o/", u)
+    return m.group(1) if m else None
+
+
+def _fix_bucket_path(u: str) -> str:
+    # Replace ".firebasestorage.app" in bucket segment with ".appspot.com"
+    bucket = _bucket_of(u)
+    if not bucket:
+        return u
+    if ".firebasestorage.app" in bucket:
+        fixed = bucket.replace(".firebasestorage.app", ".appspot.com")
+        return u.replace(f"/v0/b/{bucket}/o/", f"/v0/b/{fixed}/o/")
+    return u
+
+
+def normalize_url(u: str) -> str:
+    """alt=media, sorted query, no fragment: the cache key for a transcript URL."""
+    p = urlparse(_ensure_alt_media(u))
+    q = urlencode(sorted(parse_qsl(p.query, keep_blank_values=True)))
+    return urlunparse((p.scheme, p.netloc.lower(), p.path, p.params, q, ""))
+
+
+def candidate_urls(u: str) -> list:
+    """Candidate upstream URLs, with the bucket rewrite that last worked tried first."""
+    original = normalize_url(u)
+    fixed = _fix_bucket_path(original)
+    if fixed == original:
+        return [("original", original)]
+    if _BUCKET_REWRITES.get(_bucket_of(original)) == "fixed":
+        return [("fixed", fixed), ("original", original)]
+    return [("original", original), ("fixed", fixed)]
+
+
+def _cache_paths(cache_dir: str, key: str):
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    base = os.path.join(cache_dir, digest)
+    return base + ".body", base + ".json"
+
+
+def _read_meta(meta_path: str) -> dict | None:
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _touch(*paths):
+    now = time.time()
+    for p in paths:
+        try:
+            os.utime(p, (now, now))
+        except OSError:
+            pass
+
+
+def _evict(cache_dir: str, max_bytes: int):
+    """Drop least recently used entries until the cache fits in max_bytes."""
+    with _CACHE_LOCK:
+        entries = []
+        total = 0
+        for name in os.listdir(cache_dir):
+            if not name.endswith(".body"):
+                continue
+            path = os.path.join(cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            for p in (path, path[:-len(".body")] + ".json"):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
+
+
+def _cached_entry(body_path: str, meta: dict) -> dict:
+    _touch(body_path, body_path[:-len(".body")] + ".json")
+    return {
+        "path": body_path,
+        "content_type": meta.get("content_type") or "application/octet-stream",
+        "etag": meta.get("etag"),
+        "cache": "hit",
+    }
+
+
+def _open_upstream(key: str, range_header: str | None, etag: str | None):
+    """Try each candidate URL with a streamed GET; returns the first usable response."""
+    bucket = _bucket_of(key)
+    last_exc = None
+    for label, url in candidate_urls(key):
+        headers = {}
+        if range_header:
+            headers["Range"] = range_header
+        elif etag:
+            headers["If-None-Match"] = etag
+        try:
+            with upstream("firebase", "transcript"):
+                r = requests.get(url, headers=headers, stream=True, timeout=15)
+        except Exception as e:
+            last_exc = e
+            continue
+        if r.status_code in (200, 206, 304):
+            if bucket:
+                _BUCKET_REWRITES[bucket] = label
+            return r
+        r.close()
+        last_exc = Exception(f"Upstream status {r.status_code}")
+    raise TranscriptFetchError(str(last_exc))
+
+
+def _tee_to_cache(r, body_path: str, meta_path: str, meta: dict, cache_dir: str, max_bytes: int):
+    """Yield upstream chunks while writing them to a temp file; publish it only once complete."""
+    tmp_path = f"{body_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    written = 0
+    complete = False
+    f = None
+    try:
+        f = open(tmp_path, "wb")
+        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+            if not chunk:
+                continue
+            if f is not None:
+                written += len(chunk)
+                if written > max_bytes:
+                    # Too big to keep; keep streaming but stop caching
+                    f.close()
+                    os.remove(tmp_path)
+                    f = None
+                else:
+                    f.write(chunk)
+            yield chunk
+        complete = True
+    finally:
+        r.close()
+        if f is not None:
+            f.close()
+            if complete:
+                os.replace(tmp_path, body_path)
+                with open(meta_path, "w", encoding="utf-8") as mf:
+                    json.dump(meta, mf)
+                _evict(cache_dir, max_bytes)
+            else:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+
+def _passthrough(r):
+    try:
+        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+            if chunk:
+                yield chunk
+    finally:
+        r.close()
+
+
+def fetch_transcript(url: str, *, cache_dir: str, max_bytes: int, fresh_seconds: float,
+                     range_header: str | None = None) -> dict:
+    """
+    Resolve a transcript download URL to either a cached file or a streamed upstream body.
+
+    Returns one of:
+      {"path", "content_type", "etag", "cache"}          -> serve the cached file (handles Range)
+      {"stream", "status", "headers", "cache"}           -> stream upstream bytes through
+    Raises TranscriptFetchError if no candidate URL could be fetched.
+    """
+    key = normalize_url(url)
+    os.makedirs(cache_dir, exist_ok=True)
+    body_path, meta_path = _cache_paths(cache_dir, key)
+    meta = _read_meta(meta_path) if os.path.exists(body_path) else None
+
+    # Recently validated copies are served without asking upstream at all
+    if meta and time.time() - meta.get("validated_at", 0) < fresh_seconds:
+        return _cached_entry(body_path, meta)
+
+    try:
+        r = _open_upstream(key, None if meta else range_header, meta.get("etag") if meta else None)
+    except TranscriptFetchError:
+        if meta:
+            # Upstream is down but we have a copy; stale beats a 502
+            return {**_cached_entry(body_path, meta), "cache": "stale"}
+        raise
+
+    if r.status_code == 304 and meta:
+        r.close()
+        meta["validated_at"] = time.time()
+        with open(meta_path, "w", encoding="utf-8") as mf:
+            json.dump(meta, mf)
+        return {**_cached_entry(body_path, meta), "cache": "revalidated"}
+
+    content_type = r.headers.get("content-type", "application/octet-stream")
+    headers = {"Content-Type": content_type}
+    for h in ("Content-Length", "Content-Range", "Accept-Ranges", "ETag"):
+        if r.headers.get(h):
+            headers[h] = r.headers[h]
+
+    if r.status_code == 206:
+        # Partial bodies are never cached
+        return {"stream": _passthrough(r), "status": 206, "headers": headers, "cache": "bypass"}
+
+    new_meta = {
+        "url": key,
+        "etag": r.headers.get("ETag"),
+        "content_type": content_type,
+        "validated_at": time.time(),
+    }
+    return {
+        "stream": _tee_to_cache(r, body_path, meta_path, new_meta, cache_dir, max_bytes),
+        "status": 200,
+        "headers": headers,
+        "cache": "miss",
+    }
@@ -0,0 +1,216 @@
+"""
+Per-client admission control and fair scheduling of upstream calls.
+
+Two layers:
+  - Token buckets per (client, route) reject bursts at the door with 429 + Retry-After.
+  - A FairScheduler per upstream (piston, gemini) caps concurrent calls from this process and,
+    when saturated, grants freed slots by start-time fair queuing across clients, so a client
+    with many queued calls can't starve a client with one. Routes that would queue behind a
+    full scheduler are turned away with 429 + Retry-After instead of piling up.
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, jsonify, request
+
+from ..config import Config
+from .metrics import inc
+
+
+class Saturated(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consume one token; returns 0 on success or seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+    def full(self, now: float) -> bool:
+        """Refilled to burst: dropping it is the same as starting a new one."""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+_FINISH_MAX = 1024  # per-client finish times a scheduler keeps before pruning
+
+
+class FairScheduler:
+    def __init__(self, name: str, capacity: int, max_queue: int, timeout: float):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_use = 0
+        self._vtime = 0.0
+        self._finish = {}   # client -> virtual finish time of its last request
+        self._waiters = []  # heap of [virtual start, seq, client, granted]
+        self._seq = itertools.count()
+        self._service = 1.0  # EWMA of seconds a slot is held, for Retry-After estimates
+        self._cond = threading.Condition()
+
+    def retry_after(self) -> float:
+        with self._cond:
+            return max(1.0, len(self._waiters) / self.capacity * self._service)
+
+    def saturated(self) -> bool:
+        with self._cond:
+            return self.in_use >= self.capacity and len(self._waiters) >= self.max_queue
+
+    def _prune(self):
+        """
+        Forget clients whose virtual finish is not ahead of vtime; they'd start at vtime anyway.
+        If that isn't enough (many one-off clients during a long busy period), keep only the
+        half furthest ahead, which are the ones fairness would still hold back.
+        """
+        live = {c: f for c, f in self._finish.items() if f > self._vtime}
+        if len(live) > _FINISH_MAX:
+            live = dict(heapq.nlargest(_FINISH_MAX // 2, live.items(), key=lambda item: item[1]))
+        self._finish = live
+
+    def _tag(self, client: str, weight: float) -> float:
+        """Charge a request to client; returns its virtual start. Caller holds the lock."""
+        if len(self._finish) > _FINISH_MAX:
+            self._prune()
+        vstart = max(self._vtime, self._finish.get(client, 0.0))
+        self._finish[client] = vstart + 1.0 / max(weight, 0.01)
+        return vstart
+
+    def acquire(self, client: str | None, weight: float = 1.0):
+        """Wait for a slot (fair across clients); raises Saturated after the queue timeout. Pair with release()."""
+        client = client or "anonymous"
+        with self._cond:
+            vstart = self._tag(client, weight)
+            if self.in_use < self.capacity and not self._waiters:
+                self.in_use += 1
+                self._vtime = vstart
+                return
+            entry = [vstart, next(self._seq), client, False]
+            heapq.heappush(self._waiters, entry)
+            deadline = time.monotonic() + self.timeout
+            while not entry[3]:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    raise Saturated(f"{self.name} saturated", self.retry_after())
+                self._cond.wait(timeout=remaining)
+
+    def try_acquire(self, client: str | None, weight: float = 1.0) -> bool:
+        """Take a slot only if one is free and nobody is queued (optional work, e.g. hedged calls)."""
+        with self._cond:
+            if self.in_use >= self.capacity or self._waiters:
+                return False
+            self._vtime = self._tag(client or "anonymous", weight)
+            self.in_use += 1
+            return True
+
+    def release(self, held: float):
+        """Give back a slot from acquire()/try_acquire(); held is how long it was used."""
+        with self._cond:
+            self._service = 0.8 * self._service + 0.2 * held
+            if self._waiters:
+                entry = heapq.heappop(self._waiters)
+                entry[3] = True  # slot passes straight to the waiter; in_use unchanged
+                self._vtime = entry[0]
+                self._cond.notify_all()
+            else:
+                self.in_use -= 1
+                if not self.in_use and self._finish:
+                    # Idle: the busy period is over, so every client starts afresh at the latest finish
+                    self._vtime = max(self._vtime, max(self._finish.values()))
+                    self._finish.clear()
+
+    @contextmanager
+    def slot(self, client: str | None, weight: float = 1.0):
+        self.acquire(client, weight)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+
+_SCHEDULERS = {}
+_BUCKETS = {}  # (client, endpoint) -> TokenBucket; full buckets are dropped every _BUCKET_SWEEP_SECONDS
+_BUCKET_SWEEP_SECONDS = 60.0
+_swept_at = 0.0
+_LOCK = threading.Lock()
+
+
+def get_scheduler(name: str) -> FairScheduler:
+    with _LOCK:
+        s = _SCHEDULERS.get(name)
+        if s is None:
+            capacity = Config.FAIR_QUEUE_CAPACITY.get(name, 16)
+            s = _SCHEDULERS[name] = FairScheduler(name, capacity, Config.FAIR_QUEUE_MAX_WAITING * capacity,
+                                                  Config.FAIR_QUEUE_TIMEOUT_SECONDS)
+        return s
+
+
+def _sweep_buckets(now: float):
+    """Drop buckets that have refilled; caller holds _LOCK. Keeps rotating client ids from piling up."""
+    global _swept_at
+    if now - _swept_at < _BUCKET_SWEEP_SECONDS:
+        return
+    _swept_at = now
+    for key in [k for k, b in _BUCKETS.items() if b.full(now)]:
+        del _BUCKETS[key]
+
+
+def client_key() -> str:
+    return request.headers.get("X-Client-Id") or request.remote_addr or "anonymous"
+
+
+def _reject(reason: str, retry_after: float):
+    inc("interviewly_admission_rejected_total", route=request.endpoint or "", reason=reason)
+    resp = jsonify({"error": "Too many requests", "reason": reason, "retry_after": math.ceil(retry_after)})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(math.ceil(retry_after))
+    return resp
+
+
+def init_app(app):
+    """Token-bucket limits per client/route and 429s for routes whose upstream is saturated."""
+
+    @app.before_request
+    def _admit():
+        if not app.config.get("ADMISSION_CONTROL"):
+            return None
+        endpoint = request.endpoint
+        g.client_key = client_key()
+        limit = app.config["RATE_LIMITS"].get(endpoint)
+        if limit:
+            with _LOCK:
+                _sweep_buckets(time.monotonic())
+                bucket = _BUCKETS.get((g.client_key, endpoint))
+                if bucket is None:
+                    bucket = _BUCKETS[(g.client_key, endpoint)] = TokenBucket(*limit)
+                wait = bucket.take()
+            if wait:
+                return _reject("rate_limited", wait)
+        upstream = app.config["ROUTE_UPSTREAMS"].get(endpoint)
+        if upstream and get_scheduler(upstream).saturated():
+            return _reject(f"{upstream}_saturated", get_scheduler(upstream).retry_after())
+        return None
+
+    @app.errorhandler(Saturated)
+    def _saturated(e):
+        return _reject("saturated", e.retry_after)
@@ -0,0 +1,73 @@
+"""
+Negotiated response compression for every route.
+
+Brotli is used when the client accepts it and the optional `brotli` package is installed,
+gzip otherwise. Streamed responses (SSE, send_file) and small bodies are left alone.
+"""
+import gzip
+
+from flask import request
+
+from .metrics import inc
+
+try:
+    import brotli
+except ImportError:  # optional; gzip covers every browser
+    brotli = None
+
+_COMPRESSIBLE = ("application/json", "application/x-ndjson", "application/javascript", "text/")
+
+
+def _accepted(header: str) -> dict:
+    """Accept-Encoding -> {coding: q}."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str):
+    accepted = _accepted(header)
+    wildcard = accepted.get("*", 0.0)
+    options = [("br", accepted.get("br", wildcard))] if brotli is not None else []
+    options.append(("gzip", accepted.get("gzip", wildcard)))
+    best = max(options, key=lambda o: o[1])  # ties keep the first, so br wins over gzip
+    return best[0] if best[1] > 0 else None
+
+
+def init_app(app):
+    @app.after_request
+    def _compress(response):
+        if not app.config.get("COMPRESSION", True):
+            return response
+        response.vary.add("Accept-Encoding")
+        if (response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or not (response.mimetype or "").startswith(_COMPRESSIBLE)):
+            return response
+        data = response.get_data()
+        if len(data) < app.config.get("COMPRESS_MIN_BYTES", 1024):
+            return response
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=app.config.get("COMPRESS_BROTLI_QUALITY", 5))
+        elif encoding == "gzip":
+            compressed = gzip.compress(data, compresslevel=app.config.get("COMPRESS_GZIP_LEVEL", 6))
+        else:
+            return response
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        inc("interviewly_compressed_responses_total", encoding=encoding)
+        inc("interviewly_compression_saved_bytes_total", len(data) - len(compressed), encoding=encoding)
+        return response
@@ -0,0 +1,56 @@
+"""
+Per-key debounce timers with generations, for background work that should only start once
+input stops changing (speculative runs, complexity precompute).
+
+Each trigger() bumps the key's generation and restarts its timer; the callback receives the
+generation it was armed with and can poll is_current() to notice it has been superseded.
+A key's entry is dropped once its latest callback returns or it is cancelled, so keys
+(client ids) don't accumulate; generations come from one counter, so a dropped and
+re-created key never reuses a generation an older callback still holds.
+"""
+import itertools
+import threading
+
+
+class Debouncer:
+    def __init__(self):
+        self._entries = {}  # key -> {"generation": int, "timer": Timer | None}; pending or running only
+        self._generations = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _stop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry["timer"] is not None:
+            entry["timer"].cancel()
+
+    def trigger(self, key, delay: float, fn, *args):
+        """Call fn(generation, *args) after delay seconds unless key is triggered again first."""
+        def _fire(generation):
+            try:
+                fn(generation, *args)
+            finally:
+                self._finish(key, generation)
+
+        with self._lock:
+            self._stop(key)
+            generation = next(self._generations)
+            timer = threading.Timer(delay, _fire, args=(generation,))
+            timer.daemon = True
+            self._entries[key] = {"generation": generation, "timer": timer}
+        timer.start()
+
+    def cancel(self, key):
+        """Drop any pending call and mark in-progress work for key as superseded."""
+        with self._lock:
+            self._stop(key)
+
+    def _finish(self, key, generation: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["generation"] == generation:
+                del self._entries[key]
+
+    def is_current(self, key, generation: int) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry["generation"] == generation
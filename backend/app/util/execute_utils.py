@@ -1,10 +1,96 @@
 import json
+import re
+import time
 import requests
+from .executor_health import ExecutorUnavailable, get_health
+from .metrics import timed_upstream, upstream
 
 RUNNER_PY = r"""
 import sys, json, time
 
 
+def _profile_call(call, args, opts):
+    # cProfile for functions, a SIGALRM sampler for lines, tracemalloc for allocations;
+    # the call is stopped after cap_seconds so a TLE test still yields a report
+    import cProfile, pstats, signal, tracemalloc
+
+    class _Stop(BaseException):
+        pass
+
+    cap = float(opts.get("cap_seconds", 2.0))
+    interval = float(opts.get("interval_seconds", 0.001))
+    max_samples = int(opts.get("max_samples", 2000))
+    top = int(opts.get("top", 5))
+    first, last = _USER_LINES
+    me = sys._getframe().f_code.co_filename
+
+    def _user_line(frame):
+        while frame is not None:
+            if frame.f_code.co_filename == me and first <= frame.f_lineno <= last:
+                return frame.f_lineno - first + 1
+            frame = frame.f_back
+        return None
+
+    samples = {}
+    taken = [0]
+    start = time.perf_counter()
+
+    def _tick(signum, frame):
+        if taken[0] < max_samples:
+            taken[0] += 1
+            line = _user_line(frame)
+            if line is not None:
+                samples[line] = samples.get(line, 0) + 1
+        if time.perf_counter() - start >= cap:
+            raise _Stop()
+
+    prof = cProfile.Profile()
+    previous = signal.signal(signal.SIGALRM, _tick)
+    tracemalloc.start()
+    stopped, error, got = False, "", None
+    try:
+        signal.setitimer(signal.ITIMER_REAL, interval, interval)
+        prof.enable()
+        try:
+            got = call(*args)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            prof.disable()
+    except _Stop:
+        stopped = True
+    except Exception as e:
+        error = str(e)
+    finally:
+        signal.signal(signal.SIGALRM, previous)
+    wall_ms = int((time.perf_counter() - start) * 1000)
+    snapshot = tracemalloc.take_snapshot()  # before `got` is dropped, so the result counts
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    functions = []
+    for (fname, lineno, name), (cc, nc, tt, ct, callers) in pstats.Stats(prof).stats.items():
+        if fname == me and first <= lineno <= last:
+            functions.append({"function": name, "line": lineno - first + 1, "calls": nc,
+                              "self_ms": round(tt * 1000, 2), "total_ms": round(ct * 1000, 2)})
+    functions.sort(key=lambda f: -f["self_ms"])
+
+    allocations = []
+    for stat in snapshot.statistics("lineno"):
+        frame = stat.traceback[0]
+        if frame.filename == me and first <= frame.lineno <= last:
+            allocations.append({"line": frame.lineno - first + 1, "kb": round(stat.size / 1024, 1), "count": stat.count})
+            if len(allocations) >= top:
+                break
+
+    attributed = sum(samples.values()) or 1
+    lines = sorted(({"line": l, "samples": n, "pct": round(100.0 * n / attributed, 1)} for l, n in samples.items()),
+                   key=lambda x: -x["samples"])[:top]
+    del got
+    return {"stopped_early": stopped, "cap_ms": int(cap * 1000), "wall_ms": wall_ms, "samples": taken[0],
+            "error": error, "functions": functions[:top], "lines": lines, "allocations": allocations,
+            "peak_kb": round(peak / 1024, 1)}
+
+
 def _main():
     try:
         cfg = json.loads(sys.stdin.read())
@@ -15,7 +101,14 @@ def _main():
         instance = Solution()
         total = len(tests)
         passed = 0
-        results = []
+
+        if cfg.get("profile"):
+            # Profile-only run: no verdicts, one report line per test
+            for t in tests:
+                report = _profile_call(getattr(instance, func_name), t["input"], cfg["profile"])
+                print(json.dumps({"profile_for": t["id"], "profile": report}, default=str), flush=True)
+            print(json.dumps({"summary": {"profiled": total}}), flush=True)
+            return
 
         for t in tests:
             args = t["input"]
@@ -36,7 +129,8 @@ def _main():
             if ok:
                 passed += 1
 
-            results.append({
+            # One line per test, flushed, so a later timeout doesn't lose this verdict
+            print(json.dumps({
                 "id": t["id"],
                 "ok": ok,
                 "expected": expected,
@@ -44,9 +138,9 @@ def _main():
                 "time_ms": dur_ms,
                 "error": err,
                 "checker": checker_name
-            })
+            }), flush=True)
 
-        print(json.dumps({"summary": {"passed": passed, "total": total}, "results": results}))
+        print(json.dumps({"summary": {"passed": passed, "total": total}}), flush=True)
     except Exception as e:
         print("Runner error: " + str(e))
 
@@ -152,8 +246,12 @@ def prep_code(code):
     if typing_needed and "from typing import" not in code and "import typing" not in code:
         typing_imports = f"from typing import {', '.join(typing_needed)}\n"
     
-    # Combine the code with necessary imports, checker functions, and runner
-    combined_source = typing_imports + check_function + "\n" + code.strip() + "\n" + RUNNER_PY
+    # Combine the code with necessary imports, checker functions, and runner.
+    # _USER_LINES lets the profiler report line numbers as the candidate sees them.
+    prefix = typing_imports + check_function + "\n"
+    first = prefix.count("\n") + 1
+    last = first + code.strip().count("\n")
+    combined_source = prefix + code.strip() + "\n" + f"_USER_LINES = ({first}, {last})\n" + RUNNER_PY
     return combined_source
 
 
@@ -177,57 +275,296 @@ def is_tle(signal, stderr, stdout, exit_code):
     return False
 
 
-def run_single_test(piston_url, language, version, combined_source, func_name, test_case, default_checker, run_timeout_ms):
-    """Run a single test via Piston and return a list with one result dict."""
+def preflight_compile(piston_url, language, version, files, func_name, default_checker, run_timeout_ms):
+    """Compile the harnessed source once before any tests are dispatched.
+
+    Python is compiled locally; other languages get a single sandbox run with an
+    empty test batch. Returns None if the source builds, otherwise an error string.
+    Raises ExecutorUnavailable, like run_test_batch, when the executor is down.
+    """
+    if language == "python":
+        try:
+            compile(files[0]["content"], files[0]["name"], "exec")
+        except SyntaxError as e:
+            line = (e.text or "").strip()
+            return f"{type(e).__name__}: {e.msg}" + (f": {line}" if line else "")
+        return None
+
     cfg = {
         "func_name": func_name,
         "args": None,
-        "tests": [test_case],
+        "tests": [],
         "checker": default_checker,
     }
+    try:
+        # Same breaker bookkeeping as the test runs: only transport errors, 429 and 5xx
+        # count against the executor, and a half-open probe that succeeds closes it
+        with upstream("piston", "preflight"):
+            data = _execute(piston_url, language, version, files, cfg, run_timeout_ms)
+    except (requests.RequestException, ValueError):
+        # Can't tell either way (4xx, unparseable body); let the per-test runs surface it
+        return None
+
+    compile_stage = data.get("compile") or {}
+    if compile_stage and compile_stage.get("code") not in (0, None):
+        return compile_stage.get("stderr") or compile_stage.get("output") or "Compilation failed"
+
+    run_stage = data.get("run") or {}
+    stdout = (run_stage.get("stdout") or "").strip()
+    if not stdout and run_stage.get("code") not in (0, None) and not is_tle(run_stage.get("signal"), run_stage.get("stderr"), stdout, run_stage.get("code")):
+        return run_stage.get("stderr") or f"Program failed to start (exit={run_stage.get('code')})"
+    return None
+
+
+def compile_error_result(error, default_checker):
+    """Single result standing in for the whole suite when the source doesn't build."""
+    return {
+        "id": None,
+        "ok": False,
+        "expected": None,
+        "got": None,
+        "time_ms": None,
+        "error": f"Compile error: {error}",
+        "checker": default_checker,
+        "tle": False,
+        "compile_error": True,
+    }
+
+
+def _retry_after_seconds(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def infra_error_result(test_case, default_checker, error):
+    """Result for a test that never ran because the executor failed; not a candidate failure."""
+    return {
+        "id": test_case.get("id"),
+        "ok": False,
+        "expected": test_case.get("output"),
+        "got": None,
+        "time_ms": None,
+        "error": str(error),
+        "checker": test_case.get("checker", default_checker),
+        "tle": False,
+        "infra_error": True,
+    }
+
+
+_HOST_CHECKERS = {}
+
+
+def _match_number_types(expected, got):
+    """JSON from JS/Go/etc. writes 5.0 as 5; make ints floats where the expected value has a float."""
+    if isinstance(expected, float) and isinstance(got, int) and not isinstance(got, bool):
+        return float(got)
+    if isinstance(expected, list) and isinstance(got, list) and len(expected) == len(got):
+        return [_match_number_types(e, g) for e, g in zip(expected, got)]
+    return got
+
+
+def score_result(result: dict, test_case: dict, default_checker: str) -> dict:
+    """
+    Fill ok/expected/checker for a result from a harness that only reports `got`
+    (every language but Python), using the same checkers RUNNER_PY runs in the sandbox.
+    """
+    if not _HOST_CHECKERS:
+        ns = {}
+        exec(check_function, ns)
+        _HOST_CHECKERS.update(ns["CHECKERS"])
+    checker_name = test_case.get("checker", default_checker)
+    expected = test_case.get("output")
+    ok = False
+    if not result.get("error"):
+        try:
+            ok = bool(_HOST_CHECKERS[checker_name](expected, _match_number_types(expected, result.get("got"))))
+        except Exception as e:
+            result["error"] = f"Checker {checker_name} failed: {e}"
+    return {
+        "id": result.get("id", test_case.get("id")),
+        "ok": ok,
+        "expected": expected,
+        "got": result.get("got"),
+        "time_ms": result.get("time_ms"),
+        "error": result.get("error") or "",
+        "checker": checker_name,
+    }
+
+
+def _failed_results(tests, default_checker, error, tle):
+    return [{
+        "id": t.get("id"),
+        "ok": False,
+        "expected": t.get("output"),
+        "got": None,
+        "time_ms": None,
+        "error": error,
+        "checker": t.get("checker", default_checker),
+        "tle": tle,
+    } for t in tests]
+
+
+_RESULT_KEYS = ("id", "got", "time_ms", "error")  # what every harness writes per test
+
+
+def parse_runner_output(stdout: str, tests: list | None = None):
+    """
+    Split harness NDJSON into (per-test results, summary or None, other output lines).
+
+    Lines that aren't harness JSON (the candidate's own prints, "Runner error: ...") are
+    returned separately rather than failing the parse. With `tests`, a line only counts
+    as a result if it is shaped like one and carries the id of the next test in order,
+    so a candidate printing JSON with an "id" can't stand in for a verdict.
+    """
+    results, summary, other = [], None, []
+    for line in stdout.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line) if line.startswith("{") else None
+        except ValueError:
+            obj = None
+        if isinstance(obj, dict) and "summary" in obj and "id" not in obj:
+            summary = obj["summary"]
+        elif isinstance(obj, dict) and all(k in obj for k in _RESULT_KEYS) and _is_next(obj, tests, len(results)):
+            results.append(obj)
+        else:
+            other.append(line)
+    return results, summary, other
+
+
+def _is_next(result: dict, tests: list | None, done: int) -> bool:
+    if tests is None:
+        return True
+    if done >= len(tests):
+        return False
+    want = tests[done].get("id")
+    return result["id"] == want or str(result["id"]) == str(want)
+
+
+def _execute(piston_url, language, version, files, cfg, run_timeout_ms) -> dict:
+    """POST one harness run to Piston, feeding the circuit breaker; returns the response JSON."""
     payload = {
         "language": language,
         "version": version,
-        "files": [{"name": "main.py", "content": combined_source}],
+        "files": files,
         "stdin": json.dumps(cfg),
         "run_timeout": run_timeout_ms,
     }
 
-    r = requests.post(piston_url, json=payload, timeout=(10, 60))
+    health = get_health(piston_url)
+    if not health.allow():
+        raise ExecutorUnavailable(f"Executor unavailable (circuit open): {health.last_error}", retryable=True)
+
+    start = time.monotonic()
+    try:
+        r = requests.post(piston_url, json=payload, timeout=(5, health.read_timeout(run_timeout_ms)))
+    except requests.RequestException as e:
+        # Connect/read timeouts here are the executor being slow, not the candidate's code;
+        # in-sandbox TLEs come back as a normal response with a kill signal
+        health.record_failure(str(e))
+        # A refused connection never reached the sandbox, so it's safe to try elsewhere
+        retryable = isinstance(e, requests.ConnectionError) and not isinstance(e, requests.ReadTimeout)
+        raise ExecutorUnavailable(f"Executor request failed: {e}", retryable=retryable) from e
+    if r.status_code == 429 or r.status_code >= 500:
+        retry_after = _retry_after_seconds(r.headers.get("Retry-After")) if r.status_code == 429 else None
+        health.record_failure(f"HTTP {r.status_code}", retry_after=retry_after)
+        raise ExecutorUnavailable(f"Executor returned HTTP {r.status_code}", retryable=r.status_code == 429)
+    health.record_success(time.monotonic() - start)
     r.raise_for_status()
-    data = r.json()
+    return r.json()
+
+
+# Interpreters report a source that doesn't parse on stderr before running anything
+_SYNTAX_ERROR = re.compile(r"syntax ?error|parse ?error", re.IGNORECASE)
+
 
-    stdout = (data.get("run") or {}).get("stdout", "").strip()
+@timed_upstream("piston", "run")
+def run_test_batch(piston_url, language, version, files, func_name, tests, default_checker, run_timeout_ms,
+                   isolate_first=False):
+    """
+    Run a batch of tests in one Piston request and return result dicts in test order.
+
+    Python dispatches one test per batch; the other harnesses send the whole suite so
+    compiled languages build once. A failed compile stage, or an interpreter that exits
+    with a syntax/parse error before any test, comes back as a single compile_error_result.
+
+    If the sandbox killed the run partway (timeout, OOM, crash), the result list is
+    shorter than the batch: it holds the tests that finished, or, when the first test
+    itself timed out, a failed result for it. Callers re-dispatch the rest. A run that
+    dies some other way before finishing any test fails the whole batch with that error,
+    so a harness that can't start isn't re-run once per test; isolate_first (set by the
+    caller for a re-dispatched tail, where earlier tests did run) fails only the first.
+    """
+    cfg = {
+        "func_name": func_name,
+        "args": None,
+        "tests": tests,
+        "checker": default_checker,
+    }
+    data = _execute(piston_url, language, version, files, cfg, run_timeout_ms)
+
+    compile_stage = data.get("compile") or {}
+    if compile_stage and compile_stage.get("code") not in (0, None):
+        error = compile_stage.get("stderr") or compile_stage.get("output") or "Compilation failed"
+        return [compile_error_result(error, default_checker)]
+
+    stdout = (data.get("run") or {}).get("stdout") or ""
     stderr = (data.get("run") or {}).get("stderr", "")
     signal = (data.get("run") or {}).get("signal", None)
     exit_code = (data.get("run") or {}).get("code", None)
 
-    if not stdout:
-        tle = is_tle(signal, stderr, stdout, exit_code)
-        return [{
-            "id": test_case.get("id"),
-            "ok": False,
-            "expected": test_case.get("output"),
-            "got": None,
-            "time_ms": None,
-            "error": stderr or f"Empty stdout (signal={signal}, exit={exit_code})",
-            "checker": test_case.get("checker", default_checker),
-            "tle": tle,
-        }]
+    results, summary, other = parse_runner_output(stdout, tests)
+    # Harnesses other than RUNNER_PY leave scoring to us; results are in test order
+    scored = [r if "ok" in r else score_result(r, t, default_checker) for r, t in zip(results, tests)]
+    if len(scored) == len(tests):
+        return scored
 
-    try:
-        runner_json = json.loads(stdout)
-        results = runner_json.get("results", [])
-        return results
-    except Exception as e:
+    if signal or exit_code not in (0, None):
+        # Killed or crashed while running tests[len(scored)]. Keep what finished; if the
+        # culprit had the whole run to itself, that's its verdict, else it gets a fresh run.
+        if scored:
+            return scored
         tle = is_tle(signal, stderr, stdout, exit_code)
-        return [{
-            "id": test_case.get("id"),
-            "ok": False,
-            "expected": test_case.get("output"),
-            "got": None,
-            "time_ms": None,
-            "error": f"Failed to parse runner output: {e}",
-            "checker": test_case.get("checker", default_checker),
-            "tle": tle,
-        }]
\ No newline at end of file
+        error = stderr or "\n".join(other) or f"Empty stdout (signal={signal}, exit={exit_code})"
+        if tle or isolate_first:
+            return _failed_results(tests[:1], default_checker, error, tle)
+        if summary is None and _SYNTAX_ERROR.search(stderr or ""):
+            return [compile_error_result(error, default_checker)]
+        return _failed_results(tests, default_checker, error, False)
+
+    # The harness exited normally without reporting every test (e.g. "Runner error: ..."),
+    # so running the rest again would fail the same way
+    if scored or summary is not None:
+        error = "\n".join(other) or stderr or "Runner reported no result"
+    else:
+        error = "\n".join(other) or stderr or f"Empty stdout (signal={signal}, exit={exit_code})"
+    return scored + _failed_results(tests[len(scored):], default_checker, error, False)
+
+
+@timed_upstream("piston", "profile")
+def run_profile(piston_url, language, version, files, func_name, test_case, run_timeout_ms, options):
+    """
+    Profile one test in a separate sandbox run (RUNNER_PY only) and return its report:
+    top functions by self time, lines by sampled time and allocation, peak memory.
+    options: cap_seconds, interval_seconds, max_samples, top.
+    """
+    cfg = {"func_name": func_name, "args": None, "tests": [test_case], "profile": options}
+    data = _execute(piston_url, language, version, files, cfg, run_timeout_ms)
+    run_stage = data.get("run") or {}
+    for line in (run_stage.get("stdout") or "").splitlines():
+        try:
+            obj = json.loads(line) if line.startswith("{") else None
+        except ValueError:
+            continue
+        if isinstance(obj, dict) and isinstance(obj.get("profile"), dict):
+            return obj["profile"]
+    raise RuntimeError(run_stage.get("stderr") or f"Profiler produced no report (signal={run_stage.get('signal')}, exit={run_stage.get('code')})")
+
+
+def run_single_test(piston_url, language, version, files, func_name, test_case, default_checker, run_timeout_ms):
+    """Run a single test via Piston and return a list with one result dict."""
+    return run_test_batch(piston_url, language, version, files, func_name, [test_case], default_checker, run_timeout_ms)
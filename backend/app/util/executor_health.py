@@ -0,0 +1,139 @@
+"""
+Per-endpoint health tracking for Piston executors: circuit breaker + adaptive timeouts.
+
+State machine per endpoint URL:
+  closed     -> requests flow; `failure_threshold` consecutive failures (or a 429) opens it
+  open       -> requests fail fast for `cooldown` seconds (longer if upstream sent Retry-After)
+  half_open  -> one probe request is let through; success closes, failure re-opens
+"""
+import threading
+import time
+from collections import deque
+
+from ..config import Config
+
+
+class ExecutorUnavailable(Exception):
+    """The executor failed or is known-bad; not the candidate's fault.
+
+    retryable=True means the request never ran there, so another node may take it.
+    """
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class EndpointHealth:
+    def __init__(self, url: str, *, failure_threshold: int, cooldown: float,
+                 min_timeout: float, max_timeout: float, window: int = 200):
+        self.url = url
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probe_in_flight = False
+        self.last_error = None
+        self._latencies = deque(maxlen=window)  # seconds per successful request
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """May a request be sent now? Transitions open -> half_open after the cooldown."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now >= self.open_until:
+                self.state = "half_open"
+                self.probe_in_flight = False
+            if self.state == "half_open" and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def is_available(self) -> bool:
+        """Like allow() but without claiming the half-open probe; used for routing."""
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() >= self.open_until
+            return self.state == "closed" or not self.probe_in_flight
+
+    def available_in(self) -> float | None:
+        """Seconds until is_available() turns true by itself (0 if it is now); None if that takes a request."""
+        with self._lock:
+            if self.state == "open":
+                return max(0.0, self.open_until - time.monotonic())
+            return 0.0 if self.state == "closed" or not self.probe_in_flight else None
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            self.consecutive_failures = 0
+            self.state = "closed"
+            self.probe_in_flight = False
+
+    def record_failure(self, error: str, retry_after: float | None = None):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = error
+            self.probe_in_flight = False
+            if self.state == "half_open" or retry_after is not None or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.open_until = time.monotonic() + max(self.cooldown, retry_after or 0.0)
+
+    def latency_percentile(self, p: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < 5:
+            return None
+        return samples[min(len(samples) - 1, int(p / 100.0 * len(samples)))]
+
+    def read_timeout(self, run_timeout_ms: int) -> float:
+        """
+        Read timeout for one request: the sandbox's own run budget plus twice the p99
+        latency of recent successes, clamped to [min_timeout, max_timeout].
+        Without enough samples we use max_timeout, the old fixed behavior.
+        """
+        budget = (run_timeout_ms or 0) / 1000.0
+        p99 = self.latency_percentile(99)
+        if p99 is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, budget + 2 * p99 + 1.0))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "url": self.url,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "open_for_seconds": max(0.0, round(self.open_until - time.monotonic(), 1)) if self.state == "open" else 0.0,
+                "samples": len(self._latencies),
+                "last_error": self.last_error,
+            }
+
+
+_ENDPOINTS = {}
+_ENDPOINTS_LOCK = threading.Lock()
+
+
+def get_health(url: str) -> EndpointHealth:
+    with _ENDPOINTS_LOCK:
+        h = _ENDPOINTS.get(url)
+        if h is None:
+            h = _ENDPOINTS[url] = EndpointHealth(
+                url,
+                failure_threshold=Config.PISTON_BREAKER_FAILURES,
+                cooldown=Config.PISTON_BREAKER_COOLDOWN_SECONDS,
+                min_timeout=Config.PISTON_MIN_READ_TIMEOUT_SECONDS,
+                max_timeout=Config.PISTON_MAX_READ_TIMEOUT_SECONDS,
+            )
+        return h
+
+
+def all_health() -> list:
+    with _ENDPOINTS_LOCK:
+        items = list(_ENDPOINTS.values())
+    return [h.snapshot() for h in items]
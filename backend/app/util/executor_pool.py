@@ -0,0 +1,114 @@
+"""
+Pool of Piston executor nodes with least-loaded routing.
+
+Nodes come from Config.PISTON_ENDPOINTS. Each dispatch picks the available node with the
+fewest outstanding requests relative to its weight, respects per-node concurrency limits
+(waiting up to PISTON_QUEUE_TIMEOUT_SECONDS for a slot), and retries on a different node
+when the failure means the request never ran (connection refused, circuit open, 429).
+Dispatches first take a slot on the "piston" fair scheduler, so when the pool is saturated
+clients are served in fair order rather than whoever retries fastest.
+"""
+import threading
+import time
+
+from ..config import Config
+from .admission import get_scheduler
+from .executor_health import ExecutorUnavailable, get_health
+
+
+class _Node:
+    def __init__(self, url: str, weight: float, max_concurrency: int):
+        self.url = url
+        self.weight = max(weight, 0.01)
+        self.max_concurrency = max(1, max_concurrency)
+        self.outstanding = 0
+
+    def load(self) -> float:
+        return self.outstanding / self.weight
+
+
+class ExecutorPool:
+    def __init__(self, endpoints: list, queue_timeout: float):
+        self.nodes = [_Node(e["url"], e.get("weight", 1.0), e.get("max_concurrency", 8)) for e in endpoints]
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+
+    def _pick(self, exclude: set):
+        candidates = [
+            n for n in self.nodes
+            if n.url not in exclude and n.outstanding < n.max_concurrency and get_health(n.url).is_available()
+        ]
+        return min(candidates, key=lambda n: (n.load(), -n.weight), default=None)
+
+    def acquire(self, exclude: set = frozenset()):
+        """Reserve a slot on the least-loaded usable node; None if no node can ever take it."""
+        deadline = time.monotonic() + self.queue_timeout
+        with self._cond:
+            while True:
+                node = self._pick(exclude)
+                if node is not None:
+                    node.outstanding += 1
+                    return node
+                usable = [n for n in self.nodes if n.url not in exclude and get_health(n.url).is_available()]
+                remaining = deadline - time.monotonic()
+                if not usable or remaining <= 0:
+                    return None
+                # Every usable node is at its concurrency limit; wait for a release, or until
+                # an open circuit's cooldown ends (that frees a node without any release)
+                reopening = [get_health(n.url).available_in() for n in self.nodes
+                             if n.url not in exclude and n not in usable]
+                wake = min([t for t in reopening if t], default=remaining)
+                self._cond.wait(timeout=min(remaining, wake))
+
+    def release(self, node):
+        with self._cond:
+            node.outstanding -= 1
+            # Every waiter: the first one woken may have this node in its exclude set
+            self._cond.notify_all()
+
+    def run(self, fn, client_id: str | None = None):
+        """Call fn(url) on a pool node, moving to another node if the request never ran there."""
+        with get_scheduler("piston").slot(client_id):
+            return self._run(fn)
+
+    def _run(self, fn):
+        tried = set()
+        last = None
+        for _ in range(len(self.nodes)):
+            node = self.acquire(exclude=tried)
+            if node is None:
+                break
+            try:
+                return fn(node.url)
+            except ExecutorUnavailable as e:
+                tried.add(node.url)
+                last = e
+                if not e.retryable:
+                    raise
+            finally:
+                self.release(node)
+        raise last or ExecutorUnavailable("No executor available (all nodes busy or circuit open)")
+
+    def snapshot(self) -> list:
+        with self._cond:
+            return [{"url": n.url, "weight": n.weight, "max_concurrency": n.max_concurrency,
+                     "outstanding": n.outstanding} for n in self.nodes]
+
+
+_POOL = None
+_ADHOC = {}  # client-supplied URL -> single-node pool, only when PISTON_ALLOW_CLIENT_URL
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool(requested_url: str | None = None) -> ExecutorPool:
+    """The configured pool, or a single-node pool for requested_url if clients may choose."""
+    global _POOL
+    with _POOL_LOCK:
+        if requested_url and Config.PISTON_ALLOW_CLIENT_URL:
+            pool = _ADHOC.get(requested_url)
+            if pool is None:
+                pool = _ADHOC[requested_url] = ExecutorPool([{"url": requested_url}], Config.PISTON_QUEUE_TIMEOUT_SECONDS)
+            return pool
+        if _POOL is None:
+            _POOL = ExecutorPool(Config.PISTON_ENDPOINTS, Config.PISTON_QUEUE_TIMEOUT_SECONDS)
+        return _POOL
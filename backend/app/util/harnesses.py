@@ -0,0 +1,887 @@
+"""
+Per-language runner harnesses.
+
+Every harness reads the same stdin JSON as RUNNER_PY ({"func_name", "tests": [{"id", "input", ...}]})
+and prints NDJSON: one flushed line per test as it completes, in test order, then a
+{"summary": ...} line. A run killed partway still leaves the finished tests' lines in
+stdout. Python scores itself with the checkers in check_function; the other harnesses
+only report {"id", "got", "time_ms", "error"} and the
+backend scores them with the same checkers (see execute_utils.score_result), so none of
+them needs a comparison library.
+
+Non-Python languages run the whole suite in one sandbox request, so compiled languages
+(Java, C++, Go, Rust) pay the compile once per batch instead of once per test.
+"""
+import re
+
+from .execute_utils import prep_code
+
+RUNNER_JS = r"""
+;(function () {
+    const cfg = JSON.parse(require("fs").readFileSync(0, "utf8"));
+    const name = cfg.func_name;
+    let target = null;
+    let lookupError = "";
+    try {
+        if (typeof Solution !== "undefined") {
+            const inst = new Solution();
+            target = inst[name].bind(inst);
+        } else {
+            target = eval(name);
+        }
+        if (typeof target !== "function") throw new Error("function " + name + " not found");
+    } catch (e) {
+        lookupError = String(e && e.message ? e.message : e);
+    }
+    let count = 0;
+    for (const t of cfg.tests) {
+        const start = process.hrtime.bigint();
+        let got = null;
+        let error = lookupError;
+        if (!error) {
+            try {
+                got = target(...t.input);
+                if (got === undefined) got = null;
+            } catch (e) {
+                error = String(e && e.message ? e.message : e);
+            }
+        }
+        const ms = Number((process.hrtime.bigint() - start) / 1000000n);
+        // Writes to a pipe are synchronous, so each line is out before the next test starts
+        process.stdout.write(JSON.stringify({ id: t.id, got: got, time_ms: ms, error: error }) + "\n");
+        count++;
+    }
+    process.stdout.write(JSON.stringify({ summary: { total: count } }) + "\n");
+})();
+"""
+
+RUNNER_RUBY = r"""
+require 'json'
+
+__cfg = JSON.parse($stdin.read)
+__name = __cfg['func_name']
+__snake = __name.gsub(/([a-z\d])([A-Z])/, '\1_\2').downcase
+__recv = defined?(Solution) ? Solution.new : self
+__meth = [__name, __snake].find { |n| __recv.respond_to?(n, true) }
+$stdout.sync = true
+__cfg['tests'].each do |t|
+  start = Process.clock_gettime(Process::CLOCK_MONOTONIC)
+  got = nil
+  err = ''
+  begin
+    raise NoMethodError, "function #{__name} not found" unless __meth
+    got = __recv.send(__meth, *t['input'])
+  rescue StandardError => e
+    err = e.message
+  end
+  puts JSON.generate({ id: t['id'], got: got, time_ms: ((Process.clock_gettime(Process::CLOCK_MONOTONIC) - start) * 1000).to_i, error: err })
+end
+puts JSON.generate({ summary: { total: __cfg['tests'].length } })
+"""
+
+RUNNER_PHP = r"""
+$__cfg = json_decode(stream_get_contents(STDIN), true);
+$__name = $__cfg['func_name'];
+$__target = null;
+if (class_exists('Solution') && method_exists('Solution', $__name)) {
+    $__target = [new Solution(), $__name];
+} elseif (function_exists($__name)) {
+    $__target = $__name;
+}
+$__count = 0;
+foreach ($__cfg['tests'] as $t) {
+    $start = hrtime(true);
+    $got = null;
+    $err = '';
+    try {
+        if ($__target === null) {
+            throw new Exception("function $__name not found");
+        }
+        $got = call_user_func_array($__target, $t['input']);
+    } catch (Throwable $e) {
+        $err = $e->getMessage();
+    }
+    echo json_encode(['id' => $t['id'] ?? null, 'got' => $got, 'time_ms' => intdiv(hrtime(true) - $start, 1000000), 'error' => $err]), "\n";
+    flush();
+    $__count++;
+}
+echo json_encode(['summary' => ['total' => $__count]]), "\n";
+"""
+
+# __FUNC__ is replaced with the target function name
+RUNNER_GO = r"""
+func main() {
+	raw, _ := io.ReadAll(os.Stdin)
+	var cfg struct {
+		Tests []struct {
+			ID    interface{}       `json:"id"`
+			Input []json.RawMessage `json:"input"`
+		} `json:"tests"`
+	}
+	if err := json.Unmarshal(raw, &cfg); err != nil {
+		fmt.Println("Runner error: " + err.Error())
+		return
+	}
+	fn := reflect.ValueOf(__FUNC__)
+	ft := fn.Type()
+	for _, t := range cfg.Tests {
+		res := map[string]interface{}{"id": t.ID, "got": nil, "error": ""}
+		start := time.Now()
+		func() {
+			defer func() {
+				if r := recover(); r != nil {
+					res["error"] = fmt.Sprint(r)
+				}
+			}()
+			if len(t.Input) != ft.NumIn() {
+				panic(fmt.Sprintf("expected %d arguments, got %d", ft.NumIn(), len(t.Input)))
+			}
+			args := make([]reflect.Value, ft.NumIn())
+			for i := range args {
+				p := reflect.New(ft.In(i))
+				if err := json.Unmarshal(t.Input[i], p.Interface()); err != nil {
+					panic(fmt.Sprintf("argument %d: %v", i, err))
+				}
+				args[i] = p.Elem()
+			}
+			if out := fn.Call(args); len(out) > 0 {
+				res["got"] = out[0].Interface()
+			}
+		}()
+		res["time_ms"] = time.Since(start).Milliseconds()
+		// os.Stdout is unbuffered, so each line is written as soon as its test finishes
+		out, err := json.Marshal(res)
+		if err != nil {
+			res["got"], res["error"] = nil, "unserializable result: "+err.Error()
+			out, _ = json.Marshal(res)
+		}
+		fmt.Println(string(out))
+	}
+	fmt.Printf("{\"summary\":{\"total\":%d}}\n", len(cfg.Tests))
+}
+"""
+
+GO_HARNESS_IMPORTS = ["encoding/json", "fmt", "io", "os", "reflect", "time"]
+# Like LeetCode, import these when the code uses them without importing
+GO_AUTO_IMPORTS = ["bytes", "container/heap", "math", "sort", "strconv", "strings", "unicode"]
+
+# The Main class must come first: Java's single-file launcher runs the first top-level class
+RUNNER_JAVA = r"""
+@SuppressWarnings("unchecked")
+class Main {
+    public static void main(String[] argv) throws Exception {
+        String raw = new String(System.in.readAllBytes(), java.nio.charset.StandardCharsets.UTF_8);
+        Map<String, Object> cfg = (Map<String, Object>) new HarnessJson(raw).parse();
+        String name = (String) cfg.get("func_name");
+        List<Object> tests = (List<Object>) cfg.get("tests");
+
+        Method method = null;
+        Object instance = null;
+        String lookupError = "";
+        try {
+            Class<?> cls = Class.forName("Solution");
+            for (Method m : cls.getDeclaredMethods()) {
+                if (m.getName().equals(name)) { method = m; break; }
+            }
+            if (method == null) throw new NoSuchMethodException("function " + name + " not found");
+            method.setAccessible(true);
+            if (!Modifier.isStatic(method.getModifiers())) {
+                Constructor<?> ctor = cls.getDeclaredConstructor();
+                ctor.setAccessible(true);
+                instance = ctor.newInstance();
+            }
+        } catch (Throwable e) {
+            lookupError = e.toString();
+        }
+
+        for (int i = 0; i < tests.size(); i++) {
+            Map<String, Object> t = (Map<String, Object>) tests.get(i);
+            Object got = null;
+            String error = lookupError;
+            long start = System.nanoTime();
+            if (error.isEmpty()) {
+                try {
+                    List<Object> input = (List<Object>) t.get("input");
+                    Type[] types = method.getGenericParameterTypes();
+                    if (input.size() != types.length) {
+                        throw new IllegalArgumentException("expected " + types.length + " arguments, got " + input.size());
+                    }
+                    Object[] args = new Object[types.length];
+                    for (int j = 0; j < types.length; j++) args[j] = HarnessJson.convert(input.get(j), types[j]);
+                    got = method.invoke(instance, args);
+                } catch (InvocationTargetException e) {
+                    error = String.valueOf(e.getCause());
+                } catch (Throwable e) {
+                    error = e.toString();
+                }
+            }
+            long ms = (System.nanoTime() - start) / 1000000L;
+            StringBuilder out = new StringBuilder("{\"id\":");
+            out.append(HarnessJson.write(t.get("id")))
+               .append(",\"got\":").append(HarnessJson.write(got))
+               .append(",\"time_ms\":").append(ms)
+               .append(",\"error\":").append(HarnessJson.write(error)).append('}');
+            System.out.println(out);
+            System.out.flush();
+        }
+        System.out.println("{\"summary\":{\"total\":" + tests.size() + "}}");
+    }
+}
+
+@SuppressWarnings("unchecked")
+class HarnessJson {
+    private final String s;
+    private int i = 0;
+
+    HarnessJson(String s) { this.s = s; }
+
+    Object parse() {
+        skip();
+        char c = s.charAt(i);
+        if (c == '{') {
+            Map<String, Object> m = new LinkedHashMap<>();
+            i++; skip();
+            if (s.charAt(i) == '}') { i++; return m; }
+            while (true) {
+                skip(); String k = (String) parse(); skip(); i++;  // ':'
+                m.put(k, parse()); skip();
+                if (s.charAt(i++) == '}') return m;
+            }
+        }
+        if (c == '[') {
+            List<Object> a = new ArrayList<>();
+            i++; skip();
+            if (s.charAt(i) == ']') { i++; return a; }
+            while (true) {
+                a.add(parse()); skip();
+                if (s.charAt(i++) == ']') return a;
+            }
+        }
+        if (c == '"') {
+            StringBuilder b = new StringBuilder();
+            i++;
+            while (s.charAt(i) != '"') {
+                char ch = s.charAt(i++);
+                if (ch == '\\') {
+                    char e = s.charAt(i++);
+                    switch (e) {
+                        case 'n': b.append('\n'); break;
+                        case 't': b.append('\t'); break;
+                        case 'r': b.append('\r'); break;
+                        case 'b': b.append('\b'); break;
+                        case 'f': b.append('\f'); break;
+                        case 'u': b.append((char) Integer.parseInt(s.substring(i, i + 4), 16)); i += 4; break;
+                        default: b.append(e);
+                    }
+                } else {
+                    b.append(ch);
+                }
+            }
+            i++;
+            return b.toString();
+        }
+        if (s.startsWith("true", i)) { i += 4; return Boolean.TRUE; }
+        if (s.startsWith("false", i)) { i += 5; return Boolean.FALSE; }
+        if (s.startsWith("null", i)) { i += 4; return null; }
+        int start = i;
+        while (i < s.length() && "+-0123456789.eE".indexOf(s.charAt(i)) >= 0) i++;
+        String num = s.substring(start, i);
+        if (num.contains(".") || num.contains("e") || num.contains("E")) return Double.parseDouble(num);
+        return Long.parseLong(num);
+    }
+
+    private void skip() {
+        while (i < s.length() && Character.isWhitespace(s.charAt(i))) i++;
+    }
+
+    static Object convert(Object v, Type t) {
+        if (v == null) return null;
+        if (t instanceof ParameterizedType) {
+            ParameterizedType p = (ParameterizedType) t;
+            Class<?> raw = (Class<?>) p.getRawType();
+            if (Collection.class.isAssignableFrom(raw)) {
+                Collection<Object> c = Set.class.isAssignableFrom(raw) ? new LinkedHashSet<Object>() : new ArrayList<Object>();
+                for (Object x : (List<Object>) v) c.add(convert(x, p.getActualTypeArguments()[0]));
+                return c;
+            }
+            if (Map.class.isAssignableFrom(raw)) {
+                Map<Object, Object> m = new LinkedHashMap<>();
+                for (Map.Entry<String, Object> e : ((Map<String, Object>) v).entrySet()) {
+                    m.put(e.getKey(), convert(e.getValue(), p.getActualTypeArguments()[1]));
+                }
+                return m;
+            }
+            return v;
+        }
+        Class<?> c = (Class<?>) t;
+        if (c == int.class || c == Integer.class) return ((Number) v).intValue();
+        if (c == long.class || c == Long.class) return ((Number) v).longValue();
+        if (c == double.class || c == Double.class) return ((Number) v).doubleValue();
+        if (c == float.class || c == Float.class) return ((Number) v).floatValue();
+        if (c == short.class || c == Short.class) return ((Number) v).shortValue();
+        if (c == byte.class || c == Byte.class) return ((Number) v).byteValue();
+        if (c == boolean.class || c == Boolean.class) return v;
+        if (c == char.class || c == Character.class) return ((String) v).charAt(0);
+        if (c == String.class) return v;
+        if (c.isArray()) {
+            List<Object> l = (List<Object>) v;
+            Object arr = Array.newInstance(c.getComponentType(), l.size());
+            for (int k = 0; k < l.size(); k++) Array.set(arr, k, convert(l.get(k), c.getComponentType()));
+            return arr;
+        }
+        if (List.class.isAssignableFrom(c) || c == Collection.class) {
+            return new ArrayList<>((List<Object>) v);
+        }
+        return v;
+    }
+
+    static String write(Object v) {
+        if (v == null) return "null";
+        if (v instanceof String || v instanceof Character) {
+            StringBuilder b = new StringBuilder("\"");
+            for (char ch : v.toString().toCharArray()) {
+                if (ch == '"' || ch == '\\') b.append('\\').append(ch);
+                else if (ch == '\n') b.append("\\n");
+                else if (ch == '\t') b.append("\\t");
+                else if (ch == '\r') b.append("\\r");
+                else if (ch < 0x20) b.append(String.format("\\u%04x", (int) ch));
+                else b.append(ch);
+            }
+            return b.append('"').toString();
+        }
+        if (v instanceof Double || v instanceof Float) {
+            double d = ((Number) v).doubleValue();
+            return Double.isNaN(d) || Double.isInfinite(d) ? "null" : Double.toString(d);
+        }
+        if (v instanceof Number || v instanceof Boolean) return v.toString();
+        if (v.getClass().isArray()) {
+            StringBuilder b = new StringBuilder("[");
+            for (int k = 0; k < Array.getLength(v); k++) {
+                if (k > 0) b.append(',');
+                b.append(write(Array.get(v, k)));
+            }
+            return b.append(']').toString();
+        }
+        if (v instanceof Iterable) {
+            StringBuilder b = new StringBuilder("[");
+            boolean first = true;
+            for (Object x : (Iterable<?>) v) {
+                if (!first) b.append(',');
+                b.append(write(x));
+                first = false;
+            }
+            return b.append(']').toString();
+        }
+        if (v instanceof Map) {
+            StringBuilder b = new StringBuilder("{");
+            boolean first = true;
+            for (Map.Entry<?, ?> e : ((Map<?, ?>) v).entrySet()) {
+                if (!first) b.append(',');
+                b.append(write(String.valueOf(e.getKey()))).append(':').append(write(e.getValue()));
+                first = false;
+            }
+            return b.append('}').toString();
+        }
+        return write(v.toString());
+    }
+}
+"""
+
+JAVA_HARNESS_IMPORTS = ["java.util.*", "java.lang.reflect.*"]
+
+CPP_PRELUDE = r"""
+#include <bits/stdc++.h>
+using namespace std;
+"""
+
+# __CALL__ is replaced with a pointer to the target, e.g. &Solution::twoSum
+RUNNER_CPP = r"""
+struct HarnessJson {
+    enum Kind { NUL, BOOL, NUM, STR, ARR, OBJ } kind = NUL;
+    bool b = false;
+    string text;  // number literal or string value
+    vector<HarnessJson> items;
+    vector<pair<string, HarnessJson>> fields;
+};
+
+struct HarnessParser {
+    const string& s;
+    size_t i = 0;
+    explicit HarnessParser(const string& src) : s(src) {}
+    void skip() { while (i < s.size() && isspace((unsigned char)s[i])) i++; }
+    static void put_utf8(string& out, unsigned cp) {
+        if (cp < 0x80) out += (char)cp;
+        else if (cp < 0x800) { out += (char)(0xC0 | (cp >> 6)); out += (char)(0x80 | (cp & 0x3F)); }
+        else { out += (char)(0xE0 | (cp >> 12)); out += (char)(0x80 | ((cp >> 6) & 0x3F)); out += (char)(0x80 | (cp & 0x3F)); }
+    }
+    string str() {
+        string out;
+        i++;
+        while (s[i] != '"') {
+            char c = s[i++];
+            if (c != '\\') { out += c; continue; }
+            char e = s[i++];
+            if (e == 'n') out += '\n';
+            else if (e == 't') out += '\t';
+            else if (e == 'r') out += '\r';
+            else if (e == 'b') out += '\b';
+            else if (e == 'f') out += '\f';
+            else if (e == 'u') { put_utf8(out, (unsigned)stoul(s.substr(i, 4), nullptr, 16)); i += 4; }
+            else out += e;
+        }
+        i++;
+        return out;
+    }
+    HarnessJson parse() {
+        skip();
+        HarnessJson v;
+        char c = s[i];
+        if (c == '{') {
+            v.kind = HarnessJson::OBJ; i++; skip();
+            if (s[i] == '}') { i++; return v; }
+            while (true) {
+                skip(); string k = str(); skip(); i++;
+                v.fields.push_back({k, parse()}); skip();
+                if (s[i++] == '}') return v;
+            }
+        }
+        if (c == '[') {
+            v.kind = HarnessJson::ARR; i++; skip();
+            if (s[i] == ']') { i++; return v; }
+            while (true) {
+                v.items.push_back(parse()); skip();
+                if (s[i++] == ']') return v;
+            }
+        }
+        if (c == '"') { v.kind = HarnessJson::STR; v.text = str(); return v; }
+        if (s.compare(i, 4, "true") == 0) { v.kind = HarnessJson::BOOL; v.b = true; i += 4; return v; }
+        if (s.compare(i, 5, "false") == 0) { v.kind = HarnessJson::BOOL; i += 5; return v; }
+        if (s.compare(i, 4, "null") == 0) { i += 4; return v; }
+        size_t start = i;
+        while (i < s.size() && strchr("+-0123456789.eE", s[i])) i++;
+        v.kind = HarnessJson::NUM; v.text = s.substr(start, i - start);
+        return v;
+    }
+};
+
+template <class T> struct HarnessFrom;
+template <> struct HarnessFrom<int> { static int get(const HarnessJson& v) { return (int)stoll(v.text); } };
+template <> struct HarnessFrom<long> { static long get(const HarnessJson& v) { return (long)stoll(v.text); } };
+template <> struct HarnessFrom<long long> { static long long get(const HarnessJson& v) { return stoll(v.text); } };
+template <> struct HarnessFrom<unsigned> { static unsigned get(const HarnessJson& v) { return (unsigned)stoull(v.text); } };
+template <> struct HarnessFrom<double> { static double get(const HarnessJson& v) { return stod(v.text); } };
+template <> struct HarnessFrom<float> { static float get(const HarnessJson& v) { return stof(v.text); } };
+template <> struct HarnessFrom<bool> { static bool get(const HarnessJson& v) { return v.b; } };
+template <> struct HarnessFrom<char> { static char get(const HarnessJson& v) { return v.text.empty() ? '\0' : v.text[0]; } };
+template <> struct HarnessFrom<string> { static string get(const HarnessJson& v) { return v.text; } };
+template <class T> struct HarnessFrom<vector<T>> {
+    static vector<T> get(const HarnessJson& v) {
+        vector<T> out;
+        for (const auto& x : v.items) out.push_back(HarnessFrom<T>::get(x));
+        return out;
+    }
+};
+
+static string harness_quote(const string& s) {
+    string out = "\"";
+    for (unsigned char c : s) {
+        if (c == '"' || c == '\\') { out += '\\'; out += (char)c; }
+        else if (c == '\n') out += "\\n";
+        else if (c == '\t') out += "\\t";
+        else if (c == '\r') out += "\\r";
+        else if (c < 0x20) { char buf[8]; snprintf(buf, sizeof buf, "\\u%04x", c); out += buf; }
+        else out += (char)c;
+    }
+    return out + "\"";
+}
+static string harness_to(bool v) { return v ? "true" : "false"; }
+static string harness_to(char v) { return harness_quote(string(1, v)); }
+static string harness_to(const string& v) { return harness_quote(v); }
+static string harness_to(const char* v) { return harness_quote(v); }
+static string harness_to(double v) {
+    if (!isfinite(v)) return "null";
+    char buf[32]; snprintf(buf, sizeof buf, "%.17g", v);
+    return buf;
+}
+template <class T, typename enable_if<is_integral<T>::value, int>::type = 0>
+static string harness_to(T v) { return to_string(v); }
+template <class T> static string harness_to(const vector<T>& v) {
+    string out = "[";
+    for (size_t k = 0; k < v.size(); k++) { if (k) out += ","; out += harness_to((T)v[k]); }
+    return out + "]";
+}
+
+template <class F, class... A, size_t... I>
+static string harness_invoke(F call, const vector<HarnessJson>& args, index_sequence<I...>) {
+    tuple<typename decay<A>::type...> vals(HarnessFrom<typename decay<A>::type>::get(args.at(I))...);
+    return call(get<I>(vals)...);
+}
+
+template <class R, class... A>
+static string harness_call(R (Solution::*f)(A...), Solution& sol, const vector<HarnessJson>& args) {
+    if (args.size() != sizeof...(A)) throw runtime_error("expected " + to_string(sizeof...(A)) + " arguments, got " + to_string(args.size()));
+    auto call = [&](typename decay<A>::type&... xs) -> string {
+        if constexpr (is_void<R>::value) { (sol.*f)(xs...); return "null"; }
+        else return harness_to((sol.*f)(xs...));
+    };
+    return harness_invoke<decltype(call), A...>(call, args, index_sequence_for<A...>{});
+}
+
+int main() {
+    string raw((istreambuf_iterator<char>(cin)), istreambuf_iterator<char>());
+    HarnessParser parser(raw);
+    HarnessJson cfg = parser.parse();
+    const HarnessJson* tests = nullptr;
+    for (auto& f : cfg.fields) if (f.first == "tests") tests = &f.second;
+    Solution sol;
+    size_t total = 0;
+    for (size_t k = 0; tests && k < tests->items.size(); k++) {
+        const HarnessJson& t = tests->items[k];
+        string id = "null", got = "null", error;
+        vector<HarnessJson> input;
+        for (auto& f : t.fields) {
+            if (f.first == "id") id = f.second.kind == HarnessJson::STR ? harness_quote(f.second.text) : f.second.text;
+            if (f.first == "input") input = f.second.items;
+        }
+        auto start = chrono::steady_clock::now();
+        try {
+            got = harness_call(__CALL__, sol, input);
+        } catch (const exception& e) {
+            error = e.what();
+        } catch (...) {
+            error = "unknown exception";
+        }
+        long long ms = chrono::duration_cast<chrono::milliseconds>(chrono::steady_clock::now() - start).count();
+        // endl flushes, so finished tests survive a later crash or kill
+        cout << "{\"id\":" + (id.empty() ? string("null") : id) + ",\"got\":" + got + ",\"time_ms\":" + to_string(ms) + ",\"error\":" + harness_quote(error) + "}" << endl;
+        total++;
+    }
+    cout << "{\"summary\":{\"total\":" << total << "}}" << endl;
+    return 0;
+}
+"""
+
+# __STRUCT__ declares Solution if the candidate didn't; __CALL__ is the generated dispatcher body
+RUNNER_RUST = r"""
+__STRUCT__
+#[allow(dead_code)]
+enum HarnessJson { Null, Bool(bool), Num(String), Str(String), Arr(Vec<HarnessJson>), Obj(Vec<(String, HarnessJson)>) }
+
+struct HarnessParser<'a> { s: &'a [u8], i: usize }
+
+impl<'a> HarnessParser<'a> {
+    fn skip(&mut self) { while self.i < self.s.len() && (self.s[self.i] as char).is_whitespace() { self.i += 1; } }
+    fn string(&mut self) -> String {
+        let mut out: Vec<u8> = Vec::new();
+        self.i += 1;
+        while self.s[self.i] != b'"' {
+            let c = self.s[self.i];
+            self.i += 1;
+            if c != b'\\' { out.push(c); continue; }
+            let e = self.s[self.i];
+            self.i += 1;
+            match e {
+                b'n' => out.push(b'\n'),
+                b't' => out.push(b'\t'),
+                b'r' => out.push(b'\r'),
+                b'b' => out.push(8),
+                b'f' => out.push(12),
+                b'u' => {
+                    let hex = std::str::from_utf8(&self.s[self.i..self.i + 4]).unwrap();
+                    let ch = char::from_u32(u32::from_str_radix(hex, 16).unwrap()).unwrap_or('?');
+                    let mut buf = [0u8; 4];
+                    out.extend_from_slice(ch.encode_utf8(&mut buf).as_bytes());
+                    self.i += 4;
+                }
+                _ => out.push(e),
+            }
+        }
+        self.i += 1;
+        String::from_utf8(out).unwrap_or_default()
+    }
+    fn parse(&mut self) -> HarnessJson {
+        self.skip();
+        match self.s[self.i] {
+            b'{' => {
+                let mut fields = Vec::new();
+                self.i += 1;
+                self.skip();
+                if self.s[self.i] == b'}' { self.i += 1; return HarnessJson::Obj(fields); }
+                loop {
+                    self.skip();
+                    let k = self.string();
+                    self.skip();
+                    self.i += 1;
+                    fields.push((k, self.parse()));
+                    self.skip();
+                    self.i += 1;
+                    if self.s[self.i - 1] == b'}' { return HarnessJson::Obj(fields); }
+                }
+            }
+            b'[' => {
+                let mut items = Vec::new();
+                self.i += 1;
+                self.skip();
+                if self.s[self.i] == b']' { self.i += 1; return HarnessJson::Arr(items); }
+                loop {
+                    items.push(self.parse());
+                    self.skip();
+                    self.i += 1;
+                    if self.s[self.i - 1] == b']' { return HarnessJson::Arr(items); }
+                }
+            }
+            b'"' => HarnessJson::Str(self.string()),
+            b't' => { self.i += 4; HarnessJson::Bool(true) }
+            b'f' => { self.i += 5; HarnessJson::Bool(false) }
+            b'n' => { self.i += 4; HarnessJson::Null }
+            _ => {
+                let start = self.i;
+                while self.i < self.s.len() && b"+-0123456789.eE".contains(&self.s[self.i]) { self.i += 1; }
+                HarnessJson::Num(String::from_utf8_lossy(&self.s[start..self.i]).into_owned())
+            }
+        }
+    }
+}
+
+trait HarnessFrom: Sized { fn from_json(v: &HarnessJson) -> Result<Self, String>; }
+
+macro_rules! harness_from_num {
+    ($($t:ty),*) => { $(impl HarnessFrom for $t {
+        fn from_json(v: &HarnessJson) -> Result<Self, String> {
+            match v { HarnessJson::Num(n) => n.parse::<$t>().map_err(|e| e.to_string()), _ => Err("expected a number".into()) }
+        }
+    })* };
+}
+harness_from_num!(i8, i16, i32, i64, i128, isize, u8, u16, u32, u64, u128, usize, f32, f64);
+
+impl HarnessFrom for bool {
+    fn from_json(v: &HarnessJson) -> Result<Self, String> {
+        match v { HarnessJson::Bool(b) => Ok(*b), _ => Err("expected a boolean".into()) }
+    }
+}
+impl HarnessFrom for String {
+    fn from_json(v: &HarnessJson) -> Result<Self, String> {
+        match v { HarnessJson::Str(s) => Ok(s.clone()), _ => Err("expected a string".into()) }
+    }
+}
+impl HarnessFrom for char {
+    fn from_json(v: &HarnessJson) -> Result<Self, String> {
+        match v { HarnessJson::Str(s) => s.chars().next().ok_or_else(|| "empty char".into()), _ => Err("expected a string".into()) }
+    }
+}
+impl<T: HarnessFrom> HarnessFrom for Vec<T> {
+    fn from_json(v: &HarnessJson) -> Result<Self, String> {
+        match v { HarnessJson::Arr(items) => items.iter().map(T::from_json).collect(), _ => Err("expected an array".into()) }
+    }
+}
+impl<T: HarnessFrom> HarnessFrom for Option<T> {
+    fn from_json(v: &HarnessJson) -> Result<Self, String> {
+        match v { HarnessJson::Null => Ok(None), _ => T::from_json(v).map(Some) }
+    }
+}
+
+fn harness_quote(s: &str) -> String {
+    let mut out = String::from("\"");
+    for c in s.chars() {
+        match c {
+            '"' => out.push_str("\\\""),
+            '\\' => out.push_str("\\\\"),
+            '\n' => out.push_str("\\n"),
+            '\t' => out.push_str("\\t"),
+            '\r' => out.push_str("\\r"),
+            c if (c as u32) < 0x20 => out.push_str(&format!("\\u{:04x}", c as u32)),
+            c => out.push(c),
+        }
+    }
+    out.push('"');
+    out
+}
+
+trait HarnessTo { fn to_json(&self) -> String; }
+
+macro_rules! harness_to_int {
+    ($($t:ty),*) => { $(impl HarnessTo for $t { fn to_json(&self) -> String { self.to_string() } })* };
+}
+harness_to_int!(i8, i16, i32, i64, i128, isize, u8, u16, u32, u64, u128, usize, bool);
+
+impl HarnessTo for f64 { fn to_json(&self) -> String { if self.is_finite() { format!("{:?}", self) } else { "null".into() } } }
+impl HarnessTo for f32 { fn to_json(&self) -> String { (*self as f64).to_json() } }
+impl HarnessTo for String { fn to_json(&self) -> String { harness_quote(self) } }
+impl HarnessTo for &str { fn to_json(&self) -> String { harness_quote(self) } }
+impl HarnessTo for char { fn to_json(&self) -> String { harness_quote(&self.to_string()) } }
+impl HarnessTo for () { fn to_json(&self) -> String { "null".into() } }
+impl<T: HarnessTo> HarnessTo for Vec<T> {
+    fn to_json(&self) -> String { format!("[{}]", self.iter().map(|x| x.to_json()).collect::<Vec<_>>().join(",")) }
+}
+impl<T: HarnessTo> HarnessTo for Option<T> {
+    fn to_json(&self) -> String { match self { Some(x) => x.to_json(), None => "null".into() } }
+}
+
+#[allow(unused_variables)]
+fn harness_call(args: &[HarnessJson]) -> Result<String, String> {
+    __CALL__
+}
+
+fn main() {
+    use std::io::Read;
+    let mut raw = String::new();
+    std::io::stdin().read_to_string(&mut raw).unwrap();
+    let cfg = HarnessParser { s: raw.as_bytes(), i: 0 }.parse();
+    std::panic::set_hook(Box::new(|_| {}));
+    let mut total = 0;
+    if let HarnessJson::Obj(fields) = &cfg {
+        for (k, tests) in fields {
+            if k != "tests" { continue; }
+            if let HarnessJson::Arr(items) = tests {
+                for t in items {
+                    let mut id = "null".to_string();
+                    let mut input: &[HarnessJson] = &[];
+                    if let HarnessJson::Obj(tf) = t {
+                        for (tk, tv) in tf {
+                            match (tk.as_str(), tv) {
+                                ("id", HarnessJson::Num(n)) => id = n.clone(),
+                                ("id", HarnessJson::Str(s)) => id = harness_quote(s),
+                                ("input", HarnessJson::Arr(a)) => input = a,
+                                _ => {}
+                            }
+                        }
+                    }
+                    let start = std::time::Instant::now();
+                    let res = std::panic::catch_unwind(std::panic::AssertUnwindSafe(|| harness_call(input)));
+                    let ms = start.elapsed().as_millis();
+                    let (got, error) = match res {
+                        Ok(Ok(g)) => (g, String::new()),
+                        Ok(Err(e)) => ("null".to_string(), e),
+                        Err(p) => ("null".to_string(), p.downcast_ref::<&str>().map(|s| s.to_string())
+                            .or_else(|| p.downcast_ref::<String>().cloned()).unwrap_or_else(|| "panic".into())),
+                    };
+                    // stdout is line-buffered, so each test's line is flushed as it finishes
+                    println!("{{\"id\":{},\"got\":{},\"time_ms\":{},\"error\":{}}}", id, got, ms, harness_quote(&error));
+                    total += 1;
+                }
+            }
+        }
+    }
+    println!("{{\"summary\":{{\"total\":{}}}}}", total);
+}
+"""
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+
+
+def _split_params(params: str) -> list:
+    """Split a parameter list on top-level commas (ignores commas inside <>, (), [])."""
+    parts, depth, current = [], 0, ""
+    for ch in params:
+        if ch in "<([":
+            depth += 1
+        elif ch in ">)]":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    if current.strip():
+        parts.append(current)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _build_python(code: str, func_name: str) -> list:
+    return [{"name": "main.py", "content": prep_code(code)}]
+
+
+def _build_javascript(code: str, func_name: str) -> list:
+    return [{"name": "main.js", "content": code.strip() + "\n" + RUNNER_JS}]
+
+
+def _build_ruby(code: str, func_name: str) -> list:
+    return [{"name": "main.rb", "content": code.strip() + "\n" + RUNNER_RUBY}]
+
+
+def _build_php(code: str, func_name: str) -> list:
+    body = re.sub(r"^\s*<\?php", "", code.strip()).rstrip()
+    if body.endswith("?>"):
+        body = body[:-2]
+    return [{"name": "main.php", "content": "<?php\n" + body + "\n" + RUNNER_PHP}]
+
+
+def _build_go(code: str, func_name: str) -> list:
+    # Merge the candidate's imports with the harness's; Go rejects duplicate imports
+    imports = set(GO_HARNESS_IMPORTS)
+    body = re.sub(r"^\s*package\s+\w+\s*$", "", code, flags=re.M)
+
+    def _take_block(m):
+        imports.update(re.findall(r'"([^"]+)"', m.group(1)))
+        return ""
+
+    body = re.sub(r"^\s*import\s*\((.*?)\)", _take_block, body, flags=re.M | re.S)
+    body = re.sub(r'^\s*import\s+("[^"]+")\s*$', _take_block, body, flags=re.M)
+    for pkg in GO_AUTO_IMPORTS:
+        if re.search(rf"\b{pkg.rsplit('/', 1)[-1]}\.", body):
+            imports.add(pkg)
+    header = "package main\n\nimport (\n" + "".join(f'\t"{i}"\n' for i in sorted(imports)) + ")\n"
+    return [{"name": "main.go", "content": header + body.strip() + "\n" + RUNNER_GO.replace("__FUNC__", func_name)}]
+
+
+def _build_java(code: str, func_name: str) -> list:
+    # Imports must precede every class, and Main must be the first class in the file
+    imports = list(JAVA_HARNESS_IMPORTS)
+    for m in re.finditer(r"^\s*import\s+([\w.*]+)\s*;", code, flags=re.M):
+        if m.group(1) not in imports:
+            imports.append(m.group(1))
+    body = re.sub(r"^\s*import\s+[\w.*]+\s*;\s*$", "", code, flags=re.M)
+    body = re.sub(r"^\s*package\s+[\w.]+\s*;\s*$", "", body, flags=re.M)
+    # Main runs first and isn't public; drop `public` from Solution so the file name doesn't matter
+    body = re.sub(r"\bpublic\s+(?=(?:final\s+)?class\s+Solution\b)", "", body)
+    header = "".join(f"import {i};\n" for i in imports) + "\n"
+    return [{"name": "Main.java", "content": header + RUNNER_JAVA.strip() + "\n\n" + body.strip() + "\n"}]
+
+
+def _build_cpp(code: str, func_name: str) -> list:
+    source = CPP_PRELUDE + code.strip() + "\n" + RUNNER_CPP.replace("__CALL__", f"&Solution::{func_name}")
+    return [{"name": "main.cpp", "content": source}]
+
+
+def _build_rust(code: str, func_name: str) -> list:
+    # LeetCode-style Rust is `impl Solution { pub fn two_sum(...) }` with the struct left implicit
+    name = func_name if re.search(rf"\bfn\s+{re.escape(func_name)}\b", code) else _snake_case(func_name)
+    m = re.search(rf"\bfn\s+{re.escape(name)}\s*(?:<[^>]*>)?\s*\((.*?)\)\s*(?:->|\{{)", code, flags=re.S)
+    if m:
+        params = [p for p in _split_params(m.group(1)) if not re.match(r"&?\s*(mut\s+)?self\b", p)]
+        args = ", ".join(f"HarnessFrom::from_json(&args[{i}])?" for i in range(len(params)))
+        call = (
+            f'if args.len() != {len(params)} {{ return Err(format!("expected {len(params)} arguments, got {{}}", args.len())); }}\n'
+            f"    Ok(Solution::{name}({args}).to_json())"
+        )
+    else:
+        call = f'Err("function {name} not found".to_string())'
+    struct = "" if re.search(r"\bstruct\s+Solution\b", code) else "struct Solution;"
+    source = code.strip() + "\n" + RUNNER_RUST.replace("__STRUCT__", struct).replace("__CALL__", call)
+    return [{"name": "main.rs", "content": source}]
+
+
+# language -> (build(code, func_name) -> files, run the whole suite in one sandbox request?)
+HARNESSES = {
+    "python": (_build_python, False),
+    "javascript": (_build_javascript, True),
+    "ruby": (_build_ruby, True),
+    "php": (_build_php, True),
+    "go": (_build_go, True),
+    "java": (_build_java, True),
+    "cpp": (_build_cpp, True),
+    "rust": (_build_rust, True),
+}
+
+
+def build_files(language: str, code: str, func_name: str):
+    """Piston `files` for code wrapped in the language's harness, or None if unsupported."""
+    entry = HARNESSES.get(language)
+    return entry[0](code, func_name) if entry else None
+
+
+def is_batched(language: str) -> bool:
+    entry = HARNESSES.get(language)
+    return bool(entry and entry[1])
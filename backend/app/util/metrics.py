@@ -0,0 +1,173 @@
+"""
+Minimal in-process metrics with Prometheus text exposition on /metrics.
+
+Metrics are per process; under gunicorn each worker reports its own numbers.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+# Upper bounds in seconds; covers fast cache hits through multi-minute sandbox runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_LOCK = threading.Lock()
+_COUNTERS = {}    # (name, labels) -> float
+_GAUGES = {}      # (name, labels) -> float
+_HISTOGRAMS = {}  # (name, labels) -> [bucket_counts, sum, count]
+_HELP = {
+    "interviewly_http_request_duration_seconds": ("histogram", "Flask request latency by route"),
+    "interviewly_http_requests_total": ("counter", "Flask requests by route and status"),
+    "interviewly_upstream_request_duration_seconds": ("histogram", "Latency of calls to external services"),
+    "interviewly_upstream_errors_total": ("counter", "Failed calls to external services"),
+    "interviewly_cache_requests_total": ("counter", "Cache lookups by cache and result"),
+    "interviewly_coalesced_requests_total": ("counter", "Duplicate in-flight calls that shared another call's result"),
+    "interviewly_admission_rejected_total": ("counter", "Requests refused with 429 by admission control"),
+    "interviewly_speculative_runs_total": ("counter", "Background runs started from update_context, by outcome"),
+    "interviewly_complexity_precompute_total": ("counter", "Background complexity analyses, by outcome"),
+    "interviewly_compressed_responses_total": ("counter", "Responses sent compressed, by Content-Encoding"),
+    "interviewly_compression_saved_bytes_total": ("counter", "Body bytes saved by response compression"),
+    "interviewly_gemini_calls_total": ("counter", "Routed interviewer calls by tier and which request answered"),
+    "interviewly_gemini_hedges_skipped_total": ("counter", "Hedged Gemini calls not sent because no scheduler slot was free"),
+    "interviewly_inflight": ("gauge", "Requests currently in progress"),
+    "interviewly_startup_seconds": ("gauge", "Wall time spent in create_app"),
+    "interviewly_process_rss_bytes": ("gauge", "Resident set size of this worker"),
+}
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    k = _key(name, labels)
+    with _LOCK:
+        _COUNTERS[k] = _COUNTERS.get(k, 0.0) + value
+
+
+def gauge_add(name: str, value: float, **labels):
+    k = _key(name, labels)
+    with _LOCK:
+        _GAUGES[k] = _GAUGES.get(k, 0.0) + value
+
+
+def gauge_set(name: str, value: float, **labels):
+    k = _key(name, labels)
+    with _LOCK:
+        _GAUGES[k] = float(value)
+
+
+def observe(name: str, value: float, **labels):
+    k = _key(name, labels)
+    with _LOCK:
+        h = _HISTOGRAMS.get(k)
+        if h is None:
+            h = _HISTOGRAMS[k] = [[0] * len(DEFAULT_BUCKETS), 0.0, 0]
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if value <= bound:
+                h[0][i] += 1
+        h[1] += value
+        h[2] += 1
+
+
+def cache_result(cache: str, result: str):
+    """Record a cache lookup outcome (hit / miss / stale / ...)."""
+    inc("interviewly_cache_requests_total", cache=cache, result=result)
+
+
+@contextmanager
+def upstream(name: str, operation: str = "request"):
+    """Time a call to an external service and track it as in flight."""
+    gauge_add("interviewly_inflight", 1, kind=f"upstream:{name}")
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc("interviewly_upstream_errors_total", upstream=name, operation=operation)
+        raise
+    finally:
+        observe("interviewly_upstream_request_duration_seconds", time.perf_counter() - start,
+                upstream=name, operation=operation)
+        gauge_add("interviewly_inflight", -1, kind=f"upstream:{name}")
+
+
+def timed_upstream(name: str, operation: str = "request"):
+    """Decorator form of upstream()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with upstream(name, operation):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def _fmt_labels(labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in labels)
+    return "{" + body + "}"
+
+
+def render() -> str:
+    """Current metrics in Prometheus text exposition format."""
+    with _LOCK:
+        counters = dict(_COUNTERS)
+        gauges = dict(_GAUGES)
+        histograms = {k: (list(v[0]), v[1], v[2]) for k, v in _HISTOGRAMS.items()}
+
+    lines = []
+    seen = set()
+
+    def header(name):
+        if name not in seen:
+            seen.add(name)
+            kind, text = _HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name)
+        lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+    for (name, labels), value in sorted(gauges.items()):
+        header(name)
+        lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        header(name)
+        for bound, n in zip(DEFAULT_BUCKETS, buckets):
+            lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', f'{bound:g}'),))} {n}")
+        lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {total:g}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """Per-route latency/in-flight tracking and the /metrics endpoint."""
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+        gauge_add("interviewly_inflight", 1, kind="http")
+
+    @app.after_request
+    def _record(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "<unmatched>"
+            observe("interviewly_http_request_duration_seconds", time.perf_counter() - start,
+                    route=route, method=request.method)
+            inc("interviewly_http_requests_total", route=route, method=request.method, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def _done(exc):
+        gauge_add("interviewly_inflight", -1, kind="http")
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        from .startup import rss_bytes
+        gauge_set("interviewly_process_rss_bytes", rss_bytes())
+        return Response(render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,56 @@
+"""
+Single-flight coalescing: concurrent calls with the same key share one execution.
+
+Nothing is cached after the call returns; this only collapses duplicates that overlap
+in time (double-clicked Run, frontend retries, repeated analyze_context). Followers get
+the leader's result object, so callers must treat it as read-only.
+"""
+import hashlib
+import json
+import threading
+
+from .metrics import inc
+
+
+def canonical_key(*parts) -> str:
+    """Stable hash of JSON-able parts; dict key order doesn't matter."""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn):
+        """Run fn() unless an identical call is in flight, in which case wait for its outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            inc("interviewly_coalesced_requests_total", group=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
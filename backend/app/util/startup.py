@@ -0,0 +1,53 @@
+"""
+Startup cost report: create_app wall time, RSS, and which heavy SDKs are already imported.
+
+The report from the running app is kept in app.extensions["startup_report"] and
+exported as gauges on /metrics; startup_report.py prints it for a fresh process.
+"""
+import json
+import os
+import sys
+import time
+
+from . import metrics
+
+# Modules whose presence after create_app means something loaded eagerly that shouldn't
+HEAVY_MODULES = ("google.generativeai", "google.ai.generativelanguage", "grpc", "google.protobuf")
+
+
+def rss_bytes() -> int:
+    """Current resident set size; falls back to peak RSS where /proc isn't available."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def build_report(started: float) -> dict:
+    return {
+        "create_app_seconds": round(time.perf_counter() - started, 4),
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "heavy_modules_loaded": [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+
+
+def record(app, started: float) -> dict:
+    report = build_report(started)
+    app.extensions["startup_report"] = report
+    metrics.gauge_set("interviewly_startup_seconds", report["create_app_seconds"])
+    metrics.gauge_set("interviewly_process_rss_bytes", report["rss_bytes"])
+    if app.config.get("STARTUP_REPORT"):
+        app.logger.warning("startup report: %s", json.dumps(report))
+    return report
@@ -0,0 +1,48 @@
+"""
+Re-score stored interviews from a JSONL file.
+
+Usage:
+    python batch_evaluate.py interviews.jsonl -o results.jsonl [--concurrency 8] [--rate 4]
+
+Each input line has the same fields as POST /api/evaluation/evaluate plus an optional "id".
+Re-running with the same --output resumes: interviews already scored there are skipped.
+"""
+import argparse
+import json
+import sys
+
+from dotenv import load_dotenv
+
+# Load .env if present (for local dev)
+load_dotenv()
+
+from app.config import Config
+from app.services.batch_evaluation import run_batch, read_jsonl
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch re-score interviews with the evaluation rubric.")
+    parser.add_argument("input", help="JSONL file of interviews")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results file (also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=Config.BATCH_EVAL_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=Config.BATCH_EVAL_RATE_PER_SEC,
+                        help="max LLM calls per second across all workers (0 = unlimited)")
+    args = parser.parse_args(argv)
+
+    if not Config.GEMINI_API_KEY:
+        print("Missing GEMINI_API_KEY", file=sys.stderr)
+        return 1
+
+    stats = run_batch(
+        api_key=Config.GEMINI_API_KEY,
+        interviews=read_jsonl(args.input),
+        output_path=args.output,
+        concurrency=args.concurrency,
+        rate_per_sec=args.rate,
+    )
+    print(json.dumps(stats))
+    return 0 if not stats["failed"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
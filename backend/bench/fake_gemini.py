@@ -0,0 +1,93 @@
+"""
+Stub of the Gemini REST API (v1beta generateContent) for benchmarks.
+
+Point the app at it with GEMINI_API_ENDPOINT=http://127.0.0.1:<port>. Responses are canned:
+  - complexity prompts  -> {"time_complexity": ..., "space_complexity": ...}
+  - rubric prompts      -> a full rubric JSON with all six criteria
+  - anything else       -> a one-sentence interviewer reply
+
+Standalone: python -m bench.fake_gemini --port 8788 --latency 0.8
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLEXITY_REPLY = {"time_complexity": "O(n)", "space_complexity": "O(n)"}
+
+RUBRIC_REPLY = {
+    "criteria": [
+        {"name": "Communication", "score": 4, "justification": "Explained the hash map approach before coding."},
+        {"name": "Understanding", "score": 4, "justification": "Covered duplicates; skipped empty input."},
+        {"name": "Clarity", "score": 3, "justification": "Some wandering while debugging."},
+        {"name": "Code Readability", "score": 4, "justification": "Clear names, no comments."},
+        {"name": "Correctness", "score": 5, "justification": "All tests passed."},
+        {"name": "Time/Space Complexity", "score": 5, "justification": "O(n) time with the standard O(n) space trade-off."},
+    ],
+    "overall_feedback": "Solid, optimal solution; tighten the verbal walkthrough.",
+}
+
+CHAT_REPLY = "Good start. What happens if the same number appears twice?"
+
+
+def _reply_for(request: dict) -> str:
+    system = json.dumps(request.get("systemInstruction") or request.get("system_instruction") or {})
+    if "time_complexity" in system or "algorithm analyst" in system:
+        return json.dumps(COMPLEXITY_REPLY)
+    if "RUBRIC" in system:
+        return json.dumps(RUBRIC_REPLY)
+    return CHAT_REPLY
+
+
+def make_handler(latency: float, jitter: float):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            try:
+                req = json.loads(body or b"{}")
+            except ValueError:
+                req = {}
+            text = _reply_for(req)
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+            out = json.dumps({
+                "candidates": [{
+                    "content": {"role": "model", "parts": [{"text": text}]},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {"promptTokenCount": len(body) // 4, "candidatesTokenCount": len(text) // 4},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+    return Handler
+
+
+def start(port: int = 0, latency: float = 0.0, jitter: float = 0.0):
+    """Start in a daemon thread; returns (server, endpoint for GEMINI_API_ENDPOINT)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, jitter))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8788)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--jitter", type=float, default=0.0)
+    args = ap.parse_args()
+    srv, url = start(args.port, args.latency, args.jitter)
+    print(f"fake gemini on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
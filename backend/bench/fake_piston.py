@@ -0,0 +1,144 @@
+"""
+Piston-compatible executor for benchmarks.
+
+POST /api/v2/piston/execute with the same payload as emkc.org.
+  - mode "local":  runs payloads in a local subprocess; languages other than Python need their
+                   toolchain on PATH (node, ruby, php, go, g++, rustc, java), else -> compile error
+  - mode "replay": runs each distinct payload once locally, then replays the stored response
+
+Every response is delayed by `latency` seconds (+/- `jitter`) to mimic network/sandbox overhead.
+Setting `server.fail_status` (e.g. 503) on the returned server makes every request fail with
+that status until it is cleared, for exercising the circuit breaker.
+
+Standalone: python -m bench.fake_piston --port 8787 --mode replay --latency 0.2
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# language -> (compile argv or None, run argv); "{main}" is the first file's name
+TOOLCHAINS = {
+    "python": (None, [sys.executable, "{main}"]),
+    "javascript": (None, ["node", "{main}"]),
+    "ruby": (None, ["ruby", "{main}"]),
+    "php": (None, ["php", "{main}"]),
+    "go": (["go", "build", "-o", "main.bin", "{main}"], ["./main.bin"]),
+    "cpp": (["g++", "-std=c++17", "-O2", "-o", "main.bin", "{main}"], ["./main.bin"]),
+    "rust": (["rustc", "-O", "-o", "main.bin", "{main}"], ["./main.bin"]),
+    "java": (None, ["java", "{main}"]),
+}
+
+
+def _stage(argv, stdin, timeout, cwd):
+    try:
+        p = subprocess.run(argv, input=stdin, capture_output=True, text=True, timeout=timeout, cwd=cwd)
+        stage = {"stdout": p.stdout, "stderr": p.stderr, "code": p.returncode, "signal": None}
+    except subprocess.TimeoutExpired as e:
+        # Like Piston, keep whatever was written before the kill (bytes here even with text=True)
+        partial = lambda b: b.decode("utf-8", "replace") if isinstance(b, bytes) else (b or "")
+        stage = {"stdout": partial(e.stdout), "stderr": partial(e.stderr), "code": None, "signal": "SIGKILL"}
+    stage["output"] = (stage["stdout"] or "") + (stage["stderr"] or "")
+    return stage
+
+
+def execute_locally(payload: dict) -> dict:
+    language = payload.get("language")
+    version = payload.get("version")
+    compile_argv, run_argv = TOOLCHAINS.get(language, (None, None))
+    tool = (compile_argv or run_argv or [""])[0]
+    if run_argv is None or not (tool == sys.executable or shutil.which(tool)):
+        return {
+            "language": language, "version": version,
+            "compile": {"stdout": "", "stderr": f"fake_piston: {language} not supported", "code": 1, "signal": None, "output": ""},
+            "run": {"stdout": "", "stderr": "", "code": None, "signal": None, "output": ""},
+        }
+    files = payload.get("files") or []
+    timeout = (payload.get("run_timeout") or 3000) / 1000.0
+    result = {"language": language, "version": version}
+    with tempfile.TemporaryDirectory() as d:
+        for f in files:
+            with open(os.path.join(d, f.get("name") or "main.py"), "w", encoding="utf-8") as fh:
+                fh.write(f.get("content") or "")
+        main = (files[0].get("name") if files else None) or "main.py"
+        if compile_argv:
+            result["compile"] = _stage([a.format(main=main) for a in compile_argv], "", 120, d)
+            if result["compile"]["code"] != 0:
+                result["run"] = {"stdout": "", "stderr": "", "code": None, "signal": None, "output": ""}
+                return result
+        result["run"] = _stage([a.format(main=main) for a in run_argv], payload.get("stdin") or "", timeout, d)
+    return result
+
+
+def make_handler(mode: str, latency: float, jitter: float):
+    replay = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if getattr(self.server, "fail_status", None):
+                self.send_response(self.server.fail_status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+            if mode == "replay":
+                key = hashlib.sha256(body).hexdigest()
+                with lock:
+                    result = replay.get(key)
+                if result is None:
+                    result = execute_locally(payload)
+                    with lock:
+                        replay[key] = result
+            else:
+                result = execute_locally(payload)
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+            out = json.dumps(result).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+    return Handler
+
+
+def start(port: int = 0, mode: str = "replay", latency: float = 0.0, jitter: float = 0.0):
+    """Start in a daemon thread; returns (server, execute_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(mode, latency, jitter))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/v2/piston/execute"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8787)
+    ap.add_argument("--mode", choices=["local", "replay"], default="replay")
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--jitter", type=float, default=0.0)
+    args = ap.parse_args()
+    srv, url = start(args.port, args.mode, args.latency, args.jitter)
+    print(f"fake piston on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -0,0 +1,188 @@
+"""
+Benchmark the hot endpoints against local stand-ins for Piston and Gemini.
+
+    cd backend
+    python -m bench.run_bench --concurrency 8 --requests 200 --piston-latency 0.2 --gemini-latency 0.5
+
+Starts fake_piston and fake_gemini on ephemeral ports, serves the app in-process with a
+threaded werkzeug server (or targets --target URL), drives each scenario at the given
+concurrency and prints p50/p95/p99 latency and throughput. --json writes the same numbers
+to a file so runs can be diffed in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from . import fake_gemini, fake_piston
+
+TWO_SUM = """
+class Solution:
+    def twoSum(self, nums: List[int], target: int) -> List[int]:
+        seen = {}
+        for i, n in enumerate(nums):
+            if target - n in seen:
+                return [seen[target - n], i]
+            seen[n] = i
+        return []
+"""
+
+TESTS = [
+    {"id": i, "input": [[1, 2, 3, 4, 5, 6, 7, 8, 9, i + 10], 9 + i + 10], "output": [8, 9], "checker": "multiset_equal"}
+    for i in range(5)
+]
+
+QUESTION = {
+    "id": "two-sum", "title": "Two Sum", "difficulty": "Easy", "topics": ["Array", "Hash Table"],
+    "function": "twoSum", "args": ["nums", "target"],
+    "prompt": "Return indices of the two numbers that add up to target.",
+    "optimal_time_complexity": "O(n)", "optimal_space_complexity": "O(n)",
+}
+
+
+def _run_body(piston_url):
+    return {"code": TWO_SUM, "language": "python", "function": "twoSum", "tests": TESTS,
+            "checker": "multiset_equal", "piston_url": piston_url}
+
+
+def scenarios(piston_url):
+    """name -> (method, path, body factory(i), headers factory(i))"""
+    return {
+        "code_run": ("POST", "/api/code/run", lambda i: _run_body(piston_url), lambda i: {}),
+        "ai_analyze": ("POST", "/api/ai/analyze",
+                       lambda i: {"messages": [{"role": "user", "content": f"I'd use a hash map ({i})"}]},
+                       lambda i: {"X-Client-Id": f"bench-{i % 16}"}),
+        "ai_update_context": ("POST", "/api/ai/update_context",
+                              lambda i: {"code": TWO_SUM + f"\n# edit {i}\n", "language": "python", "question": QUESTION},
+                              lambda i: {"X-Client-Id": f"bench-{i % 16}"}),
+        "evaluation_evaluate": ("POST", "/api/evaluation/evaluate",
+                                lambda i: {"transcript": [{"role": "user", "content": "Hash map, one pass."}],
+                                           "code_submission": TWO_SUM + f"\n# {i}\n", "language": "python",
+                                           "test_results": {"summary": {"passed": 5, "total": 5}, "results": []},
+                                           "question": QUESTION, "interviewStartTime": "2024-01-01T00:00:00Z"},
+                                lambda i: {}),
+    }
+
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, int(round(p / 100.0 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[k]
+
+
+def drive(base_url, scenario, n_requests, concurrency):
+    method, path, body_fn, headers_fn = scenario
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            r = session.request(method, base_url + path, json=body_fn(i), headers=headers_fn(i), timeout=300)
+            ok = r.status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(n_requests)))
+    wall = time.perf_counter() - wall
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 1) if v is not None else None
+    return {
+        "requests": n_requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "throughput_rps": round(n_requests / wall, 2) if wall else None,
+        "mean_ms": ms(statistics.fmean(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+    }
+
+
+def serve_app():
+    """Run create_app() on a threaded werkzeug server; returns base URL."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import create_app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--target", help="base URL of an already running backend (default: serve in-process)")
+    ap.add_argument("--scenario", action="append", help="scenario(s) to run (default: all)")
+    ap.add_argument("--requests", type=int, default=100)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--piston-mode", choices=["local", "replay"], default="replay")
+    ap.add_argument("--piston-latency", type=float, default=0.0)
+    ap.add_argument("--piston-nodes", type=int, default=1, help="fake executor nodes in the pool")
+    ap.add_argument("--piston-node-concurrency", type=int, default=8)
+    ap.add_argument("--gemini-latency", type=float, default=0.0)
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--admission", action="store_true", help="keep per-client rate limits on (in-process only)")
+    args = ap.parse_args(argv)
+
+    piston_urls = [fake_piston.start(mode=args.piston_mode, latency=args.piston_latency, jitter=args.jitter)[1]
+                   for _ in range(max(1, args.piston_nodes))]
+    piston_url = piston_urls[0]
+    _, gemini_endpoint = fake_gemini.start(latency=args.gemini_latency, jitter=args.jitter)
+
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        # Must be set before app.config is imported
+        os.environ["GEMINI_API_ENDPOINT"] = gemini_endpoint
+        os.environ.setdefault("GEMINI_API_KEY", "bench-key")
+        os.environ["PISTON_ENDPOINTS"] = ",".join(f"{u}|1|{args.piston_node_concurrency}" for u in piston_urls)
+        # Per-client rate limits would turn a load test into a 429 test; opt back in with --admission
+        os.environ["ADMISSION_CONTROL"] = "1" if args.admission else "0"
+        base_url = serve_app()
+
+    all_scenarios = scenarios(piston_url)
+    names = args.scenario or list(all_scenarios)
+    unknown = [n for n in names if n not in all_scenarios]
+    if unknown:
+        ap.error(f"unknown scenario(s): {unknown}; choose from {list(all_scenarios)}")
+
+    report = {}
+    for name in names:
+        report[name] = drive(base_url, all_scenarios[name], args.requests, args.concurrency)
+        r = report[name]
+        print(f"{name:22s} rps={r['throughput_rps']:>8} p50={r['p50_ms']:>8}ms p95={r['p95_ms']:>8}ms "
+              f"p99={r['p99_ms']:>8}ms errors={r['errors']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"run_id": uuid.uuid4().hex, "args": vars(args), "results": report}, f, indent=2)
+    return 1 if any(r["errors"] for r in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
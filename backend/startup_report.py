@@ -0,0 +1,51 @@
+"""
+Print the backend's cold-start cost for a fresh interpreter as JSON.
+
+Usage:
+    python startup_report.py              # import + create_app time, RSS, heavy modules loaded
+    python startup_report.py --first-use  # also time the lazy Gemini SDK load
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def _rss_now() -> int:
+    # Inline so nothing from app/ is imported before the measurement starts
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Measure backend import/startup cost in this process.")
+    ap.add_argument("--first-use", action="store_true", help="also time the lazy Gemini SDK import")
+    args = ap.parse_args(argv)
+
+    rss_before = _rss_now()
+    t0 = time.perf_counter()
+    from app import create_app
+    import_seconds = time.perf_counter() - t0
+    app = create_app()
+    report = {
+        "python": sys.version.split()[0],
+        "rss_before_bytes": rss_before,
+        "import_app_seconds": round(import_seconds, 4),
+        **app.extensions["startup_report"],
+    }
+    if args.first_use:
+        from app.services import gemini
+        t1 = time.perf_counter()
+        gemini._client("startup-report")
+        report["gemini_first_use_seconds"] = round(time.perf_counter() - t1, 4)
+        report["rss_after_gemini_bytes"] = _rss_now()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
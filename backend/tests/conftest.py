@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config  # noqa: E402
+from bench import fake_piston  # noqa: E402
+
+
+@pytest.fixture
+def piston(monkeypatch):
+    """
+    A local fake Piston; yields (server, execute_url). Runs may pass it as piston_url.
+    Set server.fail_status to make it fail.
+    """
+    monkeypatch.setattr(Config, "PISTON_ALLOW_CLIENT_URL", True)
+    server, url = fake_piston.start(mode="local")
+    yield server, url
+    server.shutdown()
@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from app.services.code_runner import execute_run
+from app.util import admission
+from app.util.admission import FairScheduler, Saturated, TokenBucket
+
+PY = "class Solution:\n    def add(self, a, b):\n        return a + b\n"
+
+
+def test_saturated_executor_raises_instead_of_infra_errors(piston, monkeypatch):
+    _, url = piston
+    monkeypatch.setattr(admission, "_SCHEDULERS", {"piston": FairScheduler("piston", 1, 0, 0.1)})
+    held, release = threading.Event(), threading.Event()
+
+    def _hold():
+        with admission.get_scheduler("piston").slot("other"):
+            held.set()
+            release.wait(5)
+
+    threading.Thread(target=_hold, daemon=True).start()
+    held.wait(5)
+    try:
+        with pytest.raises(Saturated):
+            execute_run({"code": PY, "function": "add", "piston_url": url,
+                         "tests": [{"id": i, "input": [i, i], "output": 2 * i} for i in range(3)]}, client_id="me")
+    finally:
+        release.set()
+
+
+def test_full_buckets_are_swept(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(admission, "_BUCKETS", {})
+    monkeypatch.setattr(admission, "_swept_at", 0.0)
+    drained = TokenBucket(0.001, 1)
+    drained.take()
+    admission._BUCKETS[("a", "r")] = drained
+    admission._BUCKETS[("b", "r")] = TokenBucket(1, 1)
+    with admission._LOCK:
+        admission._sweep_buckets(now + 100)
+    assert list(admission._BUCKETS) == [("a", "r")]
+
+
+def test_finish_times_are_forgotten():
+    s = FairScheduler("t", 1, 10, 1.0)
+    for i in range(3000):
+        with s.slot(f"client-{i}"):
+            pass
+    assert not s._finish  # cleared whenever the scheduler goes idle
+
+    s = FairScheduler("t", 2, 10000, 1.0)
+    done = threading.Event()
+
+    def _busy():
+        with s.slot("busy"):
+            done.wait(5)
+
+    threading.Thread(target=_busy, daemon=True).start()
+    time.sleep(0.05)
+    for i in range(3000):
+        with s.slot(f"client-{i}"):  # one slot stays busy, so entries are only pruned on access
+            pass
+    assert len(s._finish) <= admission._FINISH_MAX + 1
+    done.set()
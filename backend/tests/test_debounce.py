@@ -0,0 +1,35 @@
+import threading
+import time
+
+from app.util.debounce import Debouncer
+
+
+def test_only_the_last_trigger_runs_and_entries_are_dropped():
+    d = Debouncer()
+    ran = []
+    for i in range(3):
+        d.trigger("k", 0.05, lambda generation, i: ran.append((i, d.is_current("k", generation))), i)
+    time.sleep(0.2)
+    assert ran == [(2, True)]
+    assert not d._entries
+
+
+def test_cancel_supersedes_running_work_and_drops_the_entry():
+    d = Debouncer()
+    started, release, seen = threading.Event(), threading.Event(), []
+
+    def _work(generation):
+        started.set()
+        release.wait(1)
+        seen.append(d.is_current("k", generation))
+
+    d.trigger("k", 0, _work)
+    started.wait(1)
+    d.cancel("k")
+    assert not d._entries
+    d.trigger("k", 10, lambda generation: None)  # re-created key gets a fresh generation
+    release.set()
+    time.sleep(0.05)
+    assert seen == [False]
+    d.cancel("k")
+    assert not d._entries
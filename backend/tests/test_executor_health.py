@@ -0,0 +1,70 @@
+import time
+
+from app.util.execute_utils import preflight_compile, run_test_batch
+from app.util.executor_health import ExecutorUnavailable, get_health
+from app.util.harnesses import build_files
+
+import pytest
+
+JS = "class Solution { add(a, b) { return a + b; } }"
+PY = "class Solution:\n    def add(self, a, b):\n        return a + b\n"
+
+
+def _breaker(url, cooldown=0.2):
+    health = get_health(url)
+    health.failure_threshold = 3
+    health.cooldown = cooldown
+    return health
+
+
+def test_preflight_failures_open_and_probe_success_closes(piston):
+    server, url = piston
+    health = _breaker(url)
+    files = build_files("javascript", JS, "add")
+
+    server.fail_status = 503
+    for _ in range(3):
+        with pytest.raises(ExecutorUnavailable):
+            preflight_compile(url, "javascript", "", files, "add", "deep_equal", 3000)
+    assert health.state == "open"
+    with pytest.raises(ExecutorUnavailable):
+        preflight_compile(url, "javascript", "", files, "add", "deep_equal", 3000)  # fails fast
+
+    server.fail_status = None
+    time.sleep(0.25)
+    assert preflight_compile(url, "javascript", "", files, "add", "deep_equal", 3000) is None
+    assert health.state == "closed"
+    assert health.allow() and health.allow()
+
+
+def test_preflight_client_error_is_not_an_executor_failure(piston):
+    server, url = piston
+    health = _breaker(url)
+    files = build_files("javascript", JS, "add")
+
+    server.fail_status = 400
+    for _ in range(5):
+        assert preflight_compile(url, "javascript", "", files, "add", "deep_equal", 3000) is None
+    assert health.state == "closed"
+    assert health.consecutive_failures == 0
+
+
+def test_failed_probe_reopens(piston):
+    server, url = piston
+    health = _breaker(url)
+    files = build_files("python", PY, "add")
+    tests = [{"id": 1, "input": [1, 2], "output": 3}]
+
+    server.fail_status = 500
+    for _ in range(3):
+        with pytest.raises(ExecutorUnavailable):
+            run_test_batch(url, "python", "", files, "add", tests, "deep_equal", 3000)
+    time.sleep(0.25)
+    with pytest.raises(ExecutorUnavailable):
+        run_test_batch(url, "python", "", files, "add", tests, "deep_equal", 3000)  # the probe
+    assert health.state == "open"
+
+    server.fail_status = None
+    time.sleep(0.25)
+    assert run_test_batch(url, "python", "", files, "add", tests, "deep_equal", 3000)[0]["ok"]
+    assert health.state == "closed"
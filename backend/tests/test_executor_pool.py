@@ -0,0 +1,46 @@
+import threading
+import time
+
+from app.util.executor_health import get_health
+from app.util.executor_pool import ExecutorPool
+
+
+def _pool(*urls):
+    return ExecutorPool([{"url": u, "max_concurrency": 1} for u in urls], queue_timeout=2.0)
+
+
+def _acquire_in_thread(pool, exclude, got):
+    t = threading.Thread(target=lambda: got.append((pool.acquire(exclude=exclude), time.monotonic())), daemon=True)
+    t.start()
+    return t
+
+
+def test_release_wakes_a_waiter_that_can_use_the_node():
+    pool = _pool("http://pool-a", "http://pool-b")
+    a, b = pool.acquire(), pool.acquire()
+    got = []
+    # The first waiter can't use a (a retry that already failed there); the second can
+    first = _acquire_in_thread(pool, {a.url}, [])
+    time.sleep(0.05)
+    second = _acquire_in_thread(pool, {b.url}, got)
+    time.sleep(0.05)
+    released = time.monotonic()
+    pool.release(a)
+    second.join(1.0)
+    assert got and got[0][0] is a and got[0][1] - released < 0.5
+    pool.release(b)
+    first.join(1.0)
+
+
+def test_waiter_picks_up_a_node_whose_circuit_reopens():
+    pool = _pool("http://pool-c", "http://pool-d")
+    health = get_health("http://pool-c")
+    health.cooldown = 0.2
+    health.record_failure("down", retry_after=0.2)
+    d = pool.acquire()
+    assert d.url == "http://pool-d"
+    start = time.monotonic()
+    node = pool.acquire()
+    assert node.url == "http://pool-c" and time.monotonic() - start < 1.0
+    pool.release(node)
+    pool.release(d)
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from app.services import gemini
+from app.util.admission import FairScheduler
+
+
+def _fake_gemini(monkeypatch, delays):
+    """analyze_with_gemini stand-in: sleeps delays[model] and tracks how many calls overlap."""
+    state = {"now": 0, "peak": 0, "calls": []}
+    lock = threading.Lock()
+
+    def _analyze(*, model_name, timeout, **kwargs):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+            state["calls"].append(model_name)
+        try:
+            time.sleep(delays[model_name])
+            return model_name
+        finally:
+            with lock:
+                state["now"] -= 1
+
+    monkeypatch.setattr(gemini, "analyze_with_gemini", _analyze)
+    monkeypatch.setattr(gemini, "route", lambda messages, kind: {
+        "tier": "fast", "model": "slow", "alternate": "quick", "hedge_after": 0.05, "timeout": 2.0})
+    return state
+
+
+def _generate(scheduler, client):
+    return gemini.generate_routed(api_key="k", system_prompt="", messages=[], scheduler=scheduler, client=client)
+
+
+def test_hedge_uses_a_second_slot_and_loser_keeps_it(monkeypatch):
+    _fake_gemini(monkeypatch, {"slow": 0.4, "quick": 0.0})
+    scheduler = FairScheduler("gemini", 2, 10, 5.0)
+    assert _generate(scheduler, "a") == "quick"
+    assert scheduler.in_use == 1  # the abandoned primary still holds its slot
+    time.sleep(0.5)
+    assert scheduler.in_use == 0
+
+
+def test_no_hedge_without_a_free_slot(monkeypatch):
+    state = _fake_gemini(monkeypatch, {"slow": 0.2, "quick": 0.0})
+    scheduler = FairScheduler("gemini", 2, 10, 5.0)
+    threads = [threading.Thread(target=_generate, args=(scheduler, f"c{i}")) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    time.sleep(0.3)
+    assert state["peak"] <= 2
+    assert scheduler.in_use == 0
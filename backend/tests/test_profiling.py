@@ -0,0 +1,17 @@
+from app.services.profiling import summarize
+
+
+def test_summarize_full_report():
+    report = {"stopped_early": True, "cap_ms": 2000, "wall_ms": 2001, "peak_kb": 12.5, "error": "",
+              "functions": [{"function": "twoSum", "line": 3, "calls": 1, "self_ms": 1990.0}],
+              "lines": [{"line": 7, "pct": 100.0}], "allocations": [{"line": 5, "kb": 10.2}]}
+    text = summarize(report, 2)
+    assert text.startswith("Profile of test 2 (stopped at the 2000 ms cap")
+    assert "twoSum (line 3, 1 calls" in text and "line 7 100.0%" in text and "line 5 10.2 KB" in text
+
+
+def test_summarize_tolerates_malformed_reports():
+    assert summarize({}) == ""
+    assert summarize({"functions": [{}], "lines": "x", "allocations": [None, 3], "wall_ms": 5}) == ""
+    assert summarize({"functions": None, "error": {"not": "a string"}}) == "Profile: raised: {'not': 'a string'}"
+    assert summarize({"functions": [{"function": "f"}, {"name": "g"}]}, 1) == "Profile of test 1: hottest functions: f (line ?, ? calls, ? ms self)"
@@ -0,0 +1,32 @@
+import time
+
+from app.config import Config
+from app.services.run_jobs import SqliteJobStore
+
+
+def test_expired_lease_requeues_then_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "RUN_JOBS_LEASE_SECONDS", 0.1)
+    monkeypatch.setattr(Config, "RUN_JOBS_MAX_ATTEMPTS", 2)
+    store = SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create("a", {"code": "x"})
+
+    assert store.claim(timeout=0)[0] == job_id  # this worker "dies" holding the job
+    assert store.claim(timeout=0) is None       # lease still live
+    time.sleep(0.15)
+    assert store.claim(timeout=0)[0] == job_id  # requeued and claimed again
+    time.sleep(0.15)
+    assert store.claim(timeout=0) is None       # out of attempts
+    job = store.get(job_id)
+    assert job["state"] == "failed" and job["status"] == 500
+
+
+def test_progress_renews_lease(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "RUN_JOBS_LEASE_SECONDS", 0.2)
+    store = SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create("a", {})
+    store.claim(timeout=0)
+    for i in range(4):
+        time.sleep(0.1)
+        store.progress(job_id, i, 4)
+    assert store.claim(timeout=0) is None
+    assert store.get(job_id)["state"] == "running"
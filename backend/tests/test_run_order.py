@@ -0,0 +1,64 @@
+from app.services import code_runner
+from app.services.code_runner import execute_run
+
+# Wrong for n == 4 only
+PY = "class Solution:\n    def double(self, n):\n        return 0 if n == 4 else n * 2\n"
+
+
+def _payload(url):
+    return {"code": PY, "function": "double", "piston_url": url, "stop_on_fail": True,
+            "tests": [{"id": i, "input": [i], "output": i * 2} for i in range(1, 7)]}
+
+
+def _spy(monkeypatch):
+    dispatched = []
+    real = code_runner.run_test_batch
+
+    def _run(piston_url, language, version, files, func_name, tests, *args):
+        dispatched.extend(t["id"] for t in tests)
+        return real(piston_url, language, version, files, func_name, tests, *args)
+
+    monkeypatch.setattr(code_runner, "run_test_batch", _run)
+    return dispatched
+
+
+def test_stop_on_fail_runs_last_failure_first(piston, monkeypatch):
+    _, url = piston
+    dispatched = _spy(monkeypatch)
+
+    body, _ = execute_run(_payload(url), client_id="order-a")
+    assert dispatched == [1, 2, 3, 4]
+    assert [r["id"] for r in body["results"]] == [1, 2, 3, 4]
+
+    dispatched.clear()
+    body, _ = execute_run(_payload(url), client_id="order-a")
+    assert dispatched == [4]
+    assert [(r["id"], r["ok"]) for r in body["results"]] == [(4, False)]
+
+
+def test_history_is_per_client(piston, monkeypatch):
+    _, url = piston
+    execute_run(_payload(url), client_id="order-b")
+    dispatched = _spy(monkeypatch)
+    execute_run(_payload(url), client_id="order-c")
+    assert dispatched == [1, 2, 3, 4]
+
+
+def test_without_stop_on_fail_results_keep_given_order(piston, monkeypatch):
+    _, url = piston
+    execute_run(_payload(url), client_id="order-d")
+    dispatched = _spy(monkeypatch)
+    body, _ = execute_run({**_payload(url), "stop_on_fail": False}, client_id="order-d")
+    assert dispatched == [1, 2, 3, 4, 5, 6]
+    assert body["summary"]["passed"] == 5
+
+
+def test_client_dependent_runs_coalesce_per_client(monkeypatch):
+    keys = []
+    monkeypatch.setattr(code_runner._RUNS, "do", lambda key, fn: keys.append(key))
+    plain = {"code": PY, "function": "double", "tests": []}
+    for data in (plain, {**plain, "stop_on_fail": True}, {**plain, "profile": True}):
+        code_runner.execute_run_coalesced(data, client_id="a")
+        code_runner.execute_run_coalesced(data, client_id="b")
+    assert keys[0] == keys[1]
+    assert keys[2] != keys[3] and keys[4] != keys[5]
@@ -0,0 +1,124 @@
+import json
+import shutil
+
+import pytest
+
+from app.services import code_runner
+from app.services.code_runner import execute_run
+from app.util.execute_utils import parse_runner_output, run_test_batch
+from app.util.harnesses import build_files
+
+needs_node = pytest.mark.skipif(not shutil.which("node"), reason="node is not installed")
+
+# Test 3 never returns, so the sandbox kills the run partway through the suite
+JS = """
+class Solution {
+  double(n) {
+    if (n === 3) { while (true) {} }
+    return n * 2;
+  }
+}
+"""
+
+
+def _tests(n):
+    return [{"id": i, "input": [i], "output": i * 2} for i in range(1, n + 1)]
+
+
+def _line(**fields):
+    return json.dumps({"got": None, "time_ms": 0, "error": "", **fields})
+
+
+def test_parse_splits_results_summary_and_prints():
+    stdout = "\n".join([
+        "hello from the candidate",
+        _line(id=1, got=2),
+        _line(id=2, got=4),
+        json.dumps({"summary": {"passed": 2, "total": 2}}),
+    ])
+    results, summary, other = parse_runner_output(stdout, _tests(2))
+    assert [r["id"] for r in results] == [1, 2]
+    assert summary == {"passed": 2, "total": 2}
+    assert other == ["hello from the candidate"]
+
+
+def test_parse_ignores_candidate_json_with_an_id():
+    stdout = "\n".join([
+        json.dumps({"id": 1}),                       # not shaped like a result
+        _line(id=2, got="spoofed"),                  # not the next test
+        _line(id=1, got=2),
+        _line(id=1, got="again"),                    # test 1 already reported
+        _line(id=2, got=4),
+    ])
+    results, _, other = parse_runner_output(stdout, _tests(2))
+    assert [(r["id"], r["got"]) for r in results] == [(1, 2), (2, 4)]
+    assert len(other) == 3
+
+
+@needs_node
+def test_killed_partway_keeps_finished_results(piston):
+    _, url = piston
+    files = build_files("javascript", JS, "double")
+    results = run_test_batch(url, "javascript", "", files, "double", _tests(5), "deep_equal", 1000)
+    assert [(r["id"], r["ok"]) for r in results] == [(1, True), (2, True)]
+
+
+@needs_node
+def test_killed_on_first_test_fails_only_that_test(piston):
+    _, url = piston
+    files = build_files("javascript", JS, "double")
+    results = run_test_batch(url, "javascript", "", files, "double", _tests(5)[2:], "deep_equal", 1000)
+    assert len(results) == 1
+    assert results[0]["id"] == 3 and not results[0]["ok"] and results[0]["tle"]
+
+
+def test_runner_error_fails_the_rest_without_rerun(piston):
+    _, url = piston
+    code = "class Solution:\n    def double(self, n):\n        return n * 2\n"
+    files = build_files("python", code, "double")
+    # No input: the harness itself reports "Runner error: ..." and exits normally
+    tests = [{"id": 1, "output": 2}, {"id": 2, "input": [2], "output": 4}]
+    results = run_test_batch(url, "python", "", files, "double", tests, "deep_equal", 3000)
+    assert [r["id"] for r in results] == [1, 2]
+    assert not any(r["ok"] or r["tle"] for r in results)
+    assert all("Runner error" in r["error"] for r in results)
+
+
+@needs_node
+def test_partial_batch_is_requeued_from_the_first_unfinished_test(piston, monkeypatch):
+    _, url = piston
+    batches = []
+    real = code_runner.run_test_batch
+
+    def _spy(piston_url, language, version, files, func_name, tests, *args):
+        batches.append([t["id"] for t in tests])
+        return real(piston_url, language, version, files, func_name, tests, *args)
+
+    monkeypatch.setattr(code_runner, "run_test_batch", _spy)
+    body, status = execute_run({"code": JS, "language": "javascript", "function": "double",
+                                "piston_url": url, "timeout": 1000, "tests": _tests(5)})
+    assert status == 200
+    assert batches == [[1, 2, 3, 4, 5], [3, 4, 5], [4, 5]]
+    assert [(r["id"], r["ok"], r.get("tle")) for r in body["results"]] == [
+        (1, True, None), (2, True, None), (3, False, True), (4, True, None), (5, True, None)]
+    assert body["summary"] == {"passed": 4, "total": 5, "infra_errors": 0}
+
+
+@needs_node
+def test_syntax_error_fails_the_suite_in_one_dispatch(piston, monkeypatch):
+    _, url = piston
+    batches = []
+    real = code_runner.run_test_batch
+
+    def _spy(piston_url, language, version, files, func_name, tests, *args):
+        batches.append([t["id"] for t in tests])
+        return real(piston_url, language, version, files, func_name, tests, *args)
+
+    monkeypatch.setattr(code_runner, "run_test_batch", _spy)
+    code = "class Solution {\n  double(n) {\n    return n * ;\n  }\n}\n"
+    body, status = execute_run({"code": code, "language": "javascript", "function": "double",
+                                "piston_url": url, "timeout": 1000, "tests": _tests(10)})
+    assert status == 200
+    assert batches == [list(range(1, 11))]
+    assert body["summary"] == {"passed": 0, "total": 10, "compile_error": True}
+    assert "SyntaxError" in body["results"][0]["error"]